@@ -0,0 +1,493 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import os
+import re
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import yaml
+
+from . import sections
+from .config_loader import resolve_cookies
+from .output import build_outtmpl, choose_filename_template, template_table
+from .profiles import (
+    VIDEO_PRESET_FORMATS,
+    DownloadProfile,
+    ProfileError,
+    compile_named,
+    compile_profile,
+)
+from .providers import PROVIDER_CLASS_MAP, get_provider
+from .utils import detect_provider
+
+# Kunci yang boleh dipakai per item di 'urls:' file batch
+ENTRY_KEYS = ("url", "mode", "quality", "profile", "output", "priority", "section")
+
+
+def parse_entry(raw: Any, default_profile: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Normalisasi satu item 'urls:' → {url, mode, quality, profile, output, priority, section}.
+    Item boleh string URL atau mapping; nilai yang tidak diisi = None (pakai default batch).
+    'section' ("START-END") disimpan mentah; divalidasi saat plan().
+    Kembalikan None bila item tidak punya URL.
+    """
+    if isinstance(raw, dict):
+        url = raw.get("url")
+        get = raw.get
+    else:
+        url, get = raw, {}.get
+    if not isinstance(url, str) or not url.strip():
+        return None
+    mode = get("mode")
+    prof = get("profile") or default_profile
+    try:
+        priority = int(get("priority") or 0)
+    except (TypeError, ValueError):
+        priority = 0
+    return {
+        "url": url.strip(),
+        "mode": str(mode).lower() if mode else None,
+        "quality": str(get("quality")) if get("quality") else None,
+        "profile": str(prof) if prof else None,
+        "output": str(get("output")) if get("output") else None,
+        "priority": priority,
+        "section": str(get("section")) if get("section") else None,
+    }
+
+
+def entry_key(entry: Dict[str, Any]) -> str:
+    """Identitas item untuk deduplikasi antrean: URL yang sama dengan section berbeda = item lain."""
+    return f"{entry['url']}#{entry['section']}" if entry.get("section") else entry["url"]
+
+
+# ===== URL tempelan (wizard input manual) =====
+# Teks yang ditempel bisa berisi banyak URL per baris, bernomor, berkutip, atau tanpa
+# skema. canonical_url merapikannya agar URL yang sama (beda parameter pelacak /
+# huruf besar host / fragmen) hanya masuk antrean sekali.
+
+_TRACKING_PARAMS = re.compile(
+    r"^(?:utm_\w+|fbclid|gclid|igshid|igsh|si|feature|mibextid|is_from_webapp|sender_device|_r|_t)$"
+)
+_URL_TOKEN = re.compile(r"(?:https?://|www\.)\S+|(?:[\w-]+\.)+[a-z]{2,}/\S*", re.IGNORECASE)
+
+
+def split_urls(text: str) -> List[str]:
+    """Ambil semua kandidat URL dari teks tempelan (urutan dipertahankan)."""
+    return [m.group(0) for m in _URL_TOKEN.finditer(text)]
+
+
+def canonical_url(raw: str) -> Optional[str]:
+    """
+    Bentuk kanonik URL tempelan: tanpa kutip/<>/tanda baca di ujung, skema https bila
+    tidak ada, host huruf kecil, tanpa parameter pelacak & fragmen. None bila bukan URL.
+    """
+    url = raw.strip().strip("<>\"'").rstrip(".,;")
+    if not url:
+        return None
+    if "://" not in url:
+        url = "https://" + url
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in ("http", "https") or "." not in parts.netloc:
+        return None
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _TRACKING_PARAMS.match(k)]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", urlencode(query), ""))
+
+
+# ===== Pembaca file batch streaming =====
+# Format: YAML (mode/quality/profile + urls:), teks satu URL per baris, CSV (header
+# memakai nama kunci ENTRY_KEYS) dan JSONL (string URL atau objek per baris).
+# File dibaca baris per baris dalam mode biner; tiap entry membawa "offset" = posisi
+# byte setelah item tersebut sehingga job yang dilanjutkan bisa seek langsung ke sana.
+
+HEADER_KEYS = ("mode", "quality", "profile")
+
+_FORMATS = {".yaml": "yaml", ".yml": "yaml", ".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+def detect_format(path: str) -> str:
+    return _FORMATS.get(os.path.splitext(path)[1].lower(), "text")
+
+
+def _lines(f: BinaryIO, start: int, stop: Optional[int] = None) -> Iterator[Tuple[int, int, str]]:
+    """Yield (offset_awal, offset_akhir, baris tanpa newline); berhenti di `stop` bila diberikan."""
+    offset = start
+    for raw in f:
+        if stop is not None and offset + len(raw) > stop:
+            return
+        begin = offset
+        offset += len(raw)
+        yield begin, offset, raw.decode("utf-8", "replace").rstrip("\r\n")
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """
+    Kunci level atas file YAML (mode, quality, profile) tanpa memuat daftar URL.
+    Format lain tidak punya header → {}.
+    """
+    if detect_format(path) != "yaml":
+        return {}
+    header: Dict[str, Any] = {}
+    try:
+        with open(path, "rb") as f:
+            for _b, _e, line in _lines(f, 0):
+                if not line[:1].isalpha():
+                    continue
+                key = line.split(":", 1)[0].strip()
+                if key in HEADER_KEYS:
+                    try:
+                        value = (yaml.safe_load(line) or {}).get(key)
+                    except yaml.YAMLError:
+                        continue
+                    if value is not None:
+                        header[key] = value
+    except FileNotFoundError:
+        pass
+    return header
+
+
+def _yaml_item(lines: List[str], default_profile: Optional[str]) -> Optional[Dict[str, Any]]:
+    try:
+        data = yaml.safe_load("\n".join(lines))
+    except yaml.YAMLError:
+        return None
+    if isinstance(data, list) and data:
+        return parse_entry(data[0], default_profile)
+    return None
+
+
+def _is_flow(urls_line: str) -> bool:
+    """`urls: [a, b]` (daftar flow pendek di satu baris)?"""
+    return urls_line[5:].split(" #", 1)[0].strip().startswith("[")
+
+
+def _flow_entries(line: str, begin: int, end: int, default_profile: Optional[str],
+                  skip: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Entry dari daftar flow pendek `urls: [a, b]`. Semua item ada di satu baris, jadi
+    offset item selain yang terakhir = begin + jumlah item yang sudah lewat (masih di
+    dalam baris); resume dari offset itu melewati item sebanyak selisihnya.
+    """
+    rest = line[5:].split(" #", 1)[0].strip()
+    try:
+        flow = yaml.safe_load(rest) or []
+    except yaml.YAMLError:
+        flow = []
+    entries = [e for e in (parse_entry(raw, default_profile) for raw in flow) if e]
+    for i, entry in enumerate(entries):
+        if i >= skip:
+            entry["offset"] = end if i == len(entries) - 1 else begin + i + 1
+            yield entry
+
+
+def _iter_yaml(f: BinaryIO, start: int, default_profile: Optional[str],
+               stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    in_urls = False
+    if start > 0:
+        # offset resume selalu menunjuk ke dalam daftar urls; baris 'urls:' ada di
+        # header (pendek) dan menentukan apakah daftarnya flow atau blok
+        f.seek(0)
+        for begin, end, line in _lines(f, 0, stop):
+            if line.startswith("urls:"):
+                break
+        else:
+            return
+        if _is_flow(line):
+            if start < end:
+                yield from _flow_entries(line, begin, end, default_profile, skip=start - begin)
+            return
+        f.seek(start)
+        in_urls = True
+    item: List[str] = []
+    item_indent = -1
+    end = start
+    for begin, end, line in _lines(f, start, stop):
+        stripped = line.strip()
+        if not in_urls:
+            if line.startswith("urls:"):
+                in_urls = True
+                if _is_flow(line):
+                    yield from _flow_entries(line, begin, end, default_profile)
+                    in_urls = False
+            continue
+        if not stripped or stripped.startswith("#"):
+            continue
+        indent = len(line) - len(line.lstrip())
+        is_dash = stripped == "-" or stripped.startswith("- ")
+        if indent == 0 and not is_dash:
+            # kunci level atas berikutnya → daftar urls selesai
+            if item:
+                entry = _yaml_item(item, default_profile)
+                if entry:
+                    entry["offset"] = begin
+                    yield entry
+            item, in_urls = [], False
+            continue
+        if is_dash and (item_indent < 0 or indent == item_indent):
+            if item:
+                entry = _yaml_item(item, default_profile)
+                if entry:
+                    entry["offset"] = begin
+                    yield entry
+            item_indent = indent
+            item = [line[indent:]]
+        elif item:
+            item.append(line[item_indent:] if line[:item_indent].strip() == "" else line)
+    if item:
+        entry = _yaml_item(item, default_profile)
+        if entry:
+            entry["offset"] = end
+            yield entry
+
+
+def _iter_text(f: BinaryIO, start: int, default_profile: Optional[str],
+               stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    for _b, end, line in _lines(f, start, stop):
+        url = line.split(" #", 1)[0].strip()
+        if url and not url.startswith("#"):
+            entry = parse_entry(url, default_profile)
+            if entry:
+                entry["offset"] = end
+                yield entry
+
+
+def _iter_jsonl(f: BinaryIO, start: int, default_profile: Optional[str],
+                stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    for _b, end, line in _lines(f, start, stop):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+        except ValueError:
+            continue
+        entry = parse_entry(raw, default_profile)
+        if entry:
+            entry["offset"] = end
+            yield entry
+
+
+def _iter_csv(f: BinaryIO, start: int, default_profile: Optional[str],
+              stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """CSV satu record per baris (field multi-baris tidak didukung)."""
+    lines = _lines(f, 0)
+    columns: Optional[List[str]] = None
+    for _b, end, line in lines:
+        if not line.strip():
+            continue
+        first = next(csv.reader([line]))
+        if "url" in [c.strip().lower() for c in first]:
+            columns = [c.strip().lower() for c in first]
+            header_end = end
+        else:
+            header_end = 0  # tanpa header: kolom pertama = URL
+        break
+    else:
+        return
+    if start > header_end:
+        f.seek(start)
+        lines = _lines(f, start, stop)
+    else:
+        f.seek(header_end)
+        lines = _lines(f, header_end, stop)
+    for _b, end, line in lines:
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        row = next(csv.reader([line]))
+        if columns:
+            raw: Any = {k: v.strip() for k, v in zip(columns, row) if k in ENTRY_KEYS and v.strip()}
+        else:
+            raw = row[0].strip() if row else ""
+        entry = parse_entry(raw, default_profile)
+        if entry:
+            entry["offset"] = end
+            yield entry
+
+
+_READERS = {"yaml": _iter_yaml, "text": _iter_text, "jsonl": _iter_jsonl, "csv": _iter_csv}
+
+
+def iter_entries(path: str, start: int = 0, fmt: Optional[str] = None,
+                 default_profile: Optional[str] = None, stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Baca entry file batch satu per satu (memori konstan).
+    `start` = offset byte dari entry["offset"] sebelumnya (lanjutkan job).
+    `stop`  = batas byte (mis. akhir baris lengkap terakhir saat file masih ditulis).
+    `default_profile` biasanya read_header(path).get("profile").
+    """
+    fmt = fmt or detect_format(path)
+    with open(path, "rb") as f:
+        if start and fmt != "csv":
+            f.seek(start)
+        yield from _READERS[fmt](f, start, default_profile, stop)
+
+
+def chunks(entries: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Potong aliran entry menjadi list berukuran `size` (unit perencanaan & checkpoint)."""
+    buf: List[Dict[str, Any]] = []
+    for entry in entries:
+        buf.append(entry)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+# ===== Checkpoint posisi (resume) =====
+def _checkpoint_path(cfg: Dict[str, Any], path: str) -> str:
+    key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+    return os.path.join(cfg.get("cache_dir", "cache"), "batch-progress", f"{key}.json")
+
+
+def load_checkpoint(cfg: Dict[str, Any], path: str) -> int:
+    """Offset tersimpan untuk file batch ini; 0 bila tidak ada atau file sudah diganti."""
+    try:
+        with open(_checkpoint_path(cfg, path), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        st = os.stat(path)
+    except (OSError, ValueError):
+        return 0
+    offset = int(data.get("offset") or 0)
+    # file yang diganti (inode beda) atau dipotong membuat offset tidak valid
+    if data.get("inode") != st.st_ino or offset > st.st_size:
+        return 0
+    return offset
+
+
+def save_checkpoint(cfg: Dict[str, Any], path: str, offset: int) -> None:
+    cp = _checkpoint_path(cfg, path)
+    try:
+        os.makedirs(os.path.dirname(cp), exist_ok=True)
+        tmp = cp + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"path": os.path.abspath(path), "offset": offset, "inode": os.stat(path).st_ino}, f)
+        os.replace(tmp, cp)
+    except OSError:
+        pass
+
+
+def clear_checkpoint(cfg: Dict[str, Any], path: str) -> None:
+    try:
+        os.remove(_checkpoint_path(cfg, path))
+    except OSError:
+        pass
+
+
+def normalize_quality(mode: str, quality: Optional[str]) -> str:
+    """Quality batch → format string (audio dinormalisasi, preset resolusi diterjemahkan)."""
+    q = (quality or "auto").strip()
+    if mode == "audio":
+        if q.lower() in ("auto", "best", "bestaudio", "bestaudio/best"):
+            return "bestaudio/best"
+        return q
+    return VIDEO_PRESET_FORMATS.get(q.lower(), q)
+
+
+class Group:
+    """Item yang berbagi profil terkompilasi + cookies → satu DownloadSession."""
+
+    def __init__(self, provider: str, profile: DownloadProfile, cookies_path: Optional[str]) -> None:
+        self.provider = provider
+        self.profile = profile
+        self.cookies_path = cookies_path
+        self.items: List[Dict[str, Any]] = []
+
+
+def plan(
+    entries: List[Dict[str, Any]],
+    cfg: Dict[str, Any],
+    mode: str,
+    quality: str,
+    providers: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Group], List[Tuple[Dict[str, Any], str]]]:
+    """
+    Resolusi tiap entry (provider, profil, outtmpl) lalu kelompokkan.
+    Urutan: priority tertinggi dulu; dalam satu tingkat priority, grup berurutan
+    menurut kemunculan item pertamanya dan item di dalam grup mengikuti urutan file.
+    Hasil: (groups, skipped) — skipped berisi (entry, alasan).
+    `providers` (opsional) = cache objek provider yang dipakai ulang antar panggilan.
+    """
+    if providers is None:
+        providers = {}
+    templates = template_table(cfg)
+    groups: Dict[Tuple[int, DownloadProfile, Optional[str]], Group] = {}
+    order: List[Tuple[int, int, Tuple[int, DownloadProfile, Optional[str]]]] = []
+    skipped: List[Tuple[Dict[str, Any], str]] = []
+
+    for pos, entry in enumerate(entries):
+        url = entry["url"]
+        prov = detect_provider(url) or "unknown"
+        if prov not in PROVIDER_CLASS_MAP:
+            skipped.append((entry, "Provider tidak dikenali"))
+            continue
+        section = None
+        if entry.get("section"):
+            try:
+                section = sections.parse(entry["section"])
+            except ValueError as e:
+                skipped.append((entry, str(e)))
+                continue
+        provider_obj = providers.get(prov)
+        if provider_obj is None:
+            provider_obj = providers[prov] = get_provider(prov, cfg)
+
+        if entry.get("profile"):
+            try:
+                profile = compile_named(provider_obj, entry["profile"])
+            except ProfileError as e:
+                skipped.append((entry, str(e)))
+                continue
+        else:
+            item_mode = entry.get("mode") or mode
+            if item_mode not in ("auto", "audio"):
+                skipped.append((entry, f"Mode tidak dikenal: {item_mode}"))
+                continue
+            try:
+                profile = compile_profile(
+                    provider_obj, item_mode,
+                    normalize_quality(item_mode, entry.get("quality") or quality),
+                    cfg.get("audio_format_default", "mp3"),
+                    cfg.get("audio_bitrate_default", "best"),
+                    cfg.get("embed_thumbnail", True),
+                )
+            except ProfileError as e:  # mis. encoder ffmpeg tidak terpasang
+                skipped.append((entry, str(e)))
+                continue
+
+        style_key = "filename_style_audio" if profile.mode == "audio" else "filename_style_video"
+        style_val = profile.filename_style or cfg.get(style_key, "simple")
+        template = templates.get((profile.mode, style_val)) or choose_filename_template(profile.mode, style_val, cfg)
+        outdir = entry.get("output") or cfg.get("output_dir", "downloads")
+        cookies_path = resolve_cookies(cfg, prov)
+
+        key = (entry.get("priority") or 0, profile, cookies_path)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = Group(prov, profile, cookies_path)
+            order.append((-(entry.get("priority") or 0), pos, key))
+        group.items.append({
+            "entry": entry,
+            "url": url,
+            "provider": prov,
+            "provider_obj": provider_obj,
+            "outdir": outdir,
+            "outtmpl": build_outtmpl(outdir, prov, template),
+            "section": section,
+        })
+
+    order.sort(key=lambda t: (t[0], t[1]))
+    return [groups[k] for _, _, k in order], skipped
+
+
+def output_dirs(groups: List[Group]) -> List[str]:
+    """Direktori output unik (untuk sweep file yatim sebelum batch)."""
+    seen: Dict[str, None] = {}
+    for g in groups:
+        for item in g.items:
+            seen.setdefault(os.path.abspath(item["outdir"]), None)
+    return list(seen)
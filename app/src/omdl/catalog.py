@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .dedup import full_hash, quick_hash
+
+try:  # ekspor Parquet opsional
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Katalog lokal hasil unduhan (SQLite, WAL): satu baris per file final dengan
+# field info_dict yang dipangkas. Semua jalur "punya X?" memakai indeks —
+# URL / (provider, id) / id / hash lewat B-tree, judul & uploader lewat FTS5 —
+# jadi query tetap milidetik pada jutaan baris tanpa menelusuri filesystem
+# atau ffprobe file. `omdl catalog export` menulis Parquet (pyarrow) / JSONL.
+
+COLUMNS = (
+    "path", "provider", "video_id", "variant", "url", "webpage_url", "title", "uploader",
+    "upload_date", "duration", "ext", "vcodec", "acodec", "width", "height", "size", "hash", "added",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    path        TEXT PRIMARY KEY,
+    provider    TEXT NOT NULL,
+    video_id    TEXT NOT NULL,
+    variant     TEXT,
+    url         TEXT,
+    webpage_url TEXT,
+    title       TEXT,
+    uploader    TEXT,
+    upload_date TEXT,
+    duration    REAL,
+    ext         TEXT,
+    vcodec      TEXT,
+    acodec      TEXT,
+    width       INTEGER,
+    height      INTEGER,
+    size        INTEGER,
+    hash        TEXT,
+    added       REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_source ON items(provider, video_id);
+CREATE INDEX IF NOT EXISTS items_video_id ON items(video_id);
+CREATE INDEX IF NOT EXISTS items_url ON items(url);
+CREATE INDEX IF NOT EXISTS items_webpage_url ON items(webpage_url);
+CREATE INDEX IF NOT EXISTS items_hash ON items(hash);
+CREATE INDEX IF NOT EXISTS items_added ON items(added);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    title, uploader, content='items', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts(rowid, title, uploader) VALUES (new.rowid, new.title, new.uploader);
+END;
+CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts(items_fts, rowid, title, uploader) VALUES ('delete', old.rowid, old.title, old.uploader);
+END;
+CREATE TRIGGER IF NOT EXISTS items_au AFTER UPDATE ON items BEGIN
+    INSERT INTO items_fts(items_fts, rowid, title, uploader) VALUES ('delete', old.rowid, old.title, old.uploader);
+    INSERT INTO items_fts(rowid, title, uploader) VALUES (new.rowid, new.title, new.uploader);
+END;
+"""
+
+_HEX = re.compile(r"[0-9a-f]{32}|[0-9a-f]{64}")
+
+
+class CatalogError(Exception):
+    """Katalog tidak bisa dibuka / diekspor."""
+
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _codec(value: Any) -> Optional[str]:
+    return None if value in (None, "none") else str(value)
+
+
+def _fts_query(text: str) -> str:
+    """Kata bebas → query FTS5 (semua kata wajib, masing-masing sebagai prefix)."""
+    return " ".join(f'"{w}"*' for w in re.findall(r"\w+", text))
+
+
+class Catalog:
+    """Katalog SQLite hasil unduhan (aman dipakai bersama antar thread)."""
+
+    def __init__(self, db_path: str, hash_mode: str = "quick") -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.hash_mode = hash_mode
+        self._lock = threading.Lock()
+        try:
+            self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")  # `omdl catalog query` tetap bisa baca saat batch menulis
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+        except sqlite3.Error as e:
+            raise CatalogError(f"Katalog {db_path} tidak bisa dibuka: {e}") from e
+        try:
+            self._db.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:  # SQLite tanpa FTS5 → pencarian judul lewat LIKE
+            self.fts = False
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # ===== Tulis =====
+
+    def _hash(self, path: str, size: int) -> Optional[str]:
+        if self.hash_mode == "full":
+            return full_hash(path)
+        if self.hash_mode == "quick":
+            return quick_hash(path, size)
+        return None
+
+    def row_for(self, entry: Dict[str, Any], path: str, provider: str, variant: str,
+                url: Optional[str] = None, acodec: Optional[str] = None) -> Dict[str, Any]:
+        """Field info_dict yang dipangkas untuk satu file final."""
+        path = os.path.abspath(path)
+        size = os.path.getsize(path)
+        return {
+            "path": path,
+            "provider": provider,
+            "video_id": str(entry.get("id") or ""),
+            "variant": variant,
+            "url": url,
+            "webpage_url": entry.get("webpage_url") or entry.get("original_url"),
+            "title": entry.get("title"),
+            "uploader": entry.get("uploader") or entry.get("channel") or entry.get("creator"),
+            "upload_date": entry.get("upload_date"),
+            "duration": _float(entry.get("duration")),
+            "ext": os.path.splitext(path)[1][1:] or entry.get("ext"),
+            "vcodec": _codec(entry.get("vcodec")) if variant != "audio" else None,
+            "acodec": acodec or _codec(entry.get("acodec")),
+            "width": _int(entry.get("width")) if variant != "audio" else None,
+            "height": _int(entry.get("height")) if variant != "audio" else None,
+            "size": size,
+            "hash": self._hash(path, size),
+            "added": time.time(),
+        }
+
+    def add_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """Upsert baris (per path) dalam satu transaksi."""
+        if not rows:
+            return
+        cols = ", ".join(COLUMNS)
+        marks = ", ".join("?" for _ in COLUMNS)
+        updates = ", ".join(f"{c}=excluded.{c}" for c in COLUMNS if c != "path")
+        try:
+            with self._lock:
+                with self._db:
+                    self._db.executemany(
+                        f"INSERT INTO items({cols}) VALUES ({marks}) ON CONFLICT(path) DO UPDATE SET {updates}",
+                        [tuple(r.get(c) for c in COLUMNS) for r in rows],
+                    )
+        except sqlite3.Error as e:
+            raise CatalogError(f"Gagal menulis katalog: {e}") from e
+
+    # ===== Baca =====
+
+    def _select(self, where: str, args: Tuple[Any, ...], limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            cur = self._db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM items WHERE {where} ORDER BY added DESC LIMIT ?",
+                (*args, limit),
+            )
+            return [dict(zip(COLUMNS, row)) for row in cur.fetchall()]
+
+    def by_url(self, url: str, limit: int = 50) -> List[Dict[str, Any]]:
+        return self._select("url=? OR webpage_url=?", (url, url), limit)
+
+    def by_id(self, video_id: str, provider: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        if provider:
+            return self._select("provider=? AND video_id=?", (provider, video_id), limit)
+        return self._select("video_id=?", (video_id,), limit)
+
+    def by_hash(self, digest: str, limit: int = 50) -> List[Dict[str, Any]]:
+        return self._select("hash=?", (digest.lower(),), limit)
+
+    def search(self, text: str, provider: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Cari kata di judul/uploader (FTS5; LIKE bila FTS5 tidak tersedia)."""
+        prov_sql, prov_args = (" AND provider=?", (provider,)) if provider else ("", ())
+        if self.fts:
+            q = _fts_query(text)
+            if not q:
+                return []
+            return self._select(f"rowid IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?){prov_sql}",
+                                (q, *prov_args), limit)
+        like = f"%{text}%"
+        return self._select(f"(title LIKE ? OR uploader LIKE ?){prov_sql}", (like, like, *prov_args), limit)
+
+    def query(self, term: str, provider: Optional[str] = None, limit: int = 50) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        "Punya X?": URL → cocokkan url/webpage_url (lalu id hasil regex extractor),
+        hex 32/64 → hash, selain itu id video persis, lalu teks judul/uploader.
+        Kembalikan (cara cocok, baris).
+        """
+        term = term.strip()
+        if re.match(r"https?://", term):
+            rows = self.by_url(term, limit)
+            if rows:
+                return "url", rows
+            prov, vid = _id_from_url(term)
+            if vid:
+                return "id", self.by_id(vid, provider or prov, limit)
+            return "url", []
+        if _HEX.fullmatch(term.lower()):
+            rows = self.by_hash(term, limit)
+            if rows:
+                return "hash", rows
+        rows = self.by_id(term, provider, limit)
+        if rows:
+            return "id", rows
+        return "judul", self.search(term, provider, limit)
+
+    def stats(self) -> List[Tuple[str, int, int, float]]:
+        """(provider, jumlah, total byte, total durasi detik) per provider."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT provider, COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(duration), 0) "
+                "FROM items GROUP BY provider ORDER BY provider"
+            ).fetchall()
+
+    def iter_rows(self, batch: int = 50000) -> Iterator[List[Dict[str, Any]]]:
+        """Semua baris per potongan (urut rowid) untuk ekspor."""
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    f"SELECT rowid, {', '.join(COLUMNS)} FROM items WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last, batch),
+                ).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            yield [dict(zip(COLUMNS, r[1:])) for r in rows]
+
+    def prune(self) -> int:
+        """Hapus baris yang file-nya sudah tidak ada di disk."""
+        gone = [r["path"] for chunk in self.iter_rows() for r in chunk if not os.path.exists(r["path"])]
+        with self._lock:
+            with self._db:
+                self._db.executemany("DELETE FROM items WHERE path=?", [(p,) for p in gone])
+        return len(gone)
+
+    def export(self, out_path: str) -> int:
+        """Tulis seluruh katalog ke .parquet (butuh pyarrow) atau .jsonl. Kembalikan jumlah baris."""
+        n = 0
+        if out_path.endswith(".parquet"):
+            if pq is None:
+                raise CatalogError("Ekspor Parquet butuh pyarrow (pip install pyarrow); pakai .jsonl sebagai gantinya")
+            schema = pa.schema([
+                (c, pa.float64() if c in ("duration", "added") else
+                 pa.int64() if c in ("width", "height", "size") else pa.string())
+                for c in COLUMNS
+            ])
+            with pq.ParquetWriter(out_path, schema) as writer:
+                for chunk in self.iter_rows():
+                    writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                    n += len(chunk)
+            return n
+        with open(out_path, "w", encoding="utf-8") as f:
+            for chunk in self.iter_rows():
+                for row in chunk:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                n += len(chunk)
+        return n
+
+
+def _id_from_url(url: str) -> Tuple[Optional[str], Optional[str]]:
+    """(provider, id) dari regex _VALID_URL extractor yt-dlp — tanpa jaringan."""
+    from yt_dlp.extractor import gen_extractor_classes
+
+    from .utils import detect_provider
+
+    provider = detect_provider(url)
+    classes = [ie for ie in gen_extractor_classes() if ie.ie_key() != "Generic"]
+    if provider:
+        # extractor milik provider dicoba dulu; sisanya hanya bila tidak ada yang cocok
+        own = [ie for ie in classes if ie.ie_key().lower().startswith(provider)]
+        classes = own + [ie for ie in classes if ie not in own]
+    for ie in classes:
+        try:
+            if ie.suitable(url):
+                return provider, str(ie.get_temp_id(url) or "") or None
+        except Exception:
+            continue
+    return provider, None
+
+
+_CATALOGS: Dict[str, Catalog] = {}
+_CATALOGS_LOCK = threading.Lock()
+
+
+def db_path(cfg: Dict[str, Any]) -> str:
+    return cfg.get("catalog_db") or os.path.join(cfg.get("cache_dir", "cache"), "catalog.sqlite")
+
+
+def catalog_for(cfg: Dict[str, Any]) -> Optional[Catalog]:
+    """Catalog bersama untuk konfigurasi ini, atau None bila catalog_enabled=false."""
+    if not cfg.get("catalog_enabled", True):
+        return None
+    path = db_path(cfg)
+    with _CATALOGS_LOCK:
+        cat = _CATALOGS.get(path)
+        if cat is None:
+            cat = _CATALOGS[path] = Catalog(path, str(cfg.get("catalog_hash") or "quick").lower())
+        return cat
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import json
 import os
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
 import typer
+from yt_dlp.utils import parse_duration
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
@@ -11,30 +13,21 @@ from rich.prompt import Confirm
 from rich import print as rprint
 from rich import box
 
+from . import sections
+from . import subtitles
 from .config_loader import load_config, load_provider_cfg
 from .providers import PROVIDER_CLASS_MAP
 from .downloader import run_download
 from .output import build_outtmpl, choose_filename_template
+from .profiles import VIDEO_PRESET_FORMATS, AUDIO_BITRATE_PRESETS, ProfileError, compile_named, compile_profile, quality_for_preset
 from .utils import check_ffmpeg, detect_provider, shorten_path, provider_badge
 
 app = typer.Typer(help="Online Media Downloader (yt-dlp wrapper)")
 console = Console()
 
 
-VIDEO_PRESETS: Dict[str, str] = {
-    "1080p": "bestvideo[height<=1080]+bestaudio/best[height<=1080]",
-    "720p":  "bestvideo[height<=720]+bestaudio/best[height<=720]",
-    "480p":  "bestvideo[height<=480]+bestaudio/best[height<=480]",
-    "360p":  "bestvideo[height<=360]+bestaudio/best[height<=360]",
-    "240p":  "bestvideo[height<=240]+bestaudio/best[height<=240]",
-    "144p":  "bestvideo[height<=144]+bestaudio/best[height<=144]",
-}
-
-AUDIO_PRESETS: Dict[str, str] = {
-    "320": "320",
-    "192": "192",
-    "128": "128",
-}
+VIDEO_PRESETS: Dict[str, str] = VIDEO_PRESET_FORMATS
+AUDIO_PRESETS: Dict[str, str] = AUDIO_BITRATE_PRESETS
 
 VALID_MODES = {"auto", "audio"}
 
@@ -50,35 +43,36 @@ def _resolve_cookies(cfg: dict, provider: str) -> Optional[str]:
 
 def _apply_presets_for_cli(mode: str,
                            preset: Optional[str],
-                           quality: Optional[str],
-                           audio_quality_cfg: str) -> tuple[str, Optional[str]]:
-    """
-    Kembalikan (format_string, audio_quality_override).
-    - mode 'audio': preset 320/192/128 → audio_quality_override; format_string 'bestaudio/best' bila quality=auto.
-    - mode 'auto' : preset resolusi → format_string.
-    """
-    fmt = quality or "auto"
-    aq_override: Optional[str] = None
-
-    if mode == "audio":
-        if preset:
-            key = preset.strip().replace("kbps","").replace("Kbps","").replace("k","")
-            if key in AUDIO_PRESETS:
-                aq_override = AUDIO_PRESETS[key]
-                if fmt in ("auto", None):
-                    fmt = "bestaudio/best"
-        else:
-            if fmt in ("auto", None):
-                fmt = "bestaudio/best"
-    else:
-        if preset:
-            p = preset.strip().lower()
-            if p in VIDEO_PRESETS:
-                fmt = VIDEO_PRESETS[p]
-
-    return fmt, aq_override
-
-def _summary_panel(url: str, provider: str, mode: str, fmt: str, audio_quality: str, style: str, outtmpl: str) -> Panel:
+                           quality: Optional[str]) -> tuple[str, Optional[str]]:
+    """Lihat profiles.quality_for_preset (tabel preset dipakai bersama menu)."""
+    return quality_for_preset(mode, preset, quality)
+
+def _apply_subtitle_opts(cfg: dict, subs: Optional[str], sub_format: Optional[str],
+                         auto_subs: Optional[str], embed_subs: Optional[bool]) -> Optional[List[str]]:
+    """Opsi --subs/--sub-format/--auto-subs/--embed-subs → cfg. Kembalikan bahasa dari --subs."""
+    langs = [s.strip() for s in subs.split(",") if s.strip()] if subs else None
+    if sub_format and sub_format.lower() not in subtitles.FORMATS:
+        raise typer.BadParameter(f"--sub-format harus {'|'.join(subtitles.FORMATS)}.")
+    if auto_subs and auto_subs.lower() not in subtitles.AUTO_MODES:
+        raise typer.BadParameter(f"--auto-subs harus {'|'.join(subtitles.AUTO_MODES)}.")
+    if langs or sub_format or auto_subs or embed_subs:
+        cfg["subtitles"] = True
+    if langs:
+        cfg["subtitle_langs"] = langs
+    if sub_format:
+        cfg["subtitle_format"] = sub_format.lower()
+    if auto_subs:
+        cfg["subtitle_auto"] = auto_subs.lower()
+    if embed_subs is not None:
+        cfg["subtitle_embed"] = embed_subs
+    return langs
+
+def _subtitle_label(cfg: dict, langs: List[str]) -> str:
+    embed = ", embed" if cfg.get("subtitle_embed") else ""
+    return f"{','.join(langs)} ({cfg.get('subtitle_format', 'srt')}, auto-caption {cfg.get('subtitle_auto', 'fallback')}{embed})"
+
+def _summary_panel(url: str, provider: str, mode: str, fmt: str, audio_quality: str, style: str, outtmpl: str,
+                   section: Optional[sections.Section] = None, subs: Optional[str] = None) -> Panel:
     tbl = Table.grid(padding=(0,1))
     tbl.add_column(justify="right", style="dim")
     tbl.add_column()
@@ -88,6 +82,10 @@ def _summary_panel(url: str, provider: str, mode: str, fmt: str, audio_quality:
     tbl.add_row("Quality", f"{fmt}")
     tbl.add_row("Audio bitrate", f"{audio_quality}")
     tbl.add_row("Filename style", f"{style}")
+    if section is not None:
+        tbl.add_row("Section", sections.label(section))
+    if subs:
+        tbl.add_row("Subtitle", subs)
     tbl.add_row("Output", f"[dim]{shorten_path(outtmpl, 88)}[/dim]")
     return Panel(tbl, title="Ringkasan", border_style="cyan", box=box.ROUNDED)
 
@@ -103,34 +101,76 @@ def _do_download(provider: str,
                  audio_quality: Optional[str],
                  embed_thumbnail: Optional[bool],
                  name_style: Optional[str],
-                 preset: Optional[str]) -> None:
+                 preset: Optional[str],
+                 profile: Optional[str] = None,
+                 section: Optional[str] = None,
+                 max_duration: Optional[str] = None,
+                 wait_live: Optional[bool] = None,
+                 subs: Optional[str] = None,
+                 sub_format: Optional[str] = None,
+                 auto_subs: Optional[str] = None,
+                 embed_subs: Optional[bool] = None) -> None:
 
     if mode not in VALID_MODES:
         raise typer.BadParameter("Mode harus 'auto' atau 'audio'.")
+    try:
+        clip = sections.parse(section) if section else None
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    limit = None
+    if max_duration:
+        limit = parse_duration(max_duration)
+        if limit is None or limit <= 0:
+            raise typer.BadParameter(f"Durasi tidak dikenali: {max_duration!r} (contoh: 90m, 2h, 1:30:00)")
 
     base_dir = os.getcwd()
     cfg = load_config(base_dir)
+    sub_langs = _apply_subtitle_opts(cfg, subs, sub_format, auto_subs, embed_subs)
 
     if not check_ffmpeg():
         rprint(Panel.fit("[red]ffmpeg tidak ditemukan. Install ffmpeg terlebih dahulu.[/red]"))
         raise typer.Exit(code=1)
 
     provider_obj = _get_provider(provider, cfg)
+    if sub_langs:
+        provider_obj.provider_cfg["subtitle_langs"] = sub_langs  # --subs menang atas config provider
     cookies_path = cookies or _resolve_cookies(cfg, provider)
 
+    # profil bernama menggantikan mode/quality/preset/audio_*
+    prof = None
+    if profile:
+        try:
+            prof = compile_named(provider_obj, profile)
+        except ProfileError as e:
+            raise typer.BadParameter(str(e))
+        mode = prof.mode
+
     # filename template
-    style = (name_style or (cfg.get("filename_style_audio") if mode == "audio" else cfg.get("filename_style_video")) or "simple")
+    style = (name_style or (prof.filename_style if prof else None)
+             or (cfg.get("filename_style_audio") if mode == "audio" else cfg.get("filename_style_video")) or "simple")
     template = filename_template_cli or choose_filename_template(mode, style, cfg)
 
     outdir = output or cfg.get("output_dir", "downloads")
     outtmpl = build_outtmpl(outdir, provider, template)
 
     # preset/quality handling
-    fmt, aq_override = _apply_presets_for_cli(mode, preset, quality, cfg.get("audio_bitrate_default", "best"))
-    aq_final = audio_quality or aq_override or cfg.get("audio_bitrate_default", "best")
+    if prof:
+        fmt, aq_final = prof.format, (prof.audio_quality or "-")
+    else:
+        fmt, aq_override = _apply_presets_for_cli(mode, preset, quality)
+        aq_final = audio_quality or aq_override or cfg.get("audio_bitrate_default", "best")
+        # kompilasi sekarang: encoder/muxer ffmpeg yang hilang ketahuan sebelum konfirmasi & unduh
+        try:
+            prof = compile_profile(provider_obj, mode, fmt, audio_codec, aq_final, embed_thumbnail)
+        except ProfileError as e:
+            rprint(Panel.fit(f"[red]{e}[/red]"))
+            raise typer.Exit(code=1)
 
     # Tampilkan ringkasan yang rapi sebelum mulai
-    rprint(_summary_panel(url, provider, mode, fmt, aq_final, style, outtmpl))
+    sub_label = _subtitle_label(cfg, provider_obj.subtitle_langs()) \
+        if cfg.get("subtitles") and provider_obj.subtitle_langs() else None
+    rprint(_summary_panel(url, provider, mode, fmt, aq_final, style,
+                          sections.outtmpl(outtmpl, clip) if clip else outtmpl, clip, sub_label))
     if not Confirm.ask("Lanjutkan unduh?", default=True):
         raise typer.Exit(code=0)
         
@@ -148,6 +188,10 @@ def _do_download(provider: str,
         audio_codec=audio_codec,
         audio_quality=aq_final,
         embed_thumbnail=embed_thumbnail,
+        profile=prof,
+        section=clip,
+        max_duration=limit,
+        wait_for_start=wait_live,
     )
 
 @app.command("menu")
@@ -162,6 +206,365 @@ def settings_cmd():
     from .menu import settings_menu
     settings_menu()
 
+@app.command("probe")
+def probe_cmd(
+    urls: Optional[List[str]] = typer.Argument(None, help="URL yang akan di-probe"),
+    batch_file: Optional[str] = typer.Option(None, "--file", help="Ambil URL (dan mode/quality) dari file batch YAML"),
+    mode: Optional[str] = typer.Option(None, "--mode", help="auto|audio"),
+    quality: Optional[str] = typer.Option(None, "--quality", help="auto|best|<format yt-dlp>"),
+    workers: Optional[int] = typer.Option(None, "--workers", help="Jumlah ekstraksi paralel (default probe_concurrency)"),
+    json_out: Optional[str] = typer.Option(None, "--json", help="Tulis hasil probe ke file JSON"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Jangan simpan metadata ke cache unduhan"),
+):
+    """Ekstrak metadata saja (tanpa unduh): estimasi ukuran, durasi, URL mati."""
+    from .menu import _read_batch_file
+    from .probe import probe_urls, results_table, summarize
+
+    cfg = load_config(os.getcwd())
+    url_list = list(urls or [])
+    file_mode, file_quality = "auto", "auto"
+    if batch_file:
+        file_entries, file_mode, file_quality = _read_batch_file(batch_file)
+        url_list.extend(e["url"] for e in file_entries)
+    if not url_list:
+        raise typer.BadParameter("Berikan URL atau --file.")
+    mode = (mode or file_mode).lower()
+    if mode not in VALID_MODES:
+        raise typer.BadParameter("Mode harus 'auto' atau 'audio'.")
+    quality = quality or file_quality
+
+    with console.status(f"Probe {len(url_list)} URL…") as status:
+        done = 0
+
+        def _tick(_res):
+            nonlocal done
+            done += 1
+            status.update(f"Probe {done}/{len(url_list)} URL…")
+
+        results = probe_urls(url_list, cfg, mode, quality, workers=workers,
+                             on_result=_tick, seed_cache=not no_cache)
+    console.print(results_table(results))
+    if json_out:
+        with open(json_out, "w", encoding="utf-8") as f:
+            json.dump({"summary": summarize(results), "results": results}, f, indent=2, ensure_ascii=False)
+        console.print(f"[dim]Hasil probe: {shorten_path(json_out, 88)}[/dim]")
+    if summarize(results)["failed"]:
+        raise typer.Exit(code=2)
+
+@app.command("watch")
+def watch_cmd(
+    path: Optional[str] = typer.Argument(None, help="File batch yang diikuti (default batch_downloads.yaml)"),
+    drop_dir: Optional[str] = typer.Option(None, "--dir", help="Folder drop: file batch baru diunduh lalu dipindah ke done/"),
+    mode: Optional[str] = typer.Option(None, "--mode", help="auto|audio (default dari file batch)"),
+    quality: Optional[str] = typer.Option(None, "--quality", help="auto|best|<format yt-dlp>"),
+    from_start: bool = typer.Option(False, "--from-start", help="Unduh juga URL yang sudah ada di file saat mulai"),
+    poll: Optional[float] = typer.Option(None, "--poll", help="Interval polling (detik) bila inotify tidak tersedia"),
+):
+    """Daemon: ikuti file batch / folder drop dan unduh URL baru terus-menerus."""
+    from . import watch
+    from .menu import _batch_header, _print_batch_report, _run_group, _start_metrics
+    from .timing import BatchReport
+
+    base_dir = os.getcwd()
+    cfg = load_config(base_dir)
+    if not check_ffmpeg():
+        rprint(Panel.fit("[red]ffmpeg tidak ditemukan. Install ffmpeg terlebih dahulu.[/red]"))
+        raise typer.Exit(code=1)
+    if path is None and drop_dir is None:
+        path = os.path.join(base_dir, "batch_downloads.yaml")
+    file_mode, file_quality = "auto", "auto"
+    if path and os.path.exists(path):
+        file_mode, file_quality, _profile = _batch_header(path)
+    mode = (mode or file_mode).lower()
+    if mode not in VALID_MODES:
+        raise typer.BadParameter("Mode harus 'auto' atau 'audio'.")
+
+    report = BatchReport()
+    done = 0
+
+    def _label(_item) -> str:
+        nonlocal done
+        done += 1
+        return f"Watch #{done}"
+
+    def _on_batch(groups, pool) -> None:
+        for group in groups:
+            _run_group(group, pool.get(group.profile, group.cookies_path), report, None, _label)
+        console.print("[dim]Menunggu URL baru… (Ctrl+C untuk berhenti)[/dim]")
+
+    _start_metrics(cfg)
+    targets = " + ".join(shorten_path(p, 60) for p in (path, drop_dir) if p)
+    try:
+        watch.run(cfg, path, drop_dir, mode, quality or file_quality, _on_batch,
+                  from_start=from_start, poll_interval=poll,
+                  notice=lambda msg: console.print(f"[dim]watch: {msg}[/dim]"))
+    except KeyboardInterrupt:
+        console.print(f"\n[cyan]Berhenti memantau {targets}.[/cyan]")
+    _print_batch_report(report, cfg)
+
+@app.command("serve")
+def serve_cmd(
+    host: Optional[str] = typer.Option(None, "--host", help="Alamat bind (default serve_host, 127.0.0.1)"),
+    port: Optional[int] = typer.Option(None, "--port", help="Port HTTP (default serve_port)"),
+    socket_path: Optional[str] = typer.Option(None, "--socket", help="Layani lewat Unix socket, bukan TCP"),
+    workers: Optional[int] = typer.Option(None, "--workers", help="Jumlah unduhan paralel"),
+    mode: str = typer.Option("auto", "--mode", help="Mode default job tanpa 'mode'/'profile': auto|audio"),
+    quality: str = typer.Option("auto", "--quality", help="Kualitas default job tanpa 'quality'"),
+):
+    """Server job lokal: kirim, pantau (SSE) dan batalkan unduhan lewat HTTP."""
+    from . import server
+    from .menu import _start_metrics
+
+    cfg = load_config(os.getcwd())
+    if not check_ffmpeg():
+        rprint(Panel.fit("[red]ffmpeg tidak ditemukan. Install ffmpeg terlebih dahulu.[/red]"))
+        raise typer.Exit(code=1)
+    mode = mode.lower()
+    if mode not in VALID_MODES:
+        raise typer.BadParameter("Mode harus 'auto' atau 'audio'.")
+
+    jobs = server.JobServer(
+        cfg,
+        workers=workers or int(cfg.get("serve_workers", 2) or 2),
+        keep=int(cfg.get("serve_keep_jobs", 1000) or 1000),
+        mode=mode, quality=quality,
+    )
+    try:
+        httpd, addr = server.start(
+            jobs,
+            host=host or cfg.get("serve_host", "127.0.0.1"),
+            port=port if port is not None else int(cfg.get("serve_port", 9465)),
+            socket_path=socket_path or cfg.get("serve_socket"),
+        )
+    except OSError as e:
+        rprint(Panel.fit(f"[red]Server gagal dijalankan: {e}[/red]"))
+        raise typer.Exit(code=1)
+    _start_metrics(cfg)
+    console.print(Panel.fit(
+        f"[bold]omdl serve[/bold] di [cyan]{addr}[/cyan]\n"
+        "POST /jobs · GET /jobs/<id> · GET /jobs/<id>/events · DELETE /jobs/<id>",
+        border_style="cyan"))
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        console.print("\n[cyan]Server dihentikan.[/cyan]")
+    finally:
+        jobs.shutdown()
+        httpd.server_close()
+        if socket_path or cfg.get("serve_socket"):
+            try:
+                os.remove(socket_path or cfg.get("serve_socket"))
+            except OSError:
+                pass
+
+replay_app = typer.Typer(help="Fixture ekstraksi terekam untuk uji & benchmark tanpa jaringan")
+app.add_typer(replay_app, name="replay")
+
+@replay_app.command("record")
+def replay_record_cmd(
+    urls: Optional[List[str]] = typer.Argument(None, help="URL yang direkam"),
+    batch_file: Optional[str] = typer.Option(None, "--file", help="Ambil URL dari file batch"),
+    fixtures: Optional[str] = typer.Option(None, "--dir", help="Folder fixture (default replay_dir)"),
+    max_bytes: Optional[int] = typer.Option(None, "--max-bytes", help="Byte per format yang disimpan (0 = utuh; default replay_max_bytes)"),
+):
+    """Ekstrak URL (online) sekali dan simpan info_dict + byte media sebagai fixture."""
+    from . import replay
+    from .menu import _read_batch_file
+    from .timing import format_bytes
+
+    cfg = load_config(os.getcwd())
+    url_list = list(urls or [])
+    if batch_file:
+        url_list.extend(e["url"] for e in _read_batch_file(batch_file)[0])
+    if not url_list:
+        raise typer.BadParameter("Berikan URL atau --file.")
+    root = fixtures or cfg.get("replay_dir", "fixtures")
+
+    tbl = Table(title=f"Fixture • {shorten_path(root, 60)}", show_header=True, header_style="bold cyan",
+                expand=True, box=box.ROUNDED)
+    tbl.add_column("Provider", width=12)
+    tbl.add_column("Judul / error")
+    tbl.add_column("Format", justify="right", width=7)
+    tbl.add_column("Ukuran", justify="right", width=10)
+    with console.status(f"Merekam {len(url_list)} URL…"):
+        results = replay.record(url_list, cfg, root, max_bytes,
+                                log=lambda msg: console.print(f"[dim]replay: {msg}[/dim]"))
+    for res in results:
+        prov = res["provider"] or "-"
+        badge = provider_badge(prov) if prov in PROVIDER_CLASS_MAP else prov
+        if res["ok"]:
+            tbl.add_row(badge, str(res.get("title") or res["url"]), str(res["formats"]), format_bytes(res["bytes"]))
+        else:
+            tbl.add_row(badge, f"[red]{res['error']}[/red]", "-", "-")
+    console.print(tbl)
+    if any(not r["ok"] for r in results):
+        raise typer.Exit(code=2)
+
+@replay_app.command("run")
+def replay_run_cmd(
+    fixtures: Optional[str] = typer.Option(None, "--dir", help="Folder fixture (default replay_dir)"),
+    provider: Optional[str] = typer.Option(None, "--provider", help="Hanya fixture provider ini"),
+    mode: str = typer.Option("auto", "--mode", help="auto|audio"),
+    quality: str = typer.Option("auto", "--quality", help="auto|best|<format yt-dlp>"),
+    profile: Optional[str] = typer.Option(None, "--profile", help="Profil bernama dari config"),
+    output: Optional[str] = typer.Option(None, "--output", help="Simpan hasil di sini (default folder sementara, dihapus)"),
+    repeat: int = typer.Option(1, "--repeat", min=1, help="Ulangi tiap URL N kali (benchmark p50/p95)"),
+):
+    """Jalankan run_download untuk semua fixture lewat server lokal, tanpa jaringan."""
+    import shutil
+    import tempfile
+
+    from . import replay
+    from .menu import _print_batch_report
+    from .timing import BatchReport
+
+    mode = mode.lower()
+    if mode not in VALID_MODES:
+        raise typer.BadParameter("Mode harus 'auto' atau 'audio'.")
+    cfg = load_config(os.getcwd())
+    if not check_ffmpeg():
+        rprint(Panel.fit("[red]ffmpeg tidak ditemukan. Install ffmpeg terlebih dahulu.[/red]"))
+        raise typer.Exit(code=1)
+    root = fixtures or cfg.get("replay_dir", "fixtures")
+    scratch = tempfile.mkdtemp(prefix="omdl-replay-")
+    # cache, indeks dedup & katalog terpisah: hasil run tidak bercampur dengan unduhan sungguhan
+    run_cfg = dict(cfg, cache_dir=os.path.join(scratch, "cache"), info_cache_ttl=0, catalog_db=None)
+    outdir = output or os.path.join(scratch, "out")
+
+    report = BatchReport()
+    failed = 0
+    try:
+        with replay.Replay(root) as rp:
+            url_list = rp.urls(provider)
+            if not url_list:
+                raise typer.BadParameter(f"Tidak ada fixture untuk provider {provider!r}.")
+            console.print(f"[dim]Replay {len(url_list)} fixture dari {rp.base_url}[/dim]")
+            for url in url_list:
+                prov = rp.fixtures[url]["provider"]
+                provider_obj = _get_provider(prov, run_cfg)
+                try:
+                    prof = compile_named(provider_obj, profile) if profile else None
+                except ProfileError as e:
+                    raise typer.BadParameter(str(e))
+                run_mode = prof.mode if prof else mode
+                template = choose_filename_template(
+                    run_mode, cfg.get("filename_style_audio" if run_mode == "audio" else "filename_style_video")
+                    or "simple", cfg)
+                for n in range(repeat):
+                    # tiap pengulangan ke folder sendiri agar bukan "sudah ada"
+                    outtmpl = build_outtmpl(os.path.join(outdir, str(n)) if repeat > 1 else outdir, prov, template)
+                    try:
+                        run_download(provider_name=prov, provider_obj=provider_obj, url=url, mode=run_mode,
+                                     quality=quality, outtmpl=outtmpl, cookies_path=None, audio_codec=None,
+                                     audio_quality=None, report=report, profile=prof, headless=True)
+                        console.print(f"[green]✓[/green] {provider_badge(prov)} {url}")
+                    except Exception as e:
+                        failed += 1
+                        console.print(f"[red]✗[/red] {provider_badge(prov)} {url}: {e}")
+    except replay.ReplayError as e:
+        rprint(Panel.fit(f"[red]{e}[/red]"))
+        raise typer.Exit(code=1)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    _print_batch_report(report, cfg)
+    if failed:
+        raise typer.Exit(code=2)
+
+catalog_app = typer.Typer(help="Katalog lokal hasil unduhan (SQLite)")
+app.add_typer(catalog_app, name="catalog")
+
+def _open_catalog(cfg: dict):
+    from . import catalog
+
+    if not os.path.exists(catalog.db_path(cfg)):
+        rprint(Panel.fit(f"[yellow]Katalog belum ada: {catalog.db_path(cfg)}[/yellow]"))
+        raise typer.Exit(code=1)
+    try:
+        return catalog.Catalog(catalog.db_path(cfg))
+    except catalog.CatalogError as e:
+        rprint(Panel.fit(f"[red]{e}[/red]"))
+        raise typer.Exit(code=1)
+
+@catalog_app.command("query")
+def catalog_query_cmd(
+    term: str = typer.Argument(..., help="URL, id video, hash isi, atau kata dari judul/uploader"),
+    provider: Optional[str] = typer.Option(None, "--provider", help="Batasi ke provider ini"),
+    limit: int = typer.Option(20, "--limit", min=1, help="Maksimum baris"),
+    as_json: bool = typer.Option(False, "--json", help="Cetak JSON (satu objek per baris)"),
+):
+    """Jawab "sudah punya X?" dari katalog (exit 1 bila tidak ada)."""
+    import time
+
+    from .timing import format_bytes
+
+    cat = _open_catalog(load_config(os.getcwd()))
+    t0 = time.perf_counter()
+    how, rows = cat.query(term, provider, limit)
+    took = (time.perf_counter() - t0) * 1000
+    if as_json:
+        for row in rows:
+            typer.echo(json.dumps(row, ensure_ascii=False))
+    elif rows:
+        tbl = Table(title=f"Cocok lewat {how} • {len(rows)} hasil • {took:.1f} ms", show_header=True,
+                    header_style="bold cyan", expand=True, box=box.ROUNDED)
+        tbl.add_column("Provider", width=12)
+        tbl.add_column("Judul")
+        tbl.add_column("Codec", width=14)
+        tbl.add_column("Ukuran", justify="right", width=10)
+        tbl.add_column("Path")
+        for row in rows:
+            prov = row["provider"]
+            badge = provider_badge(prov) if prov in PROVIDER_CLASS_MAP else prov
+            codec = "/".join(c for c in (row["vcodec"], row["acodec"]) if c) or "-"
+            tbl.add_row(badge, str(row["title"] or row["video_id"]), codec,
+                        format_bytes(row["size"]) if row["size"] else "-", shorten_path(row["path"], 60))
+        console.print(tbl)
+    else:
+        console.print(f"[yellow]Tidak ada di katalog[/yellow] [dim]({took:.1f} ms)[/dim]")
+    if not rows:
+        raise typer.Exit(code=1)
+
+@catalog_app.command("stats")
+def catalog_stats_cmd():
+    """Ringkasan isi katalog per provider."""
+    from .timing import format_bytes
+
+    cat = _open_catalog(load_config(os.getcwd()))
+    tbl = Table(title=f"Katalog • {shorten_path(cat.db_path, 60)}", show_header=True, header_style="bold cyan",
+                box=box.ROUNDED)
+    tbl.add_column("Provider", width=12)
+    tbl.add_column("File", justify="right")
+    tbl.add_column("Ukuran", justify="right")
+    tbl.add_column("Durasi", justify="right")
+    total = [0, 0, 0.0]
+    for prov, count, size, dur in cat.stats():
+        badge = provider_badge(prov) if prov in PROVIDER_CLASS_MAP else prov
+        tbl.add_row(badge, str(count), format_bytes(size), f"{dur / 3600:.1f} jam")
+        total = [total[0] + count, total[1] + size, total[2] + dur]
+    tbl.add_row("[bold]Total[/bold]", str(total[0]), format_bytes(total[1]), f"{total[2] / 3600:.1f} jam")
+    console.print(tbl)
+
+@catalog_app.command("prune")
+def catalog_prune_cmd():
+    """Hapus entri katalog yang file-nya sudah tidak ada."""
+    cat = _open_catalog(load_config(os.getcwd()))
+    console.print(f"[green]{cat.prune()} entri yatim dihapus.[/green]")
+
+@catalog_app.command("export")
+def catalog_export_cmd(
+    path: str = typer.Argument(..., help="File tujuan: .parquet (butuh pyarrow) atau .jsonl"),
+):
+    """Ekspor seluruh katalog untuk analisis di luar omdl."""
+    from . import catalog
+
+    cat = _open_catalog(load_config(os.getcwd()))
+    try:
+        n = cat.export(path)
+    except catalog.CatalogError as e:
+        rprint(Panel.fit(f"[red]{e}[/red]"))
+        raise typer.Exit(code=1)
+    console.print(f"[green]{n} baris diekspor ke {path}[/green]")
+
 @app.command("dl")
 def dl(
     url: str = typer.Argument(..., help="URL konten"),
@@ -175,13 +578,22 @@ def dl(
     audio_quality: Optional[str] = typer.Option(None, "--audio-quality", help="Kbps untuk ekstraksi audio"),
     embed_thumbnail: Optional[bool] = typer.Option(None, "--embed-thumbnail/--no-embed-thumbnail", help="Embed thumbnail ke audio"),
     name_style: Optional[str] = typer.Option(None, "--name-style", help="simple|nerd"),
+    profile: Optional[str] = typer.Option(None, "--profile", help="Profil bernama dari config (menggantikan --mode/--quality/--preset/--audio-*)"),
+    section: Optional[str] = typer.Option(None, "--section", help="Hanya unduh rentang waktu START-END (mis. 1:30-2:00, 10:00- = sampai akhir)"),
+    max_duration: Optional[str] = typer.Option(None, "--max-duration", help="Batas durasi rekaman live/premiere (mis. 90m, 2h; default live_max_duration)"),
+    wait_live: Optional[bool] = typer.Option(None, "--wait/--no-wait", help="Tunggu live/premiere yang belum mulai (default live_wait)"),
+    subs: Optional[str] = typer.Option(None, "--subs", help="Unduh subtitle bahasa ini (mis. id,en atau en.* atau all)"),
+    sub_format: Optional[str] = typer.Option(None, "--sub-format", help="srt|ass|vtt (default subtitle_format)"),
+    auto_subs: Optional[str] = typer.Option(None, "--auto-subs", help="Auto-caption: never|fallback|prefer (default subtitle_auto)"),
+    embed_subs: Optional[bool] = typer.Option(None, "--embed-subs/--no-embed-subs", help="Embed subtitle ke video (default subtitle_embed)"),
 ):
     """Deteksi provider dari URL lalu unduh."""
     provider = detect_provider(url)
     if not provider:
         raise typer.BadParameter("Gagal mendeteksi provider dari URL.")
     _do_download(provider, url, mode, quality, output, filename_template, cookies,
-                 audio_codec, audio_quality, embed_thumbnail, name_style, preset)
+                 audio_codec, audio_quality, embed_thumbnail, name_style, preset, profile, section,
+                 max_duration, wait_live, subs, sub_format, auto_subs, embed_subs)
 
 def _provider_cmd(provider_name: str):
     def _cmd(
@@ -196,9 +608,18 @@ def _provider_cmd(provider_name: str):
         audio_quality: Optional[str] = typer.Option(None, "--audio-quality", help="Kbps untuk ekstraksi audio"),
         embed_thumbnail: Optional[bool] = typer.Option(None, "--embed-thumbnail/--no-embed-thumbnail", help="Embed thumbnail ke audio"),
         name_style: Optional[str] = typer.Option(None, "--name-style", help="simple|nerd"),
+        profile: Optional[str] = typer.Option(None, "--profile", help="Profil bernama dari config"),
+        section: Optional[str] = typer.Option(None, "--section", help="Hanya unduh rentang waktu START-END (mis. 1:30-2:00)"),
+        max_duration: Optional[str] = typer.Option(None, "--max-duration", help="Batas durasi rekaman live (mis. 90m, 2h)"),
+        wait_live: Optional[bool] = typer.Option(None, "--wait/--no-wait", help="Tunggu live/premiere yang belum mulai"),
+        subs: Optional[str] = typer.Option(None, "--subs", help="Unduh subtitle bahasa ini (mis. id,en)"),
+        sub_format: Optional[str] = typer.Option(None, "--sub-format", help="srt|ass|vtt"),
+        auto_subs: Optional[str] = typer.Option(None, "--auto-subs", help="Auto-caption: never|fallback|prefer"),
+        embed_subs: Optional[bool] = typer.Option(None, "--embed-subs/--no-embed-subs", help="Embed subtitle ke video"),
     ):
         _do_download(provider_name, url, mode, quality, output, filename_template, cookies,
-                     audio_codec, audio_quality, embed_thumbnail, name_style, preset)
+                     audio_codec, audio_quality, embed_thumbnail, name_style, preset, profile, section,
+                 max_duration, wait_live, subs, sub_format, auto_subs, embed_subs)
     return _cmd
 
 app.command("youtube")(_provider_cmd("youtube"))
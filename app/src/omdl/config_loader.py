@@ -4,12 +4,16 @@ from typing import Any, Dict, Optional
 
 import yaml
 
+from .profiles import validate_profiles
+
 # ===== Default Configs (dapat dioverride di config/local.yaml) =====
 DEFAULTS: Dict[str, Any] = {
     # Path
     "output_dir": "downloads",
     "log_dir": "logs",
     "cookies_dir": "cookies",
+    "cache_dir": "cache",
+    "info_cache_ttl": 3600,            # detik; metadata hasil probe dipakai ulang oleh unduhan (0 = off)
 
     # UI & Behavior
     "rich_progress": True,
@@ -17,6 +21,59 @@ DEFAULTS: Dict[str, Any] = {
     "concurrent_fragment_downloads": 5,
     "socket_timeout": 30,
 
+    # Log file terstruktur (JSON lines) di log_dir, dirotasi + gzip
+    "log_to_file": True,
+    "log_ring_size": 200,              # baris log per job yang disimpan untuk panel
+    "log_max_bytes": 10485760,
+    "log_backups": 5,
+    "log_flush_interval": 1.0,
+
+    # Endpoint metrics lokal (format Prometheus) untuk batch panjang
+    "metrics_enabled": False,
+    "metrics_host": "127.0.0.1",
+    "metrics_port": 9464,
+
+    # Probe metadata / pre-flight batch
+    "probe_concurrency": 4,
+    "batch_preflight": False,          # probe semua URL sebelum batch dimulai
+    "batch_wizard_probe": False,       # wizard input manual: probe metadata otomatis saat URL ditempel
+    "menu_prefetch": True,             # menu: ekstrak metadata di latar begitu URL valid
+    "menu_prefetch_wait": 5,           # detik menunggu metadata sebelum daftar resolusi ditampilkan
+    "batch_chunk_size": 500,           # entry per potongan (perencanaan grup & checkpoint resume)
+    "watch_poll_interval": 2.0,        # detik; dipakai bila inotify tidak tersedia
+    "watch_sessions": 4,               # YoutubeDL hangat yang dipertahankan `omdl watch`
+    "watch_seen_max": 100000,          # kunci URL terakhir yang diingat `omdl watch` (anti antre ganda)
+
+    # Server job lokal (`omdl serve`)
+    "serve_host": "127.0.0.1",
+    "serve_port": 9465,
+    "serve_socket": None,              # path Unix socket; bila diisi, host/port diabaikan
+    "serve_workers": 2,                # unduhan paralel
+    "serve_keep_jobs": 1000,           # job selesai yang tetap bisa di-query
+    "serve_event_buffer": 500,         # event terakhir per job yang disimpan untuk stream
+    "serve_sessions": 2,               # YoutubeDL hangat per worker `omdl serve` (per profil)
+
+    # Harness replay offline (`omdl replay record|run`)
+    "replay_dir": "fixtures",          # fixture info_dict + byte media per provider
+    "replay_max_bytes": 8388608,       # byte per format yang direkam (0 = utuh)
+
+    # Admission control ruang disk
+    "disk_min_free_mb": 1024,          # sisa minimum setelah cadangan unduhan
+    "disk_unknown_size_mb": 256,       # cadangan untuk unduhan yang ukurannya tidak diketahui
+    "disk_wait_timeout": 600,          # detik antrean dijeda sebelum gagal (0 = langsung gagal)
+    "disk_poll_interval": 10,
+    "orphan_max_age_hours": 24,        # file .part/.fNNN lebih tua dari ini dihapus saat batch mulai (0 = off)
+
+    # Deduplikasi isi file hasil unduhan (indeks di cache_dir)
+    "dedup_enabled": False,
+    "dedup_link": "auto",              # auto (reflink→hardlink) | reflink | hardlink | off
+    "dedup_mmap": False,               # hash penuh lewat mmap
+
+    # Katalog lokal hasil unduhan (`omdl catalog query|stats|export`)
+    "catalog_enabled": True,
+    "catalog_db": None,                # None = <cache_dir>/catalog.sqlite
+    "catalog_hash": "quick",           # quick (ukuran + 3 sampel) | full | off
+
     # Filename templates (legacy)
     "filename_template_video": "%(title)s [%(id)s].%(ext)s",
     "filename_template_audio": "%(title)s [%(id)s].%(ext)s",
@@ -43,7 +100,35 @@ DEFAULTS: Dict[str, Any] = {
     "audio_format_default": "mp3",     # best|mp3|ogg|wav|opus (default: mp3)
     "audio_bitrate_default": "best",   # 64..320 atau "best" (map ke 320 untuk mp3)
     "audio_prefer_better": True,
+    "audio_streaming": True,           # mode audio: unduhan dialirkan langsung ke encoder ffmpeg (tanpa file perantara)
+    "loudness_normalize": False,       # mode audio: ukur loudness EBU R128 + gain di encode ExtractAudio (NumPy opsional)
+    "loudness_target": -14.0,          # LUFS terintegrasi
+    "loudness_peak": -1.0,             # batas sample peak setelah gain (dBFS)
+    "loudness_silence_db": -50.0,      # ambang hening (dBFS)
+    "loudness_silence_min": 2.0,       # durasi hening minimum yang dicatat (detik)
     "embed_thumbnail": True,
+    "thumbnail_pipeline": True,        # thumbnail diunduh paralel + di-cache (cache_dir/thumbs)
+    "thumbnail_workers": 4,            # pool unduh/konversi thumbnail (dibagi semua job)
+    "thumbnail_timeout": 30,           # detik
+    "metadata_inplace": True,          # addmetadata → tag in-place (MP4/MP3; Ogg/Opus via mutagen), bukan remux ffmpeg
+    "tag_workers": 2,                  # pool tag metadata (dibagi semua job)
+    "ffmpeg_threads": 0,               # -threads untuk encoder yang mendukung thread (0 = jumlah CPU)
+    "subtitles": False,                # unduh subtitle bersama media (paralel, dikonversi pure-Python)
+    "subtitle_langs": ["id", "en"],    # kode bahasa / regex ("en.*") / "all"; bisa ditimpa per provider
+    "subtitle_auto": "fallback",       # auto-caption: never | fallback (bila tak ada manual) | prefer
+    "subtitle_format": "srt",          # srt | ass | vtt
+    "subtitle_embed": False,           # embed ke video (ikut pass merge, tanpa remux tambahan)
+    "subtitle_workers": 4,             # pool unduh/konversi subtitle (dibagi semua job)
+    "subtitle_timeout": 30,            # detik
+    "section_precise_cuts": False,     # --section: potong tepat di waktu (re-encode) alih-alih di keyframe terdekat
+    "live_record": True,               # live/premiere direkam ffmpeg ke segmen bergilir (bukan satu file tanpa batas)
+    "live_max_duration": 14400,        # detik; batas rekaman bila --max-duration tidak diisi (0 = tanpa batas)
+    "live_segment_seconds": 600,       # panjang tiap segmen
+    "live_segment_format": "ts",       # ts | mkv (keduanya aman bila rekaman terputus)
+    "live_keep_segments": 0,           # >0 → hanya N segmen terakhir disimpan (ring buffer)
+    "live_stall_timeout": 120,         # detik tanpa data baru → rekaman ditutup
+    "live_wait": False,                # tunggu live/premiere yang belum mulai (--wait)
+    "live_wait_interval": 60,          # detik; jeda minimum antar cek saat menunggu
 
     # Mode lama untuk kompatibilitas
     "default_mode": "auto",
@@ -57,6 +142,23 @@ DEFAULTS: Dict[str, Any] = {
         "facebook": "best",
         "x": "best",
     },
+
+    # Profil bernama (dipilih via --profile atau per URL di file batch)
+    "profiles": {
+        "archive-1080p-h264": {
+            "mode": "auto",
+            "quality": "1080p",
+            "video_codec_pref": "h264",
+            "merge_output_format": "mp4",
+            "filename_style": "nerd",
+        },
+        "podcast-opus-64k": {
+            "mode": "audio",
+            "audio_codec": "opus",
+            "audio_bitrate": 64,
+            "embed_thumbnail": True,
+        },
+    },
 }
 
 def _read_yaml(path: str) -> Dict[str, Any]:
@@ -89,6 +191,8 @@ def load_config(base_dir: str) -> Dict[str, Any]:
     cfg = dict(DEFAULTS)
     cfg = deep_merge(cfg, _read_yaml(default_path))
     cfg = deep_merge(cfg, _read_yaml(local_path))
+    # Profil divalidasi sekali di sini (ProfileError bila ada yang salah)
+    cfg["profiles"] = validate_profiles(cfg.get("profiles"))
     return cfg
 
 def save_config(base_dir: str, patch: Dict[str, Any]) -> str:
@@ -112,3 +216,9 @@ def load_provider_cfg(base_dir: str, provider: str) -> Dict[str, Any]:
     pdir = os.path.join(base_dir, "config", "providers")
     path = os.path.join(pdir, f"{provider}.yaml")
     return _read_yaml(path)
+
+def resolve_cookies(cfg: Dict[str, Any], provider: str, base_dir: Optional[str] = None) -> Optional[str]:
+    """Path cookies/<provider>.txt bila ada."""
+    cdir = cfg.get("cookies_dir", "cookies")
+    path = os.path.join(base_dir or os.getcwd(), cdir, f"{provider}.txt")
+    return path if os.path.exists(path) else None
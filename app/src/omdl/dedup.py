@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+# Hash cepat: ukuran + 3 sampel (awal/tengah/akhir). Dipakai sebagai filter
+# kandidat; kesamaan isi selalu dikonfirmasi dengan hash penuh.
+_SAMPLE = 64 * 1024
+_CHUNK = 1024 * 1024
+
+# ioctl Linux untuk reflink (btrfs/xfs): FICLONE = _IOW(0x94, 9, int)
+_FICLONE = 0x40049409
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    quick    TEXT NOT NULL,
+    full     TEXT,
+    provider TEXT,
+    video_id TEXT,
+    variant  TEXT,
+    mtime    REAL
+);
+CREATE INDEX IF NOT EXISTS files_size_quick ON files(size, quick);
+CREATE INDEX IF NOT EXISTS files_full ON files(full);
+CREATE INDEX IF NOT EXISTS files_source ON files(provider, video_id, variant);
+"""
+
+
+def quick_hash(path: str, size: Optional[int] = None) -> str:
+    size = os.path.getsize(path) if size is None else size
+    h = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        for offset in (0, max(0, size // 2 - _SAMPLE // 2), max(0, size - _SAMPLE)):
+            f.seek(offset)
+            h.update(f.read(_SAMPLE))
+    return h.hexdigest()
+
+
+def full_hash(path: str, use_mmap: bool = False) -> str:
+    """blake2b seluruh isi file; dibaca per-chunk atau lewat mmap."""
+    h = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        if use_mmap and os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    for start in range(0, len(view), 64 * _CHUNK):
+                        h.update(view[start:start + 64 * _CHUNK])
+        else:
+            while True:
+                chunk = f.read(_CHUNK)
+                if not chunk:
+                    break
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def _reflink(src: str, dst: str) -> bool:
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        return False
+    try:
+        with open(src, "rb") as fs, open(dst, "wb") as fd:
+            fcntl.ioctl(fd.fileno(), _FICLONE, fs.fileno())
+        return True
+    except OSError:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        return False
+
+
+def replace_with_link(original: str, duplicate: str, mode: str = "auto") -> Optional[str]:
+    """
+    Ganti `duplicate` dengan reflink/hardlink ke `original` secara atomik.
+    mode: auto (reflink lalu hardlink) | reflink | hardlink.
+    Kembalikan jenis link yang dipakai, atau None bila gagal (file dibiarkan utuh).
+    """
+    tmp = duplicate + ".omdl-link"
+    if mode in ("auto", "reflink") and _reflink(original, tmp):
+        os.replace(tmp, duplicate)
+        return "reflink"
+    if mode in ("auto", "hardlink"):
+        try:
+            os.link(original, tmp)
+        except OSError:
+            return None
+        os.replace(tmp, duplicate)
+        return "hardlink"
+    return None
+
+
+class ContentIndex:
+    """
+    Indeks isi file hasil unduhan (SQLite).
+    - deteksi duplikat byte-identik lintas provider → ganti dengan link
+    - pemetaan (provider, id, mode) → path agar unduhan ulang bisa dilewati
+    """
+
+    def __init__(self, db_path: str, use_mmap: bool = False) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.use_mmap = use_mmap
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def lookup_source(self, provider: str, video_id: str, variant: str) -> Optional[str]:
+        """Path file yang sudah ada untuk item ini, bila masih ada di disk."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path FROM files WHERE provider=? AND video_id=? AND variant=?",
+                (provider, video_id, variant),
+            ).fetchall()
+        for (path,) in rows:
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def _full_of(self, path: str, known: Optional[str]) -> str:
+        if known:
+            return known
+        digest = full_hash(path, self.use_mmap)
+        with self._lock:
+            self._db.execute("UPDATE files SET full=? WHERE path=?", (digest, path))
+            self._db.commit()
+        return digest
+
+    def add(
+        self,
+        path: str,
+        provider: str = "",
+        video_id: str = "",
+        variant: str = "",
+        link_mode: str = "auto",
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Daftarkan file baru. Bila isinya identik dengan file terindeks lain,
+        file baru diganti link. Kembalikan (path_asli_duplikat, jenis_link).
+        """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        quick = quick_hash(path, st.st_size)
+        with self._lock:
+            cands = self._db.execute(
+                "SELECT path, full FROM files WHERE size=? AND quick=? AND path<>?",
+                (st.st_size, quick, path),
+            ).fetchall()
+
+        full: Optional[str] = None
+        dup_of: Optional[str] = None
+        linked: Optional[str] = None
+        for cand_path, cand_full in cands:
+            try:
+                cst = os.stat(cand_path)
+            except OSError:
+                self.forget(cand_path)
+                continue
+            if (cst.st_dev, cst.st_ino) == (st.st_dev, st.st_ino):
+                dup_of = cand_path  # sudah berupa hardlink
+                break
+            full = full or full_hash(path, self.use_mmap)
+            if self._full_of(cand_path, cand_full) == full:
+                dup_of = cand_path
+                if link_mode != "off":
+                    linked = replace_with_link(cand_path, path, link_mode)
+                break
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files(path, size, quick, full, provider, video_id, variant, mtime) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, st.st_size, quick, full, provider, video_id, variant, st.st_mtime),
+            )
+            self._db.commit()
+        return dup_of, linked
+
+    def forget(self, path: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM files WHERE path=?", (path,))
+            self._db.commit()
+
+
+_INDEXES: Dict[str, ContentIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def index_for(cfg: Dict[str, Any]) -> Optional[ContentIndex]:
+    """ContentIndex bersama untuk konfigurasi ini, atau None bila dedup_enabled=false."""
+    if not cfg.get("dedup_enabled"):
+        return None
+    path = os.path.join(cfg.get("cache_dir", "cache"), "content-index.sqlite")
+    with _INDEXES_LOCK:
+        idx = _INDEXES.get(path)
+        if idx is None:
+            idx = _INDEXES[path] = ContentIndex(path, use_mmap=bool(cfg.get("dedup_mmap", False)))
+        return idx
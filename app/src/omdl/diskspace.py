@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import errno
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# File antara yang ditinggalkan yt-dlp saat unduhan/merge terputus:
+#   judul.mp4.part, judul.f137.mp4, judul.f137.mp4.part-Frag12, judul.temp.mp4, judul.mp4.ytdl
+# Hanya nama persis turunan file final yang dihapus — file lain dengan stem sama
+# (judul.fr.vtt, judul.fun.mp4) tidak pernah disentuh.
+_PART_RE = re.compile(r"^(?P<final>.+?\.\w+)\.part(?:-Frag\d+(?:\.part)?)?$")
+_YTDL_RE = re.compile(r"^(?P<final>.+\.\w+)\.ytdl$")
+# Sweep tanpa info_dict: format id numerik saja (f137, f140-1) + file .temp
+_FORMAT_RE = re.compile(r"^(?P<stem>.+)\.(?:f\d+(?:-\d+)?|temp)\.\w+$")
+
+MB = 1024 * 1024
+
+
+class DiskSpaceError(OSError):
+    """Ruang disk tidak cukup untuk memulai/menyelesaikan unduhan."""
+
+    def __init__(self, path: str, need: int, free: int) -> None:
+        super().__init__(
+            errno.ENOSPC,
+            f"Ruang disk tidak cukup di {path}: butuh ~{need // MB} MB, tersedia {free // MB} MB",
+        )
+        self.path = path
+        self.need = need
+        self.free = free
+
+
+def _format_bytes(fmt: Dict[str, Any], duration: Optional[float]) -> int:
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if not size:
+        # perkiraan dari bitrate total (kbit/s) × durasi
+        tbr = fmt.get("tbr") or ((fmt.get("vbr") or 0) + (fmt.get("abr") or 0))
+        if tbr and duration:
+            size = tbr * 1000 / 8 * duration
+    return int(size or 0)
+
+
+def estimate_bytes(info: Dict[str, Any]) -> int:
+    """Perkiraan ukuran media dari metadata format terpilih (0 = tidak diketahui)."""
+    if info.get("entries") is not None:
+        return sum(estimate_bytes(e) for e in info["entries"] if e)
+    duration = info.get("duration")
+    fmts = info.get("requested_formats") or [info]
+    return sum(_format_bytes(f, duration) for f in fmts)
+
+
+def estimate_required(info: Dict[str, Any], mode: str) -> int:
+    """
+    Ruang yang perlu dicadangkan: ukuran media + file hasil merge/transcode.
+    Video terpisah (video+audio) ditulis dua kali: potongan .fNNN lalu file merge.
+    """
+    if info.get("entries") is not None:
+        return sum(estimate_required(e, mode) for e in info["entries"] if e)
+    media = estimate_bytes(info)
+    if mode == "audio" or len(info.get("requested_formats") or []) > 1:
+        return media * 2
+    return int(media * 1.1)
+
+
+def existing_parent(path: str) -> str:
+    """Direktori terdekat yang sudah ada (output yt-dlp bisa belum dibuat)."""
+    cur = os.path.abspath(os.path.dirname(path) or ".")
+    while not os.path.isdir(cur):
+        parent = os.path.dirname(cur)
+        if parent == cur:
+            break
+        cur = parent
+    return cur
+
+
+class SpaceLedger:
+    """Catatan cadangan ruang per filesystem (st_dev) untuk unduhan yang sedang berjalan."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._reserved: Dict[int, int] = {}
+
+    def reserved(self, dev: int) -> int:
+        with self._lock:
+            return self._reserved.get(dev, 0)
+
+    def try_reserve(self, path: str, need: int, min_free: int) -> Optional[int]:
+        """Cadangkan `need` byte bila sisa ruang tetap >= min_free. Kembalikan st_dev atau None."""
+        dev = os.stat(path).st_dev
+        with self._lock:
+            free = shutil.disk_usage(path).free - self._reserved.get(dev, 0)
+            if free - need < min_free:
+                return None
+            self._reserved[dev] = self._reserved.get(dev, 0) + need
+            return dev
+
+    def release(self, dev: int, need: int) -> None:
+        with self._lock:
+            left = self._reserved.get(dev, 0) - need
+            if left > 0:
+                self._reserved[dev] = left
+            else:
+                self._reserved.pop(dev, None)
+
+
+_LEDGER = SpaceLedger()
+
+
+@contextmanager
+def admit(
+    target: str,
+    need: int,
+    cfg: Dict[str, Any],
+    log: Optional[Callable[[str], None]] = None,
+) -> Iterator[int]:
+    """
+    Admission control sebelum unduhan dimulai.
+    - Cadangkan `need` byte di filesystem tujuan; `need` 0 (ukuran tidak diketahui)
+      dicadangkan sebesar disk_unknown_size_mb agar tetap terhitung di ledger.
+    - Jika sisa ruang < disk_min_free_mb, antrean dijeda (polling) hingga
+      disk_wait_timeout detik; setelah itu DiskSpaceError.
+    Cadangan dilepas saat blok selesai (sukses maupun gagal).
+    """
+    path = existing_parent(target)
+    if need <= 0:
+        need = int(cfg.get("disk_unknown_size_mb", 256)) * MB
+    min_free = int(cfg.get("disk_min_free_mb", 1024)) * MB
+    timeout = float(cfg.get("disk_wait_timeout", 600))
+    poll = max(1.0, float(cfg.get("disk_poll_interval", 10)))
+    deadline = time.monotonic() + timeout
+    warned = False
+    while True:
+        dev = _LEDGER.try_reserve(path, need, min_free)
+        if dev is not None:
+            break
+        free = shutil.disk_usage(path).free - _LEDGER.reserved(os.stat(path).st_dev)
+        if time.monotonic() >= deadline:
+            raise DiskSpaceError(path, need + min_free, max(0, free))
+        if log and not warned:
+            log(f"Ruang disk tinggal {max(0, free) // MB} MB "
+                f"(butuh ~{(need + min_free) // MB} MB). Antrean dijeda…")
+            warned = True
+        time.sleep(poll)
+    try:
+        yield need
+    finally:
+        _LEDGER.release(dev, need)
+
+
+def is_disk_full(exc: BaseException) -> bool:
+    """True bila exception (atau penyebabnya, termasuk DownloadError yt-dlp) adalah ENOSPC."""
+    seen = 0
+    cur: Optional[BaseException] = exc
+    while cur is not None and seen < 8:
+        if isinstance(cur, OSError) and cur.errno == errno.ENOSPC:
+            return True
+        exc_info = getattr(cur, "exc_info", None)
+        nested = exc_info[1] if isinstance(exc_info, tuple) and len(exc_info) > 1 else None
+        cur = nested or cur.__cause__ or cur.__context__
+        seen += 1
+    return False
+
+
+def _leftovers(final: str, names: set[str]) -> list[str]:
+    """Sisa unduhan milik file `final` (basename) yang ada di `names`: .part, .part-FragN, .ytdl."""
+    out = [n for n in (final + ".part", final + ".ytdl") if n in names]
+    prefix = final + ".part-Frag"
+    out += [n for n in names if n.startswith(prefix) and _PART_RE.match(n)]
+    return out
+
+
+def cleanup_intermediates(filename: str, info: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Hapus file antara milik satu unduhan: `<stem>.f<format_id>.<ext>` untuk format di
+    info["requested_formats"], `<stem>.temp.<ext>`, serta .part/.ytdl semuanya.
+    `filename` adalah nama hasil ydl.prepare_filename(info). Kembalikan jumlah file terhapus.
+    """
+    directory = os.path.dirname(filename) or "."
+    base = os.path.basename(filename)
+    stem, ext = os.path.splitext(base)
+    try:
+        names = {e.name for e in os.scandir(directory) if e.is_file()}
+    except OSError:
+        return 0
+    finals = [base]
+    for fmt in (info or {}).get("requested_formats") or []:
+        if fmt.get("format_id"):
+            finals.append(f"{stem}.f{fmt['format_id']}.{fmt.get('ext') or ext.lstrip('.')}")
+    doomed = {n for n in finals[1:] + [f"{stem}.temp{ext}"] if n in names}
+    for final in finals:
+        doomed.update(_leftovers(final, names))
+    removed = 0
+    for name in doomed:
+        try:
+            os.remove(os.path.join(directory, name))
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _orphans(dirpath: str, files: list[str], cutoff: float) -> list[str]:
+    """
+    File antara yatim di satu direktori: hanya yang lebih tua dari `cutoff` DAN
+    (file finalnya sudah ada → sisa merge/unduhan yang selesai) atau (sidecar .ytdl
+    miliknya juga basi → unduhan ditinggalkan).
+    """
+    names = set(files)
+
+    def _old(name: str) -> bool:
+        try:
+            return os.path.getmtime(os.path.join(dirpath, name)) < cutoff
+        except OSError:
+            return False
+
+    def _intermediate(name: str) -> bool:
+        return bool(_PART_RE.match(name) or _YTDL_RE.match(name) or _FORMAT_RE.match(name))
+
+    abandoned = {m.group("final") for n in files if (m := _YTDL_RE.match(n)) and _old(n)}
+    abandoned_stems = {(m.group("stem") if (m := _FORMAT_RE.match(f)) else os.path.splitext(f)[0])
+                       for f in abandoned}
+    finished_stems = {os.path.splitext(n)[0] for n in files if not _intermediate(n)}
+
+    out = []
+    for name in files:
+        if (m := _YTDL_RE.match(name)):
+            hit = m.group("final") in abandoned
+        elif (m := _PART_RE.match(name)):
+            final = m.group("final")
+            fm = _FORMAT_RE.match(final)  # .part milik judul.f140.m4a: lihat juga stem hasil merge
+            hit = final in names or final in abandoned or bool(fm and fm.group("stem") in finished_stems)
+        elif (m := _FORMAT_RE.match(name)):
+            hit = m.group("stem") in finished_stems or m.group("stem") in abandoned_stems
+        else:
+            continue
+        if hit and _old(name):
+            out.append(name)
+    return out
+
+
+def sweep_orphans(root: str, max_age_hours: float) -> int:
+    """
+    Hapus file antara yatim di bawah `root` yang tidak disentuh lebih dari
+    max_age_hours (lihat _orphans: file final ada atau .ytdl-nya ditinggalkan).
+    """
+    if max_age_hours <= 0 or not os.path.isdir(root):
+        return 0
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    for dirpath, _dirs, files in os.walk(root):
+        for name in _orphans(dirpath, files, cutoff):
+            try:
+                os.remove(os.path.join(dirpath, name))
+                removed += 1
+            except OSError:
+                pass
+    return removed
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import os
-from collections import deque
-from pathlib import Path
-from typing import Dict, Any, Optional, List
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Any, Optional, List, Tuple
 
 from rich.console import Console, Group
 from rich.panel import Panel
@@ -15,9 +17,26 @@ from rich.progress import (
     TaskProgressColumn,
     TimeRemainingColumn,
 )
-from rich.text import Text
 from rich.live import Live
 from yt_dlp import YoutubeDL
+from yt_dlp.utils import YoutubeDLError
+
+from .timing import StageTimer, BatchReport
+from . import metrics
+from . import joblog
+from . import live as livestream
+from . import diskspace
+from . import catalog
+from . import dedup
+from . import ffcaps
+from . import infocache
+from . import sections
+from . import streaming
+from . import subtitles
+from . import tagging
+from . import thumbnails
+from .output import OutputIndex, escape_outtmpl
+from .profiles import DownloadProfile, compile_profile
 
 console = Console()
 
@@ -26,64 +45,227 @@ def _pretty_panel(text: str, title: str = "", style: str = "cyan") -> Panel:
     return Panel.fit(text, title=title, border_style=style)
 
 
-def _postprocessors_for_audio(codec: str, bitrate_pref: str, embed_thumbnail: bool) -> List[Dict[str, Any]]:
+def _downloaded_files(info: Dict[str, Any]):
+    """Yield (entry_info, filepath) untuk tiap file final yang ditulis yt-dlp."""
+    if info.get("entries") is not None:
+        for entry in info["entries"] or []:
+            if entry:
+                yield from _downloaded_files(entry)
+        return
+    for dl in info.get("requested_downloads") or []:
+        path = dl.get("filepath")
+        if path and os.path.isfile(path):
+            yield info, path
+
+
+def _final_name(planned: str, mode: str, audio_codec: Optional[str]) -> str:
+    """Nama file akhir setelah postprocess (mode audio berganti ke ekstensi hasil codec)."""
+    if mode == "audio" and audio_codec and audio_codec != "best":
+        ext = ffcaps.audio_ext(audio_codec) or audio_codec
+        return os.path.splitext(planned)[0] + f".{ext}"
+    return planned
+
+
+def _index_downloads(index, info: Dict[str, Any], provider_name: str, variant: str,
+                     cfg: Dict[str, Any], log_fn) -> None:
+    """Daftarkan file final ke indeks isi; duplikat byte-identik diganti link."""
+    link_mode = str(cfg.get("dedup_link") or "auto").lower()
+    for entry, path in _downloaded_files(info):
+        try:
+            dup_of, linked = index.add(path, provider_name, str(entry.get("id") or ""), variant, link_mode)
+        except OSError as e:
+            log_fn(joblog.WARNING, "Gagal mengindeks {}: {}", path, e)
+            continue
+        if dup_of and linked:
+            log_fn(joblog.STEP, "Duplikat dari {} → diganti {}", dup_of, linked)
+        elif dup_of:
+            log_fn(joblog.STEP, "Duplikat dari {}", dup_of)
+
+
+def _catalog_downloads(cat, info: Dict[str, Any], provider_name: str, variant: str, url: str,
+                       acodec: Optional[str], log_fn) -> None:
+    """Catat file final (field info_dict yang dipangkas) ke katalog lokal."""
+    rows = []
+    for entry, path in _downloaded_files(info):
+        try:
+            rows.append(cat.row_for(entry, path, provider_name, variant,
+                                    url=url if entry is info else entry.get("webpage_url"), acodec=acodec))
+        except OSError as e:
+            log_fn(joblog.WARNING, "Gagal mencatat {} ke katalog: {}", path, e)
+    try:
+        cat.add_rows(rows)
+    except catalog.CatalogError as e:
+        log_fn(joblog.WARNING, "{}", e)
+
+
+_STORE_WARNED: set = set()
+_STORE_WARNED_LOCK = threading.Lock()
+
+
+def _open_store(label: str, opener, cfg: Dict[str, Any], log_fn):
     """
-    Bangun postprocessors untuk mode audio.
-    - bitrate_pref: "best" atau angka string ("320","192","128",..., "64")
-      "best" map ke 320 kbps.
+    Buka katalog / indeks dedup lewat `opener(cfg)`. Bila gagal (terkunci, rusak,
+    read-only) unduhan tetap jalan tanpa fitur itu: None + satu peringatan per pesan.
     """
-    kbps = "320" if str(bitrate_pref) == "best" else str(bitrate_pref)
-    pp: List[Dict[str, Any]] = [
-        {"key": "FFmpegExtractAudio", "preferredcodec": codec, "preferredquality": kbps}
-    ]
-    if embed_thumbnail:
-        pp.append({"key": "EmbedThumbnail"})
-    return pp
-
-
-def _merge_output_format(codec_pref: str, cfg: Dict[str, Any]) -> Optional[str]:
-    """
-    Tentukan kontainer final.
-    - Jika cfg['merge_output_format'] = 'auto':
-        h264 -> mp4 ; vp9/av1 -> webm ; h265 -> mp4
-    - Jika 'mp4'/'webm' → pakai itu.
-    - Jika None → biarkan yt-dlp menentukan.
-    """
-    mo = (cfg.get("merge_output_format") or "").lower()
-    if mo in ("mp4", "webm"):
-        return mo
-    if mo == "auto" or not mo:
-        if codec_pref in ("vp9", "av1"):
-            return "webm"
-        return "mp4"
-    return None
+    try:
+        return opener(cfg)
+    except (catalog.CatalogError, sqlite3.Error, OSError) as e:
+        msg = f"{label} tidak tersedia, dilewati: {e}"
+        with _STORE_WARNED_LOCK:
+            first = msg not in _STORE_WARNED
+            _STORE_WARNED.add(msg)
+        if first:
+            log_fn(joblog.WARNING, "{}", msg)
+        return None
 
 
 class RichYDLLogger:
     """
-    Logger untuk yt-dlp → meneruskan pesan penting ke panel Log.
+    Logger untuk yt-dlp → meneruskan pesan ke log job.
+    log_fn(level, msg, panel=...) : pesan debug yang tidak penting hanya masuk file log.
+    observer (opsional) menerima SEMUA pesan mentah (dipakai StageTimer).
     """
-    def __init__(self, log_fn, debug: bool = False):
+    def __init__(self, log_fn, debug: bool = False, observer=None):
         self._log = log_fn
         self._debug = debug
+        self._observer = observer
 
     def debug(self, msg):
         msg = str(msg)
+        self._observe(msg)
         keywords = (
             "Extracting ", "Downloading ", "Writing ", "Destination",
             "m3u8", "player API", "tv client", "thumbnail", "format(s)"
         )
-        if self._debug or any(k in msg for k in keywords):
-            self._log(f"[dim]{msg}[/dim]")
+        show = self._debug or any(k in msg for k in keywords)
+        self._log(joblog.DEBUG, msg, panel=show)
 
     def info(self, msg):
-        self._log(str(msg))
+        self._observe(str(msg))
+        self._log(joblog.INFO, str(msg))
 
     def warning(self, msg):
-        self._log(f"[yellow]{msg}[/yellow]")
+        self._observe(str(msg))
+        self._log(joblog.WARNING, str(msg))
 
     def error(self, msg):
-        self._log(f"[red]{msg}[/red]")
+        self._observe(str(msg))
+        self._log(joblog.ERROR, str(msg))
+
+    def _observe(self, msg: str) -> None:
+        if self._observer is not None:
+            self._observer(msg)
+
+
+def _debug_enabled() -> bool:
+    return os.environ.get("OMDL_DEBUG", "").lower() in ("1", "true", "yes", "y")
+
+
+class DownloadSession:
+    """
+    Satu YoutubeDL "hangat" untuk beberapa job berurutan yang berbagi profil,
+    provider & cookies (satu grup batch). Extractor, cookie jar & koneksi HTTP
+    dipakai ulang; logger & hooks adalah dispatcher yang diarahkan ke job aktif
+    lewat bind(). Tidak thread-safe: satu job pada satu waktu.
+    """
+
+    def __init__(self, profile: DownloadProfile, cookies_path: Optional[str]) -> None:
+        self.profile = profile
+        self.cookies_path = cookies_path
+        self._logger = None
+        self._progress_hook = None
+        self._pp_hook = None
+        debug = _debug_enabled()
+        opts = profile.new_opts()
+        if cookies_path:
+            opts["cookiefile"] = cookies_path
+        opts.update({
+            "outtmpl": "%(title)s.%(ext)s",  # diganti per job di bind()
+            "noprogress": True,
+            "quiet": True,
+            "no_warnings": not debug,
+            "logger": self,
+            "progress_hooks": [self._on_progress],
+            "postprocessor_hooks": [self._on_postprocess],
+        })
+        self.ydl = YoutubeDL(opts)
+        profile.add_postprocessors(self.ydl)
+
+    # ----- dispatcher logger (yt-dlp membaca params['logger'] di tiap pesan) -----
+    def debug(self, msg):
+        if self._logger is not None:
+            self._logger.debug(msg)
+
+    def info(self, msg):
+        if self._logger is not None:
+            self._logger.info(msg)
+
+    def warning(self, msg):
+        if self._logger is not None:
+            self._logger.warning(msg)
+
+    def error(self, msg):
+        if self._logger is not None:
+            self._logger.error(msg)
+
+    def _on_progress(self, d: Dict[str, Any]) -> None:
+        if self._progress_hook is not None:
+            self._progress_hook(d)
+
+    def _on_postprocess(self, d: Dict[str, Any]) -> None:
+        if self._pp_hook is not None:
+            self._pp_hook(d)
+
+    @contextmanager
+    def bind(self, outtmpl: str, logger, progress_hook, pp_hook,
+             params: Optional[Dict[str, Any]] = None):
+        """
+        Arahkan output & event yt-dlp ke satu job selama blok with.
+        `params` = opsi yt-dlp khusus job ini (mis. potongan waktu), dipulihkan sesudahnya.
+        """
+        saved = {k: self.ydl.params.get(k) for k in params or {}}
+        self.ydl.params.update(params or {})
+        self.ydl.params["outtmpl"]["default"] = outtmpl
+        self._logger, self._progress_hook, self._pp_hook = logger, progress_hook, pp_hook
+        try:
+            yield self.ydl
+        finally:
+            self._logger = self._progress_hook = self._pp_hook = None
+            self.ydl.params.update(saved)
+
+    def close(self) -> None:
+        self.ydl.__exit__(None, None, None)  # simpan cookies & tutup handler jaringan
+
+    def __enter__(self) -> "DownloadSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class SessionPool:
+    """DownloadSession per (profil, cookies), dipertahankan lintas batch (LRU)."""
+
+    def __init__(self, size: int = 4) -> None:
+        self.size = max(1, size)
+        self._sessions: "OrderedDict[Tuple[Any, Optional[str]], DownloadSession]" = OrderedDict()
+
+    def get(self, profile, cookies_path: Optional[str]) -> DownloadSession:
+        key = (profile, cookies_path)
+        sess = self._sessions.get(key)
+        if sess is None:
+            sess = self._sessions[key] = DownloadSession(profile, cookies_path)
+            while len(self._sessions) > self.size:
+                _, old = self._sessions.popitem(last=False)
+                old.close()
+        else:
+            self._sessions.move_to_end(key)
+        return sess
+
+    def close(self) -> None:
+        for sess in self._sessions.values():
+            sess.close()
+        self._sessions.clear()
 
 
 def run_download(
@@ -97,42 +279,70 @@ def run_download(
     audio_codec: Optional[str],
     audio_quality: Optional[str],
     embed_thumbnail: Optional[bool] = None,
-) -> None:
+    report: Optional[BatchReport] = None,
+    out_index: Optional[OutputIndex] = None,
+    profile: Optional[DownloadProfile] = None,
+    session: Optional[DownloadSession] = None,
+    extra_observers: Optional[List[Any]] = None,
+    headless: bool = False,
+    section: Optional[sections.Section] = None,
+    max_duration: Optional[float] = None,
+    wait_for_start: Optional[bool] = None,
+    prefetched: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
     """
     Eksekusi unduhan menggunakan yt-dlp.
     - mode: 'auto' (video/media) atau 'audio'
     - quality: 'auto'|'best'|format-string (yt-dlp)
+    Mengembalikan record timing per tahap (lihat timing.StageTimer.finish);
+    jika `report` diberikan, record (sukses maupun gagal) juga ditambahkan ke sana.
+    `out_index` (opsional, dibagi satu batch) dipakai untuk cek file sudah ada
+    dan tabrakan nama tanpa stat ke filesystem.
+    `profile` (opsional, mis. profil bernama) menggantikan mode/quality/audio_*.
+    `session` (opsional) → pakai YoutubeDL hangat milik grup batch; profil &
+    cookies diambil dari session.
+    `extra_observers` menerima event yang sama dengan StageTimer (on_log/on_progress/
+    on_postprocess); exception dari observer menghentikan unduhan (dipakai untuk cancel).
+    `headless=True` → tanpa panel & Live (untuk worker thread, mis. `omdl serve`).
+    `section` (mulai, selesai) → hanya rentang waktu itu yang diunduh (lihat sections);
+    label rentang masuk ke nama file & varian indeks dedup.
+    Stream live/premiere direkam ke segmen bergilir (lihat live): `max_duration`
+    (detik, default live_max_duration) membatasi rekaman, `wait_for_start` (default
+    live_wait) menunggu stream yang belum mulai alih-alih gagal.
+    `prefetched` → info_dict yang sudah diekstrak di latar (probe.Prefetch, menu);
+    ekstraksi dilewati, diulang sekali bila URL format di dalamnya kedaluwarsa.
     """
     cfg = provider_obj.cfg
 
-    # ===== Format =====
-    format_string = provider_obj.select_format(mode, quality)
-
-    # ===== Base options =====
-    ydl_opts: Dict[str, Any] = provider_obj.ydl_base_opts()
+    # ===== Profil (format, kontainer, postprocessor) — dikompilasi sekali & di-cache =====
+    if session is not None:
+        profile = session.profile
+    elif profile is None:
+        profile = compile_profile(provider_obj, mode, quality, audio_codec, audio_quality, embed_thumbnail)
+    mode = profile.mode
+    audio_codec_selected: Optional[str] = profile.audio_codec
+
+    # ===== Base options: salinan template profil (opsi provider + extra sudah diterapkan) =====
+    ydl_opts: Dict[str, Any] = profile.new_opts()
+    # ===== Opsi yt-dlp khusus job (juga diterapkan ke session hangat lewat bind) =====
+    job_params: Dict[str, Any] = {}
+    variant = mode
+    if section is not None:
+        # potongan waktu: hanya fragmen/byte di sekitar rentang yang diunduh
+        outtmpl = sections.outtmpl(outtmpl, section)
+        job_params.update(sections.ydl_params(section, cfg))
+        variant = f"{mode}@{sections.label(section)}"
+    if wait_for_start if wait_for_start is not None else cfg.get("live_wait", False):
+        job_params.update(livestream.wait_params(cfg))
+    ydl_opts.update(job_params)
     ydl_opts["outtmpl"] = outtmpl
-    ydl_opts["format"] = format_string
-
-    # ===== Kontainer =====
-    vcodec_pref = (cfg.get("video_codec_pref") or "h264").lower()
-    merge_to = _merge_output_format(vcodec_pref, cfg)
-    if merge_to:
-        ydl_opts["merge_output_format"] = merge_to
 
     # ===== Cookies =====
     if cookies_path:
         ydl_opts["cookiefile"] = cookies_path
 
-    # ===== Audio postprocessors =====
-    audio_codec_selected: Optional[str] = None
-    if mode == "audio":
-        audio_codec_selected = (audio_codec or cfg.get("audio_format_default") or "mp3").lower()
-        aq = (audio_quality or cfg.get("audio_bitrate_default") or "best")
-        emb = cfg.get("embed_thumbnail") if embed_thumbnail is None else embed_thumbnail
-        ydl_opts["postprocessors"] = _postprocessors_for_audio(audio_codec_selected, str(aq), bool(emb))
-
     # ===== Kontrol output bawaan yt-dlp =====
-    debug = os.environ.get("OMDL_DEBUG", "").lower() in ("1", "true", "yes", "y")
+    debug = _debug_enabled()
     ydl_opts["noprogress"] = True     # pakai progress kustom
     ydl_opts["quiet"] = True          # cegah stdout bawaan
     ydl_opts["no_warnings"] = not debug
@@ -151,14 +361,13 @@ def run_download(
         console=console,
     )
 
-    # ===== Log buffer (dirender dalam Panel, bukan print langsung) =====
-    log_lines: deque[str] = deque(maxlen=200)
+    # ===== Log job (ring buffer ringkas; markup diterapkan saat render) =====
+    job = joblog.new_job(cfg, provider=provider_name, url=url)
 
     def render_ui() -> Group:
-        log_text = Text("\n".join(log_lines)) if log_lines else Text("Menunggu…")
         return Group(
             Panel(progress, title="Progres", border_style="cyan"),
-            Panel(log_text, title="Log", border_style="magenta"),
+            Panel(job.render(), title="Log", border_style="magenta"),
         )
 
     # ===== State =====
@@ -172,18 +381,30 @@ def run_download(
     # ------ LOG APPENDER (tidak pernah print ke console saat Live aktif) ------
     live: Optional[Live] = None
 
-    def log_line(msg: str):
+    def log_line(level: int, template: str, *args: Any, panel: bool = True) -> None:
         # Satu-satunya pintu masuk log
-        log_lines.append(f"• {msg}")
-        if live is not None:
+        job.log(level, template, *args, panel=panel)
+        if panel and live is not None:
             live.update(render_ui(), refresh=True)
 
+    # ===== Timing per tahap (+ metrics bila endpoint aktif) =====
+    timer = StageTimer(provider_name, url)
+    observers: List[Any] = [timer]
+    observers.extend(extra_observers or [])
+    run_metrics: Optional[metrics.RunObserver] = None  # dibuat di dalam try: gauge aktif selalu diturunkan
+
+    def _observe_log(msg: str) -> None:
+        for o in observers:
+            o.on_log(msg)
+
     # Pasang logger ke yt-dlp
-    ydl_opts["logger"] = RichYDLLogger(log_line, debug=debug)
+    ydl_opts["logger"] = RichYDLLogger(log_line, debug=debug, observer=_observe_log)
 
     # ------ HOOKS ------
     def _progress_hook(d: Dict[str, Any]):
         nonlocal last_filename, download_task_id
+        for o in observers:
+            o.on_progress(d)
         status = d.get("status")
 
         if status == "downloading":
@@ -207,10 +428,12 @@ def run_download(
             last_filename = d.get("filename", last_filename)
 
         elif status == "error":
-            log_line("[red]Terjadi kesalahan saat mengunduh.[/red]")
+            log_line(joblog.ERROR, "Terjadi kesalahan saat mengunduh.")
 
     def _postprocessor_hook(d: Dict[str, Any]):
         nonlocal final_path, post_task_id
+        for o in observers:
+            o.on_postprocess(d)
         st = d.get("status")
         pp = str(d.get("postprocessor") or "Post-Processing")
         info = d.get("info_dict") or {}
@@ -227,7 +450,7 @@ def run_download(
         if st == "started":
             if pp not in pp_started_once:
                 pp_started_once.add(pp)
-                log_line(f"[cyan]↻ {pp}[/cyan] [dim]{base}[/dim]")
+                log_line(joblog.STEP, "↻ {} {}", pp, base)
 
         elif st == "finished":
             if pp not in pp_finished_once:
@@ -236,7 +459,7 @@ def run_download(
                 if cand:
                     final_path = cand
                 # Opsional: beri tanda selesai per-PP
-                log_line(f"[green]✓ {pp} selesai[/green]")
+                log_line(joblog.SUCCESS, "✓ {} selesai", pp)
                  
 
     # Pasang hooks
@@ -244,34 +467,179 @@ def run_download(
     ydl_opts["postprocessor_hooks"] = [_postprocessor_hook]
 
     # Panel "memulai" (sebelum Live)
-    console.print(_pretty_panel("Memulai unduhan…", style="cyan"))
-
-    # Provider extra
-    ydl_opts = provider_obj.apply_provider_extra(ydl_opts)
+    if not headless:
+        console.print(_pretty_panel("Memulai unduhan…", style="cyan"))
 
     # ==== Jalankan dengan Live layout (Progress + Log terpadu) ====
     # Penting: tidak ada console.print di dalam blok Live.
-    with Live(render_ui(), console=console, refresh_per_second=10, transient=True) as _live:
-        live = _live
-        with YoutubeDL(ydl_opts) as ydl:
-            ydl.extract_info(url, download=True)
-        live = None  # hentikan update manual setelah keluar
+    # Ekstraksi & unduh dipisah agar tiap tahap terukur dan ukuran bisa
+    # diperkirakan (admission control ruang disk) sebelum byte pertama ditulis.
+    planned_file: Optional[str] = None
+    claimed_name: Optional[Tuple[str, str]] = None  # (path, owner) yang diklaim di out_index
+    try:
+        run_metrics = metrics.observer(provider_name)
+        if run_metrics is not None:
+            observers.append(run_metrics)
+        index = _open_store("Indeks dedup", dedup.index_for, cfg, log_line)
+        cat = _open_store("Katalog", catalog.catalog_for, cfg, log_line)
+        live_ctx = nullcontext() if headless else Live(render_ui(), console=console, refresh_per_second=10, transient=True)
+        with live_ctx as _live:
+            live = _live
+            if session is not None:
+                ydl_ctx = session.bind(outtmpl, ydl_opts["logger"], _progress_hook, _postprocessor_hook,
+                                       params=job_params)
+            else:
+                ydl_ctx = YoutubeDL(ydl_opts)
+                profile.add_postprocessors(ydl_ctx)
+            with ydl_ctx as ydl:
+                timer.begin("extract")
+                # prefetch menu / cache `omdl probe` & pre-flight batch
+                info = prefetched if prefetched is not None else infocache.get(cfg, url)
+                if info is not None and livestream.is_live(info):
+                    info = None  # status & manifest live cepat basi → selalu ekstrak ulang
+                from_cache = info is not None
+                if from_cache:
+                    log_line(joblog.INFO, "Memakai metadata hasil prefetch." if prefetched is not None
+                             else "Memakai metadata dari cache probe.")
+                else:
+                    info = ydl.extract_info(url, download=False)
+                timer.end("extract")
+                single = info.get("entries") is None
+                # live/premiere: rekam ke segmen bergilir, bukan satu file tanpa batas
+                recording = single and livestream.is_live(info) and bool(cfg.get("live_record", True))
+                owner = str(info.get("id") or url)
+                skip_to: Optional[str] = None
+                if index is not None and single and info.get("id") and not recording:
+                    skip_to = index.lookup_source(provider_name, owner, variant)
+
+                planned_file = ydl.prepare_filename(info)
+                if not skip_to and out_index is not None and single and not recording:
+                    # cek "sudah ada"/tabrakan nama dari indeks memori, bukan stat per file
+                    status, claimed = out_index.claim(
+                        _final_name(planned_file, mode, audio_codec_selected), owner
+                    )
+                    if status == "exists":
+                        skip_to = claimed
+                    else:
+                        claimed_name = (claimed, owner)
+                    if status == "renamed":
+                        planned_file = os.path.splitext(claimed)[0] + os.path.splitext(planned_file)[1]
+                        ydl.params["outtmpl"]["default"] = escape_outtmpl(planned_file)
+                        log_line(joblog.WARNING, "Nama file bentrok, disimpan sebagai {}", claimed)
+
+                if skip_to:
+                    # sudah ada → lewati tanpa menyentuh jaringan lagi
+                    timer.cached = True
+                    final_path = skip_to
+                    log_line(joblog.SUCCESS, "Sudah ada, unduhan dilewati: {}", skip_to)
+                else:
+                    if recording:
+                        limit = float(max_duration if max_duration is not None
+                                      else cfg.get("live_max_duration", 14400) or 0)
+                        info = ydl.process_ie_result(info, download=False)  # pilih format saja
+                        with diskspace.admit(planned_file, livestream.estimate(info, limit), cfg,
+                                             log=lambda m: log_line(joblog.WARNING, m)):
+                            info = livestream.record(ydl, info, planned_file, cfg, mode, limit or None,
+                                               log=lambda m: log_line(joblog.STEP, m))
+                    else:
+                        # thumbnail & subtitle diunduh paralel dengan media; diambil PP setelah unduh
+                        thumbnails.attach(info, profile.postprocessors)
+                        subtitles.attach(info, profile.postprocessors)
+                        need = diskspace.estimate_required(info, mode)
+                        if section is not None and single and info.get("duration"):
+                            clip = sections.length(section, float(info["duration"]))
+                            if clip is not None:
+                                need = int(need * min(1.0, clip / float(info["duration"])))
+                        with diskspace.admit(planned_file, need, cfg,
+                                             log=lambda m: log_line(joblog.WARNING, m)):
+                            try:
+                                streamed = None
+                                if streaming.wanted(cfg, profile, info):
+                                    # audio: unduh → stdin ffmpeg → file akhir (tanpa file perantara)
+                                    streamed = streaming.run(
+                                        ydl, info, _final_name(planned_file, mode, audio_codec_selected),
+                                        log=lambda m: log_line(joblog.STEP, m))
+                                if streamed is not None:
+                                    info = streamed
+                                else:
+                                    info = ydl.process_ie_result(info, download=True)
+                            except YoutubeDLError:
+                                if not from_cache:
+                                    raise
+                                # URL format kedaluwarsa / entri cache tidak bisa diproses → ekstrak ulang sekali
+                                infocache.drop(cfg, url)
+                                log_line(joblog.WARNING, "Metadata cache kedaluwarsa, ekstrak ulang…")
+                                info = ydl.extract_info(url, download=False)
+                                thumbnails.attach(info, profile.postprocessors)
+                                subtitles.attach(info, profile.postprocessors)
+                                info = ydl.process_ie_result(info, download=True)
+                    if profile.tag_metadata:
+                        # tag in-place sebelum dedup meng-hash file final
+                        timer.begin("postprocess")
+                        for path, how, ok in tagging.tag_downloads(
+                                _downloaded_files(info), int(cfg.get("tag_workers", 2) or 2)):
+                            if ok:
+                                log_line(joblog.STEP, "Tag metadata {} ({})", os.path.basename(path), how)
+                            else:
+                                log_line(joblog.WARNING, "Tag metadata dilewati untuk {}: {}", path, how)
+                        timer.end("postprocess")
+                    if out_index is not None:
+                        for entry, path in _downloaded_files(info):
+                            out_index.add(path, str(entry.get("id") or owner))
+                    if index is not None and not recording:  # segmen live bukan pengganti VOD-nya
+                        timer.begin("postprocess")
+                        _index_downloads(index, info, provider_name, variant, cfg, log_line)
+                        timer.end("postprocess")
+                    if cat is not None:
+                        timer.begin("postprocess")
+                        _catalog_downloads(cat, info, provider_name, variant, url,
+                                           audio_codec_selected if mode == "audio" and audio_codec_selected
+                                           not in (None, "best") else None, log_line)
+                        timer.end("postprocess")
+            live = None  # hentikan update manual setelah keluar
+    except Exception as e:
+        job.error("Gagal: {}", e)
+        if out_index is not None and claimed_name:
+            out_index.release(*claimed_name)
+        if planned_file and diskspace.is_disk_full(e):
+            removed = diskspace.cleanup_intermediates(planned_file, info)
+            if removed:
+                job.warning("Disk penuh: {} file sementara dibersihkan.", removed)
+                if not headless:
+                    console.print(f"[yellow]Disk penuh: {removed} file sementara dibersihkan.[/yellow]")
+        if run_metrics is not None:
+            run_metrics.finish(ok=False, error=str(e))
+        if report is not None:
+            report.add(timer.finish(ok=False, error=str(e)))
+        raise
+    except BaseException as e:  # Ctrl+C / SystemExit: gauge unduhan aktif tetap diturunkan
+        if out_index is not None and claimed_name:
+            out_index.release(*claimed_name)
+        if run_metrics is not None:
+            run_metrics.finish(ok=False, error=type(e).__name__)
+        raise
+    if run_metrics is not None:
+        run_metrics.finish(ok=True)
 
     # Tentukan path akhir (fallback ke last_filename)
     if not final_path:
         if mode == "audio" and last_filename and audio_codec_selected:
-            try:
-                final_path = str(Path(last_filename).with_suffix(f".{audio_codec_selected}"))
-            except Exception:
-                final_path = last_filename
+            final_path = _final_name(last_filename, mode, audio_codec_selected)
         else:
             final_path = last_filename or "-"
 
     # Panel keberhasilan akhir — dicetak sekali saja di luar Live
-    console.print(
-        _pretty_panel(
-            f"[bold green]✔ Berhasil[/bold green]\nDisimpan ke:\n[white]{final_path}[/white]",
-            title="Selesai",
-            style="green",
+    if not headless:
+        console.print(
+            _pretty_panel(
+                f"[bold green]✔ Berhasil[/bold green]\nDisimpan ke:\n[white]{final_path}[/white]",
+                title="Selesai",
+                style="green",
+            )
         )
-    )
+    job.success("Disimpan ke {}", final_path)
+    record = timer.finish(ok=True)
+    record["path"] = final_path
+    if report is not None:
+        report.add(record)
+    return record
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Probe kemampuan ffmpeg (versi, encoder + dukungan thread, muxer) sekali per
+# binary. Hasil di-cache di memori dan di <cache_dir>/ffmpeg-caps.json dengan key
+# path+mtime+ukuran binary, jadi upgrade ffmpeg otomatis memicu probe ulang.
+# Dipakai saat kompilasi profil audio untuk memilih encoder & gagal lebih awal.
+
+# codec target (preferredcodec yt-dlp) → (encoder urut preferensi, muxer, ekstensi)
+# Encoder pertama = pilihan bawaan FFmpegExtractAudio; sisanya cadangan.
+AUDIO_ENCODERS: Dict[str, Tuple[Tuple[str, ...], str, str]] = {
+    "mp3": (("libmp3lame", "libshine"), "mp3", "mp3"),
+    "aac": (("aac", "libfdk_aac", "aac_at"), "ipod", "m4a"),  # saat encode yt-dlp menulis .m4a
+    "m4a": (("aac", "libfdk_aac", "aac_at"), "ipod", "m4a"),
+    "opus": (("libopus", "opus"), "opus", "opus"),
+    "vorbis": (("libvorbis", "vorbis"), "ogg", "ogg"),
+    "flac": (("flac",), "flac", "flac"),
+    "alac": (("alac", "alac_at"), "ipod", "m4a"),
+    "wav": (("pcm_s16le",), "wav", "wav"),
+}
+# alias nama codec di config → nama yang dikenal FFmpegExtractAudio
+CODEC_ALIASES = {"ogg": "vorbis"}
+# encoder native yang masih ditandai eksperimental butuh -strict -2
+_EXPERIMENTAL = ("opus", "vorbis")
+
+_MEMO: Dict[str, "Caps"] = {}
+_LOCK = threading.Lock()
+# hasil probe terakhir per (binary di PATH, cache_dir) → (monotonic, caps): dipakai
+# ulang tanpa stat/baca cache selama _RECHECK detik, supaya kompilasi profil yang
+# kena cache tetap murah
+_LAST: Dict[Tuple[str, str], Tuple[float, Optional["Caps"]]] = {}
+_RECHECK = 30.0
+
+
+class Caps:
+    """Kemampuan satu binary ffmpeg."""
+
+    def __init__(self, key: str, path: str, version: str,
+                 encoders: Dict[str, Dict[str, Any]], muxers: List[str],
+                 ffprobe: Optional[str]) -> None:
+        self.key = key
+        self.path = path
+        self.version = version
+        self.encoders = encoders  # nama → {"type": "A"/"V"/"S", "threads": bool}
+        self.muxers = set(muxers)
+        self.ffprobe = ffprobe
+
+    def has_encoder(self, name: str) -> bool:
+        return name in self.encoders
+
+    def threaded(self, name: str) -> bool:
+        return bool(self.encoders.get(name, {}).get("threads"))
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"key": self.key, "path": self.path, "version": self.version,
+                "encoders": self.encoders, "muxers": sorted(self.muxers), "ffprobe": self.ffprobe}
+
+
+def _run(path: str, *args: str) -> str:
+    out = subprocess.run([path, "-hide_banner", *args], capture_output=True, text=True,
+                         stdin=subprocess.DEVNULL, timeout=30)
+    return out.stdout
+
+
+def _parse_encoders(text: str) -> Dict[str, Dict[str, Any]]:
+    # " A....D libmp3lame           libmp3lame MP3 (MPEG audio layer 3)"
+    # flag: [0]=V/A/S, [1]=F frame-thread, [2]=S slice-thread
+    out: Dict[str, Dict[str, Any]] = {}
+    for line in text.splitlines():
+        m = re.match(r"^\s([VAS][.F][.S][.X][.B][.D])\s+(\S+)", line)
+        if m and m.group(2) != "=":
+            flags = m.group(1)
+            out[m.group(2)] = {"type": flags[0], "threads": flags[1] == "F" or flags[2] == "S"}
+    return out
+
+
+def _parse_muxers(text: str) -> List[str]:
+    # " E mp3             MP3 (MPEG audio layer 3)" ; nama bisa "mov,mp4,m4a,..."
+    out: List[str] = []
+    for line in text.splitlines():
+        m = re.match(r"^\s[D ]E\s+(\S+)", line)
+        if m and m.group(1) != "=":
+            out.extend(m.group(1).split(","))
+    return out
+
+
+def _binary_key(path: str) -> str:
+    real = os.path.realpath(path)
+    st = os.stat(real)
+    return f"{real}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def probe(cfg: Optional[Dict[str, Any]] = None) -> Optional[Caps]:
+    """
+    Caps untuk ffmpeg di PATH (None bila tidak ada). Murah setelah panggilan pertama;
+    binary yang sama di cache_dir yang sama di-stat ulang paling sering tiap _RECHECK detik.
+    """
+    path = shutil.which("ffmpeg")
+    memo_key = (path or "", str((cfg or {}).get("cache_dir", "cache")))
+    last = _LAST.get(memo_key)
+    if last is not None and time.monotonic() - last[0] < _RECHECK:
+        return last[1]
+    caps = _probe(path, cfg)
+    _LAST[memo_key] = (time.monotonic(), caps)
+    return caps
+
+
+def _probe(path: Optional[str], cfg: Optional[Dict[str, Any]]) -> Optional[Caps]:
+    if path is None:
+        return None
+    try:
+        key = _binary_key(path)
+    except OSError:
+        return None
+    with _LOCK:
+        caps = _MEMO.get(key)
+        if caps is not None:
+            return caps
+        cache_file = os.path.join((cfg or {}).get("cache_dir", "cache"), "ffmpeg-caps.json")
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("key") == key:
+                caps = Caps(**data)
+        except (OSError, ValueError, TypeError):
+            caps = None
+        if caps is None:
+            try:
+                first = _run(path, "-version").splitlines()
+                version = first[0].split(" ")[2] if first and first[0].startswith("ffmpeg version") else "?"
+                caps = Caps(key, path, version, _parse_encoders(_run(path, "-encoders")),
+                            _parse_muxers(_run(path, "-muxers")), shutil.which("ffprobe"))
+            except (OSError, subprocess.SubprocessError):
+                return None
+            try:
+                os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+                with open(cache_file, "w", encoding="utf-8") as f:
+                    json.dump(caps.to_json(), f, indent=1)
+            except OSError:
+                pass
+        _MEMO[key] = caps
+        return caps
+
+
+def audio_ext(codec: Optional[str]) -> Optional[str]:
+    """Ekstensi file hasil ExtractAudio untuk codec di config (aac → m4a, ogg/vorbis → ogg)."""
+    spec = AUDIO_ENCODERS.get(CODEC_ALIASES.get(codec or "", codec or ""))
+    return spec[2] if spec else None
+
+
+def plan_audio(caps: Caps, codec: str, threads: int = 0) -> Tuple[Optional[str], List[str]]:
+    """
+    Pilih encoder untuk codec target. Hasil: (encoder, argumen output tambahan untuk
+    ExtractAudio). ValueError bila encoder/muxer/ffprobe yang dibutuhkan tidak ada.
+    Encoder bawaan yt-dlp tidak di-override (override juga memaksa re-encode saat
+    yt-dlp sebenarnya bisa stream-copy); argumen hanya ditambah untuk cadangan/thread.
+    """
+    if caps.ffprobe is None:
+        raise ValueError("ffprobe tidak ditemukan (dibutuhkan untuk ekstrak audio)")
+    codec = CODEC_ALIASES.get(codec, codec)
+    if codec == "best":
+        return None, []
+    spec = AUDIO_ENCODERS.get(codec)
+    if spec is None:
+        raise ValueError(f"Codec audio tidak dikenal: {codec}")
+    encoders, muxer, _ext = spec
+    if muxer not in caps.muxers:
+        raise ValueError(f"ffmpeg {caps.version} tidak punya muxer '{muxer}' untuk {codec}")
+    chosen = next((e for e in encoders if caps.has_encoder(e)), None)
+    if chosen is None:
+        raise ValueError(f"ffmpeg {caps.version} tidak punya encoder {codec} (butuh salah satu: {', '.join(encoders)})")
+    args: List[str] = []
+    if chosen != encoders[0] and not (codec in ("aac", "m4a") and chosen == "libfdk_aac"):
+        # yt-dlp sendiri sudah memakai libfdk_aac bila ada; cadangan lain dipaksa lewat -c:a
+        args += ["-c:a", chosen]
+        if chosen in _EXPERIMENTAL:
+            args += ["-strict", "-2"]
+    if caps.threaded(chosen):
+        args += ["-threads", str(threads or os.cpu_count() or 1)]
+    return chosen, args
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+from yt_dlp import YoutubeDL
+
+# Cache info_dict hasil ekstraksi (tanpa unduh) agar run berikutnya tidak perlu
+# mengekstrak ulang. URL format dari situs biasanya kedaluwarsa dalam hitungan
+# jam, jadi entri punya TTL (info_cache_ttl, detik).
+# Playlist tidak di-cache: sanitize_info membuang `entries`, dan stub tanpa entries
+# gagal saat diproses ulang (EntryNotInPlaylist).
+
+_MULTI_TYPES = ("playlist", "multi_video")
+
+
+def _cacheable(info: Dict[str, Any]) -> bool:
+    return info.get("_type") not in _MULTI_TYPES and info.get("entries") is None
+
+
+def _cache_path(cfg: Dict[str, Any], url: str) -> str:
+    key = hashlib.sha1(url.strip().encode("utf-8")).hexdigest()
+    return os.path.join(cfg.get("cache_dir", "cache"), "info", key[:2], f"{key}.json")
+
+
+def get(cfg: Dict[str, Any], url: str) -> Optional[Dict[str, Any]]:
+    """info_dict tersimpan untuk URL ini bila masih dalam TTL, selain itu None."""
+    ttl = float(cfg.get("info_cache_ttl", 3600) or 0)
+    if ttl <= 0:
+        return None
+    path = _cache_path(cfg, url)
+    try:
+        if time.time() - os.path.getmtime(path) > ttl:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return info if isinstance(info, dict) and _cacheable(info) else None  # stub playlist lama = miss
+
+
+def put(cfg: Dict[str, Any], url: str, info: Dict[str, Any]) -> Optional[str]:
+    """
+    Simpan info_dict (disanitasi seperti --write-info-json). Kembalikan path, None bila
+    gagal atau info berupa playlist (tidak di-cache).
+    """
+    if float(cfg.get("info_cache_ttl", 3600) or 0) <= 0 or not _cacheable(info):
+        return None
+    path = _cache_path(cfg, url)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        clean = YoutubeDL.sanitize_info(info, remove_private_keys=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(clean, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path
+    except (OSError, TypeError, ValueError):
+        return None
+
+
+def drop(cfg: Dict[str, Any], url: str) -> None:
+    try:
+        os.remove(_cache_path(cfg, url))
+    except OSError:
+        pass
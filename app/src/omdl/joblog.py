@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import atexit
+import gzip
+import itertools
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+from rich.text import Text
+
+try:
+    import fcntl
+except ImportError:  # Windows: rotasi tanpa kunci antar-proses
+    fcntl = None
+
+# Level log (angka kecil = kurang penting)
+DEBUG, INFO, SUCCESS, STEP, WARNING, ERROR = 10, 20, 25, 26, 30, 40
+
+LEVEL_NAMES = {DEBUG: "debug", INFO: "info", SUCCESS: "success", STEP: "step", WARNING: "warning", ERROR: "error"}
+
+# Markup Rich hanya dipakai saat render, tidak disimpan di record
+LEVEL_STYLES = {DEBUG: "dim", INFO: "", SUCCESS: "green", STEP: "cyan", WARNING: "yellow", ERROR: "red"}
+
+# Record ring buffer: (timestamp, level, id template atau teks mentah, args)
+Record = Tuple[float, int, Union[int, str], Tuple[Any, ...]]
+
+# Arg bertipe ini disimpan apa adanya (spesifikasi format seperti {:.1f} tetap jalan);
+# selain itu di-str() saat dicatat agar ring buffer tidak menahan objek besar/exception
+_PRIMITIVES = (str, int, float, bool, type(None))
+
+# ===== Interning template pesan =====
+_TEMPLATES: List[str] = []
+_TEMPLATE_IDS: Dict[str, int] = {}
+_TEMPLATE_LOCK = threading.Lock()
+
+
+def intern(template: str) -> int:
+    """Id numerik untuk template pesan (dipakai bersama semua job)."""
+    tid = _TEMPLATE_IDS.get(template)
+    if tid is None:
+        with _TEMPLATE_LOCK:
+            tid = _TEMPLATE_IDS.get(template)
+            if tid is None:
+                tid = len(_TEMPLATES)
+                _TEMPLATES.append(template)
+                _TEMPLATE_IDS[template] = tid
+    return tid
+
+
+def format_record(rec: Record) -> str:
+    _ts, _level, msg, args = rec
+    text = _TEMPLATES[msg] if isinstance(msg, int) else msg
+    return text.format(*args) if args else text
+
+
+class LogWriter:
+    """
+    Penulis log terstruktur (JSON lines) ke <log_dir>/omdl.log.
+    Record dikirim lewat antrean dan dikumpulkan thread latar; batch ditulis paling
+    lambat `flush_interval` detik setelah record pertamanya (atau saat mencapai
+    max_batch / close). File dirotasi ke omdl.log.N.gz saat melewati max_bytes;
+    beberapa proses boleh berbagi log_dir: tulis & rotasi dikunci lewat omdl.log.lock.
+    """
+
+    max_batch = 1000
+
+    def __init__(self, log_dir: str, max_bytes: int = 10 * 1024 * 1024,
+                 backups: int = 5, flush_interval: float = 1.0) -> None:
+        os.makedirs(log_dir, exist_ok=True)
+        self.path = os.path.join(log_dir, "omdl.log")
+        self.lock_path = self.path + ".lock"
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self._queue: "queue.SimpleQueue[Optional[Dict[str, Any]]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="omdl-log-writer", daemon=True)
+        self._closed = False
+        self._thread.start()
+
+    def submit(self, entry: Dict[str, Any]) -> None:
+        if not self._closed:
+            self._queue.put(entry)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        deadline = 0.0
+        stop = False
+        while not stop:
+            # tanpa record tertunda: tidur sampai ada record; selain itu sampai tenggat flush
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = {}
+            if item is None:
+                stop = True
+            elif item:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+            if batch and (stop or len(batch) >= self.max_batch or time.monotonic() >= deadline):
+                self._write(batch)
+                batch = []
+
+    def _lock(self, exclusive: bool):
+        """Kunci file omdl.log.lock (flock); None bila tidak didukung."""
+        if fcntl is None:
+            return None
+        try:
+            f = open(self.lock_path, "a")
+        except OSError:
+            return None
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        except OSError:
+            f.close()
+            return None
+        return f
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in batch)
+        # kunci bersama: proses lain boleh ikut menulis, tapi tidak sedang merotasi
+        lock = self._lock(exclusive=False)
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+                size = f.tell()
+        except OSError:
+            return
+        finally:
+            if lock is not None:
+                lock.close()
+        if size >= self.max_bytes:
+            lock = self._lock(exclusive=True)
+            try:
+                # proses lain mungkin sudah merotasi selagi menunggu kunci
+                if os.path.getsize(self.path) >= self.max_bytes:
+                    self._rotate()
+            except OSError:
+                pass
+            finally:
+                if lock is not None:
+                    lock.close()
+
+    def _rotate(self) -> None:
+        """Geser omdl.log.N.gz lalu gzip omdl.log (dipanggil dengan kunci eksklusif)."""
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}.gz"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}.gz")
+        tmp = self.path + ".rotating"
+        os.replace(self.path, tmp)
+        with open(tmp, "rb") as fin, gzip.open(f"{self.path}.1.gz", "wb") as fout:
+            shutil.copyfileobj(fin, fout)
+        os.remove(tmp)
+
+
+class JobLog:
+    """
+    Log satu job: ring buffer record ringkas untuk panel + salinan penuh ke LogWriter.
+    """
+
+    def __init__(self, job_id: str, fields: Dict[str, Any], ring_size: int = 200,
+                 writer: Optional[LogWriter] = None) -> None:
+        self.job_id = job_id
+        self.fields = fields
+        self.records: Deque[Record] = deque(maxlen=ring_size)
+        self._writer = writer
+
+    def log(self, level: int, template: str, *args: Any, panel: bool = True) -> None:
+        """
+        Catat pesan. `template` berisi placeholder {} untuk `args`;
+        pesan tanpa args (mis. dari yt-dlp) disimpan apa adanya tanpa di-intern.
+        panel=False → hanya ke file (tidak tampil di panel Log).
+        """
+        ts = time.time()
+        if args:
+            args = tuple(a if isinstance(a, _PRIMITIVES) else str(a) for a in args)
+        msg: Union[int, str] = intern(template) if args else template
+        rec: Record = (ts, level, msg, args)
+        if panel:
+            self.records.append(rec)
+        if self._writer is not None:
+            entry = {"ts": round(ts, 3), "level": LEVEL_NAMES.get(level, str(level)), "job": self.job_id}
+            entry.update(self.fields)
+            entry["msg"] = format_record(rec)
+            self._writer.submit(entry)
+
+    def debug(self, template: str, *args: Any, panel: bool = True) -> None:
+        self.log(DEBUG, template, *args, panel=panel)
+
+    def info(self, template: str, *args: Any) -> None:
+        self.log(INFO, template, *args)
+
+    def success(self, template: str, *args: Any) -> None:
+        self.log(SUCCESS, template, *args)
+
+    def step(self, template: str, *args: Any) -> None:
+        self.log(STEP, template, *args)
+
+    def warning(self, template: str, *args: Any) -> None:
+        self.log(WARNING, template, *args)
+
+    def error(self, template: str, *args: Any) -> None:
+        self.log(ERROR, template, *args)
+
+    def render(self, placeholder: str = "Menunggu…") -> Text:
+        """Bangun Text Rich dari ring buffer (markup/warna diterapkan di sini)."""
+        if not self.records:
+            return Text(placeholder)
+        out = Text()
+        for i, rec in enumerate(self.records):
+            if i:
+                out.append("\n")
+            out.append("• ")
+            out.append(format_record(rec), style=LEVEL_STYLES.get(rec[1], ""))
+        return out
+
+
+# ===== Hub bersama (satu writer per log_dir) =====
+_WRITERS: Dict[str, LogWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+_JOB_SEQ = itertools.count(1)
+
+
+def _writer_for(cfg: Dict[str, Any]) -> Optional[LogWriter]:
+    if not cfg.get("log_to_file", True):
+        return None
+    log_dir = os.path.abspath(cfg.get("log_dir") or "logs")
+    with _WRITERS_LOCK:
+        w = _WRITERS.get(log_dir)
+        if w is None:
+            try:
+                w = LogWriter(
+                    log_dir,
+                    max_bytes=int(cfg.get("log_max_bytes", 10 * 1024 * 1024)),
+                    backups=int(cfg.get("log_backups", 5)),
+                    flush_interval=float(cfg.get("log_flush_interval", 1.0)),
+                )
+            except OSError:
+                return None
+            _WRITERS[log_dir] = w
+        return w
+
+
+def new_job(cfg: Dict[str, Any], **fields: Any) -> JobLog:
+    """JobLog baru yang berbagi LogWriter sesuai cfg['log_dir']."""
+    job_id = f"{os.getpid()}-{next(_JOB_SEQ)}"
+    return JobLog(job_id, fields, ring_size=int(cfg.get("log_ring_size", 200)), writer=_writer_for(cfg))
+
+
+@atexit.register
+def _close_writers() -> None:
+    with _WRITERS_LOCK:
+        for w in _WRITERS.values():
+            w.close()
+        _WRITERS.clear()
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import os
+import queue
+import re
+import shutil
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .diskspace import MB, existing_parent
+from .timing import format_bytes
+
+# Mode rekam siaran langsung / premiere: bukan satu file yang tumbuh tanpa batas
+# lewat downloader yt-dlp, melainkan ffmpeg (-c copy) dengan muxer segment →
+#   <judul>.000.ts, <judul>.001.ts, ...  (rotasi tiap live_segment_seconds)
+# ffmpeg membaca manifest HLS dan menulis langsung ke segmen; buffer hanya milik
+# ffmpeg sendiri. Loop pemantau membaca -progress (teruskan ke progress hook yt-dlp),
+# menghentikan rekaman dengan 'q' saat max durasi / ruang disk menipis / stream macet,
+# dan (opsional) hanya menyimpan N segmen terakhir.
+
+LIVE_STATUSES = ("is_live", "is_upcoming")
+SEGMENT_FORMATS = {"ts": "mpegts", "mkv": "matroska"}
+_PROTOCOLS = ("m3u8", "m3u8_native", "http", "https")
+
+
+class LiveError(Exception):
+    """Rekaman live tidak bisa dimulai / tidak menghasilkan segmen."""
+
+
+def is_live(info: Dict[str, Any]) -> bool:
+    return bool(info.get("is_live")) or info.get("live_status") in LIVE_STATUSES
+
+
+def wait_params(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Opsi yt-dlp untuk menunggu stream/premiere yang belum mulai (ekstrak ulang berkala)."""
+    return {"wait_for_video": (max(5, int(cfg.get("live_wait_interval", 60) or 60)), None)}
+
+
+def estimate(info: Dict[str, Any], max_duration: Optional[float]) -> int:
+    """Perkiraan ukuran rekaman dari bitrate format × durasi maksimum (0 = tidak diketahui)."""
+    if not max_duration:
+        return 0
+    fmts = info.get("requested_formats") or [info]
+    tbr = sum(f.get("tbr") or ((f.get("vbr") or 0) + (f.get("abr") or 0)) for f in fmts)
+    return int(tbr * 1000 / 8 * max_duration)
+
+
+def _clock(seconds: float) -> str:
+    s = int(seconds)
+    return f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}"
+
+
+def _input_args(fmt: Dict[str, Any]) -> List[str]:
+    if fmt.get("protocol") not in _PROTOCOLS or not fmt.get("url"):
+        raise LiveError(f"Protokol live tidak didukung untuk rekaman: {fmt.get('protocol')}")
+    args: List[str] = ["-reconnect", "1", "-reconnect_streamed", "1"] \
+        if fmt.get("protocol") in ("http", "https") else []
+    headers = fmt.get("http_headers") or {}
+    if headers:
+        args += ["-headers", "".join(f"{k}: {v}\r\n" for k, v in headers.items())]
+    return args + ["-i", fmt["url"]]
+
+
+def _segments(base: str, ext: str) -> List[str]:
+    directory = os.path.dirname(base) or "."
+    rx = re.compile(re.escape(os.path.basename(base)) + r"\.(\d{3,})\." + re.escape(ext) + "$")
+    try:
+        found = [(int(m.group(1)), e.name) for e in os.scandir(directory)
+                 if (m := rx.match(e.name))]
+    except OSError:
+        return []
+    return [os.path.join(directory, name) for _n, name in sorted(found)]
+
+
+def _int(value: Optional[str]) -> int:
+    try:
+        return int(value or 0)
+    except ValueError:  # "N/A" sebelum paket pertama
+        return 0
+
+
+def _read_progress(stream, out: "queue.Queue[Optional[Dict[str, str]]]") -> None:
+    """Thread pembaca -progress: satu dict per blok (diakhiri progress=continue/end)."""
+    block: Dict[str, str] = {}
+    for raw in stream:
+        key, _, value = raw.decode("utf-8", "replace").strip().partition("=")
+        block[key] = value
+        if key == "progress":
+            out.put(block)
+            block = {}
+    out.put(None)
+
+
+def record(ydl, info: Dict[str, Any], planned: str, cfg: Dict[str, Any], mode: str,
+           max_duration: Optional[float], log) -> Dict[str, Any]:
+    """
+    Rekam stream live ke segmen bergilir di samping `planned` (nama file hasil
+    outtmpl). `info` = hasil process_ie_result(download=False) (format sudah dipilih).
+    Progress dilaporkan lewat progress hook yt-dlp. Ctrl+C menutup rekaman dengan
+    rapi (segmen yang sudah ada tetap valid). Kembalikan info dengan
+    requested_downloads = daftar segmen.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise LiveError("ffmpeg tidak ditemukan (dibutuhkan untuk rekaman live)")
+    fmts = info.get("requested_formats") or [info]
+    inputs: List[str] = []
+    for fmt in fmts:
+        inputs += _input_args(fmt)
+    if len(fmts) > 1:
+        maps = ["-map", "0:v:0", "-map", "1:a:0"]
+    else:
+        maps = ["-map", "0:a?"] if mode == "audio" else ["-map", "0:v?", "-map", "0:a?"]
+
+    ext = str(cfg.get("live_segment_format") or "ts").lower()
+    if ext not in SEGMENT_FORMATS:
+        ext = "ts"
+    seg_seconds = max(10, int(cfg.get("live_segment_seconds", 600) or 600))
+    keep = int(cfg.get("live_keep_segments", 0) or 0)
+    stall = float(cfg.get("live_stall_timeout", 120) or 120)
+    min_free = int(cfg.get("disk_min_free_mb", 1024)) * MB
+    base = os.path.splitext(planned)[0]
+    os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+    pattern = base.replace("%", "%%") + f".%03d.{ext}"
+    disk_path = existing_parent(planned)
+
+    cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-progress", "pipe:1", *inputs, *maps,
+           "-c", "copy"]
+    if max_duration:
+        cmd += ["-t", str(max_duration)]
+    cmd += ["-f", "segment", "-segment_time", str(seg_seconds), "-segment_format", SEGMENT_FORMATS[ext],
+            "-reset_timestamps", "1", pattern]
+    limit = f" (maks {_clock(max_duration)})" if max_duration else ""
+    log(f"Merekam live ke segmen {seg_seconds}s: {os.path.basename(base)}.NNN.{ext}{limit}")
+    ydl.to_screen(f"[download] Destination: {base}.000.{ext}")
+
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    blocks: "queue.Queue[Optional[Dict[str, str]]]" = queue.Queue(maxsize=64)
+    threading.Thread(target=_read_progress, args=(proc.stdout, blocks), daemon=True).start()
+    err_tail: List[str] = []
+
+    def _drain_stderr() -> None:
+        for raw in proc.stderr:
+            err_tail.append(raw.decode("utf-8", "replace").strip())
+            del err_tail[:-20]  # hanya ekor pesan yang disimpan
+
+    threading.Thread(target=_drain_stderr, daemon=True).start()
+
+    def _stop() -> None:
+        if proc.poll() is None:
+            try:
+                proc.stdin.write(b"q")
+                proc.stdin.flush()
+            except OSError:
+                pass
+            try:
+                proc.wait(15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+    t0 = time.monotonic()
+    last_out, last_change = -1.0, t0
+    done = removed = 0
+    stop_reason: Optional[str] = None
+    try:
+        while True:
+            try:
+                block = blocks.get(timeout=1.0)
+            except queue.Empty:
+                block = {}
+            if block is None:
+                break
+            now = time.monotonic()
+            if block:
+                # total_size milik muxer segment tidak bisa diandalkan → hitung dari file segmen
+                out_s = _int(block.get("out_time_us") or block.get("out_time_ms")) / 1e6
+                if out_s > last_out:
+                    last_out, last_change = out_s, now
+                segs = _segments(base, ext)
+                done = removed + sum(os.path.getsize(p) for p in segs if os.path.exists(p))
+                elapsed = now - t0
+                speed = done / elapsed if elapsed > 0 else None
+                eta = int(max_duration - out_s) if max_duration and out_s else None
+                for d in ydl._progress_hooks:
+                    d({"status": "downloading", "filename": segs[-1] if segs else planned,
+                       "downloaded_bytes": done, "total_bytes": None, "elapsed": elapsed,
+                       "speed": speed, "eta": eta, "info_dict": info,
+                       "_speed_str": f"{format_bytes(speed)}/s" if speed else "-",
+                       "_eta_str": _clock(eta) if eta is not None else _clock(out_s)})
+                if keep and len(segs) > keep + 1:
+                    # segmen terakhir masih ditulis; hapus yang tertua di luar jatah
+                    for old in segs[: len(segs) - keep - 1]:
+                        try:
+                            size = os.path.getsize(old)
+                            os.remove(old)
+                            removed += size
+                        except OSError:
+                            pass
+            if stop_reason is None:
+                free = shutil.disk_usage(disk_path).free
+                if free < min_free:
+                    stop_reason = f"ruang disk tinggal {free // MB} MB"
+                elif now - last_change > stall:
+                    stop_reason = f"tidak ada data baru selama {int(stall)} detik"
+                if stop_reason:
+                    log(f"Rekaman dihentikan: {stop_reason}")
+                    _stop()
+    except KeyboardInterrupt:
+        log("Rekaman dihentikan pengguna")
+        _stop()
+    except BaseException:
+        _stop()  # mis. job dibatalkan dari progress hook
+        raise
+    rc = proc.wait()
+
+    segs = _segments(base, ext)
+    if keep and len(segs) > keep:
+        for old in segs[:-keep]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        segs = segs[-keep:]
+    if not segs:
+        raise LiveError(f"ffmpeg keluar {rc} tanpa segmen: {err_tail[-1] if err_tail else '-'}")
+    for d in ydl._progress_hooks:
+        d({"status": "finished", "filename": segs[-1], "downloaded_bytes": done, "total_bytes": done,
+           "elapsed": time.monotonic() - t0, "info_dict": info})
+    info.update({"filepath": segs[-1], "ext": ext, "__real_download": True,
+                 "requested_downloads": [{"filepath": p, "ext": ext, "format_id": info.get("format_id")}
+                                         for p in segs]})
+    return info
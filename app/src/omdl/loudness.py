@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import math
+import os
+import re
+import subprocess
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from yt_dlp.postprocessor.common import PostProcessingError
+from yt_dlp.postprocessor.ffmpeg import ACODECS, FFmpegExtractAudioPP
+from yt_dlp.utils import prepend_extension
+
+try:  # analisis vektor per chunk bila NumPy terpasang; selain itu filter ebur128 ffmpeg
+    import numpy as np
+except ImportError:
+    np = None
+
+# Normalisasi loudness (EBU R128) di dalam tahap ExtractAudio:
+#   1. decode sumber ke PCM lewat pipe ffmpeg, ukur loudness terintegrasi, peak
+#      dan rentang hening per chunk (memori tetap, berapa pun panjang track);
+#   2. gain hasil ukur dipasang sebagai -af volume=… pada encode ExtractAudio yang
+#      memang akan berjalan → satu encode, bukan encode + normalisasi terpisah.
+# K-weighting dikerjakan ffmpeg (dua biquad BS.1770 @48 kHz); NumPy hanya menjumlah
+# energi blok. Loudness blok disimpan di histogram 0.1 LU, bukan list per blok.
+
+PP_KEY = "OmdlLoudness"
+
+_SR = 48000
+_SUB = _SR // 10                 # sub-blok 100 ms (blok gating 400 ms = 4 sub-blok, overlap 75%)
+_CHUNK_SUBS = 50                 # 5 detik per baca pipe
+_HIST_MIN, _HIST_MAX, _HIST_STEP = -70.0, 10.0, 0.1
+_HIST_BINS = int((_HIST_MAX - _HIST_MIN) / _HIST_STEP)
+_TOLERANCE = 0.5                 # LU; selisih lebih kecil dianggap sudah pas
+_K_WEIGHT = (
+    "biquad=b0=1.53512485958697:b1=-2.69169618940638:b2=1.19839281085285"
+    ":a0=1:a1=-1.69065929318241:a2=0.73248077421585,"
+    "biquad=b0=1:b1=-2:b2=1:a0=1:a1=-1.99004745483398:a2=0.99007225036621"
+)
+
+
+class LoudnessError(Exception):
+    """Analisis gagal (ffmpeg error / tidak ada stream audio)."""
+
+
+class Analysis:
+    """Hasil ukur satu file audio."""
+
+    def __init__(self, integrated: Optional[float], peak: Optional[float],
+                 silence: List[Tuple[float, float]], duration: Optional[float], backend: str) -> None:
+        self.integrated = integrated  # LUFS; None bila seluruhnya di bawah gate absolut
+        self.peak = peak              # sample peak, dBFS
+        self.silence = silence        # [(mulai, selesai)] detik
+        self.duration = duration
+        self.backend = backend        # "numpy" / "ffmpeg"
+
+    def gain(self, target: float, peak_limit: float) -> float:
+        """Gain (dB) menuju target, dibatasi agar peak tidak melewati peak_limit."""
+        if self.integrated is None:
+            return 0.0
+        g = target - self.integrated
+        if self.peak is not None and self.peak + g > peak_limit:
+            g = peak_limit - self.peak
+        return 0.0 if abs(g) < _TOLERANCE else round(g, 2)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"integrated": self.integrated, "peak": self.peak, "duration": self.duration,
+                "silence": [list(r) for r in self.silence], "backend": self.backend}
+
+
+def _db(power: float) -> float:
+    return 10 * math.log10(power) if power > 0 else float("-inf")
+
+
+class _Meter:
+    """Akumulator EBU R128 per chunk: histogram loudness blok, peak, rentang hening."""
+
+    def __init__(self, silence_db: float, silence_min: float) -> None:
+        self.counts = np.zeros(_HIST_BINS, dtype=np.int64)
+        self.sums = np.zeros(_HIST_BINS, dtype=np.float64)  # jumlah energi per bin (bukan nilai tengah bin)
+        self.tail = np.zeros(0, dtype=np.float64)          # 3 sub-blok terakhir (blok lintas chunk)
+        self.peak = 0.0
+        self.subs = 0
+        self.frames = 0
+        self.silence_thr = 10 ** (silence_db / 10)
+        self.silence_min = silence_min
+        self.silent_since: Optional[int] = None
+        self.silence: List[Tuple[float, float]] = []
+
+    def _close_silence(self, end: int) -> None:
+        start, self.silent_since = self.silent_since, None
+        if start is not None and (end - start) / 10 >= self.silence_min:
+            self.silence.append((start / 10, end / 10))
+
+    def feed(self, weighted, raw) -> None:
+        """weighted/raw: array (sub-blok, _SUB, channel) float32."""
+        self.frames += raw.shape[0] * raw.shape[1]
+        self.peak = max(self.peak, float(np.abs(raw).max()))
+        # BS.1770: jumlah mean-square per channel (bobot 1 untuk L/R)
+        sub_pow = np.square(weighted, dtype=np.float64).mean(axis=1).sum(axis=1)
+        seq = np.concatenate((self.tail, sub_pow))
+        if len(seq) >= 4:
+            blocks = np.convolve(seq, np.full(4, 0.25), mode="valid")
+            blocks = blocks[blocks > 0]
+            loud = -0.691 + 10 * np.log10(blocks)
+            keep = loud >= _HIST_MIN  # gate absolut -70 LUFS
+            idx = np.minimum(((loud[keep] - _HIST_MIN) / _HIST_STEP).astype(np.int64), _HIST_BINS - 1)
+            self.counts += np.bincount(idx, minlength=_HIST_BINS)
+            self.sums += np.bincount(idx, weights=blocks[keep], minlength=_HIST_BINS)
+        self.tail = seq[-3:]
+
+        # hening: mean-square sampel asli per sub-blok di bawah ambang
+        quiet = np.square(raw, dtype=np.float64).mean(axis=(1, 2)) < self.silence_thr
+        edges = np.diff(np.concatenate(([self.silent_since is not None], quiet)).astype(np.int8))
+        for i in np.nonzero(edges)[0]:
+            if edges[i] > 0:
+                self.silent_since = self.subs + int(i)
+            else:
+                self._close_silence(self.subs + int(i))
+        self.subs += len(quiet)
+
+    def feed_peak(self, raw) -> None:
+        """Sisa < 100 ms di akhir stream: hanya ikut peak dan durasi."""
+        if raw.size:
+            self.frames += raw.shape[0]
+            self.peak = max(self.peak, float(np.abs(raw).max()))
+
+    def result(self) -> Analysis:
+        self._close_silence(self.subs)
+        integrated = None
+        total = int(self.counts.sum())
+        if total:
+            rel_gate = -0.691 + _db(self.sums.sum() / total) - 10
+            first = max(0, math.ceil((rel_gate - _HIST_MIN) / _HIST_STEP))
+            n = int(self.counts[first:].sum())
+            if n:
+                integrated = round(-0.691 + _db(self.sums[first:].sum() / n), 2)
+        peak = round(20 * math.log10(self.peak), 2) if self.peak > 0 else None
+        return Analysis(integrated, peak, self.silence, round(self.frames / _SR, 2), "numpy")
+
+
+def _channels(ffprobe: Optional[str], path: str) -> int:
+    if not ffprobe:
+        return 2
+    try:
+        out = subprocess.run(
+            [ffprobe, "-v", "error", "-select_streams", "a:0", "-show_entries", "stream=channels",
+             "-of", "csv=p=0", path],
+            capture_output=True, text=True, stdin=subprocess.DEVNULL, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 2
+    return 1 if out == "1" else 2
+
+
+def _analyze_numpy(ffmpeg: str, ffprobe: Optional[str], path: str,
+                   silence_db: float, silence_min: float) -> Analysis:
+    # satu pipe f32le: channel [0:n) ter-K-weighting, [n:2n) sampel asli (untuk peak/hening).
+    # >2 channel di-downmix ke stereo (bobot surround BS.1770 tidak dihitung).
+    n = _channels(ffprobe, path)
+    layout = "mono" if n == 1 else "stereo"
+    graph = (f"[0:a:0]aresample={_SR},aformat=sample_fmts=flt:channel_layouts={layout},asplit=2[k][r];"
+             f"[k]{_K_WEIGHT}[kw];[kw][r]amerge=inputs=2[out]")
+    cmd = [ffmpeg, "-v", "error", "-nostdin", "-i", path, "-filter_complex", graph,
+           "-map", "[out]", "-f", "f32le", "-acodec", "pcm_f32le", "pipe:1"]
+    meter = _Meter(silence_db, silence_min)
+    frame_bytes = 2 * n * 4
+    step = _SUB * frame_bytes
+    with tempfile.TemporaryFile() as errf:
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=errf)
+        try:
+            carry = b""
+            while True:
+                data = proc.stdout.read(step * _CHUNK_SUBS)
+                if not data:
+                    break
+                buf = carry + data
+                usable = len(buf) // step * step
+                if usable:
+                    a = np.frombuffer(buf[:usable], dtype="<f4").reshape(-1, _SUB, 2 * n)
+                    meter.feed(a[:, :, :n], a[:, :, n:])
+                carry = buf[usable:]
+            rest = len(carry) // frame_bytes * frame_bytes
+            meter.feed_peak(np.frombuffer(carry[:rest], dtype="<f4").reshape(-1, 2 * n)[:, n:])
+            rc = proc.wait()
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+        if rc != 0:
+            errf.seek(0)
+            msg = errf.read().decode("utf-8", "replace").strip().splitlines()
+            raise LoudnessError(f"ffmpeg keluar {rc}: {msg[-1] if msg else '-'}")
+    if not meter.frames:
+        raise LoudnessError("tidak ada sampel audio")
+    return meter.result()
+
+
+def _num(text: str) -> Optional[float]:
+    return None if text in ("-inf", "nan") else float(text)
+
+
+def _analyze_ffmpeg(ffmpeg: str, path: str, silence_db: float, silence_min: float) -> Analysis:
+    """Tanpa NumPy: filter ebur128 + silencedetect ffmpeg, parse ringkasannya."""
+    cmd = [ffmpeg, "-hide_banner", "-nostats", "-nostdin", "-i", path, "-map", "0:a:0",
+           "-af", f"ebur128=peak=sample:framelog=quiet,silencedetect=n={silence_db}dB:d={silence_min}",
+           "-f", "null", "-"]
+    try:
+        out = subprocess.run(cmd, capture_output=True, text=True, errors="replace")
+    except OSError as e:
+        raise LoudnessError(str(e)) from e
+    err = out.stderr
+    if out.returncode != 0:
+        lines = err.strip().splitlines()
+        raise LoudnessError(f"ffmpeg keluar {out.returncode}: {lines[-1] if lines else '-'}")
+    summary = err[err.rfind("Summary:"):] if "Summary:" in err else ""
+    m_i = re.search(r"I:\s+(-?[\d.]+|-inf) LUFS", summary)
+    m_p = re.search(r"Peak:\s+(-?[\d.]+|-inf) dBFS", summary)
+    if m_i is None:
+        raise LoudnessError("ringkasan ebur128 tidak ditemukan")
+    integrated = _num(m_i.group(1))
+    if integrated is not None and integrated <= _HIST_MIN:
+        integrated = None
+    m_d = re.search(r"Duration: (\d+):(\d+):([\d.]+)", err)
+    duration = int(m_d.group(1)) * 3600 + int(m_d.group(2)) * 60 + float(m_d.group(3)) if m_d else None
+    starts = [float(x) for x in re.findall(r"silence_start: (-?[\d.]+)", err)]
+    ends = [float(x) for x in re.findall(r"silence_end: (-?[\d.]+)", err)]
+    if len(ends) < len(starts) and duration is not None:
+        ends.append(duration)  # hening sampai akhir file
+    silence = [(round(max(s, 0.0), 2), round(e, 2)) for s, e in zip(starts, ends)]
+    return Analysis(integrated, _num(m_p.group(1)) if m_p else None, silence, duration, "ffmpeg")
+
+
+def analyze(path: str, ffmpeg: str = "ffmpeg", ffprobe: Optional[str] = "ffprobe",
+            silence_db: float = -50.0, silence_min: float = 2.0) -> Analysis:
+    """Ukur loudness terintegrasi, sample peak dan rentang hening satu file."""
+    if np is not None:
+        return _analyze_numpy(ffmpeg, ffprobe, path, silence_db, silence_min)
+    return _analyze_ffmpeg(ffmpeg, path, silence_db, silence_min)
+
+
+def cache_key(cfg: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Bagian cfg yang memengaruhi take_over (untuk key cache profil)."""
+    if not cfg.get("loudness_normalize", False):
+        return ()
+    return (cfg.get("loudness_target"), cfg.get("loudness_peak"),
+            cfg.get("loudness_silence_db"), cfg.get("loudness_silence_min"))
+
+
+def take_over(pp_defs: List[Dict[str, Any]], cfg: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Ganti FFmpegExtractAudio dengan versi yang mengukur + menormalkan (dipanggil saat kompilasi)."""
+    out = []
+    for p in pp_defs:
+        if p.get("key") == "FFmpegExtractAudio":
+            p = dict(p, key=PP_KEY,
+                     target=float(cfg.get("loudness_target", -14.0)),
+                     peak_limit=float(cfg.get("loudness_peak", -1.0)),
+                     silence_db=float(cfg.get("loudness_silence_db", -50.0)),
+                     silence_min=float(cfg.get("loudness_silence_min", 2.0)))
+        out.append(p)
+    return out
+
+
+class LoudnessExtractAudioPP(FFmpegExtractAudioPP):
+    """ExtractAudio + normalisasi loudness: ukur sumber, pasang gain di encode yang sama."""
+
+    def __init__(self, downloader=None, preferredcodec=None, preferredquality=None,
+                 nopostoverwrites=False, target: float = -14.0, peak_limit: float = -1.0,
+                 silence_db: float = -50.0, silence_min: float = 2.0) -> None:
+        super().__init__(downloader, preferredcodec, preferredquality, nopostoverwrites)
+        self._target = target
+        self._peak_limit = peak_limit
+        self._silence_db = silence_db
+        self._silence_min = silence_min
+        self._gain = 0.0
+
+    @classmethod
+    def pp_key(cls):
+        # nama tetap "ExtractAudio": postprocessor_args extractaudio+ffmpeg_o, log & timing ikut
+        return "ExtractAudio"
+
+    def _encoder_for(self, path: str) -> Tuple[Optional[str], List[str]]:
+        """Encoder untuk codec sumber (saat yt-dlp semula hanya akan stream-copy)."""
+        spec = ACODECS.get(self.get_audio_codec(path) or "")
+        if spec is None:
+            raise PostProcessingError("codec sumber tidak bisa di-encode ulang untuk normalisasi")
+        _ext, encoder, more = spec
+        if encoder == "aac" and self._features.get("fdk"):
+            encoder = "libfdk_aac"
+        if encoder is None:
+            return None, list(more)
+        return encoder, self._quality_args(encoder)
+
+    def run_ffmpeg(self, path, out_path, codec, more_opts):
+        gain, self._gain = self._gain, 0.0
+        if gain:
+            if codec == "copy":
+                codec, more_opts = self._encoder_for(path)
+            more_opts = [*more_opts, "-af", f"volume={gain:.2f}dB"]
+        super().run_ffmpeg(path, out_path, codec, more_opts)
+
+    @FFmpegExtractAudioPP._restrict_to(images=False)
+    def run(self, information):
+        path = information["filepath"]
+        try:
+            res = analyze(self._ffmpeg_filename_argument(path), self.executable, self.probe_executable,
+                          self._silence_db, self._silence_min)
+        except LoudnessError as e:
+            self.report_warning(f"Analisis loudness gagal, normalisasi dilewati: {e}")
+            return super().run(information)
+        self._gain = res.gain(self._target, self._peak_limit)
+        fmt = lambda v: "-inf" if v is None else f"{v:.1f}"
+        self.to_screen(f"Loudness {fmt(res.integrated)} LUFS, peak {fmt(res.peak)} dBFS, "
+                       f"gain {self._gain:+.1f} dB, {len(res.silence)} rentang hening [{res.backend}]")
+        info = dict(information, omdl_loudness=dict(res.to_json(), gain=self._gain))
+        try:
+            files, info = super().run(info)
+            if self._gain and not self._nopostoverwrites:
+                # ExtractAudio tidak meng-encode (sudah format target) → encode di tempat
+                path = info["filepath"]
+                temp = prepend_extension(path, "temp")
+                self.to_screen(f"Menormalkan {path}")
+                self.run_ffmpeg(path, temp, "copy", [])
+                os.replace(temp, path)
+        finally:
+            self._gain = 0.0
+        return files, info
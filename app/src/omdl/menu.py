@@ -6,14 +6,22 @@ from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.prompt import Prompt, Confirm
+from rich.markup import escape
 from rich import box
 
 from .utils import validate_url, check_ffmpeg, clear_screen, detect_provider, ensure_dir, shorten_path, provider_badge
 from .config_loader import load_config, load_provider_cfg, save_config
 from .providers import PROVIDER_CLASS_MAP
-from .output import build_outtmpl, choose_filename_template
-from .downloader import run_download
-import sys, shutil, subprocess, yaml
+from .output import build_outtmpl, choose_filename_template, OutputIndex
+from .downloader import run_download, DownloadSession
+from . import batch
+from .timing import BatchReport, format_bytes
+from . import metrics
+from . import subtitles
+from .diskspace import sweep_orphans, existing_parent
+from .profiles import VIDEO_PRESET_FORMATS, quality_from_settings
+from .probe import Prefetch, ProbePool, format_duration
+import sys, shutil, subprocess
 
 
 console = Console()
@@ -26,14 +34,7 @@ VIDEO_PRESETS: Dict[str, str] = {
     "5": "240p",
     "6": "144p",
 }
-VIDEO_PRESET_TO_FORMAT: Dict[str, str] = {
-    "1080p": "bestvideo[height<=1080]+bestaudio/best[height<=1080]",
-    "720p":  "bestvideo[height<=720]+bestaudio/best[height<=720]",
-    "480p":  "bestvideo[height<=480]+bestaudio/best[height<=480]",
-    "360p":  "bestvideo[height<=360]+bestaudio/best[height<=360]",
-    "240p":  "bestvideo[height<=240]+bestaudio/best[height<=240]",
-    "144p":  "bestvideo[height<=144]+bestaudio/best[height<=144]",
-}
+VIDEO_PRESET_TO_FORMAT: Dict[str, str] = VIDEO_PRESET_FORMATS
 AUDIO_PRESETS: Dict[str, str] = {
     "1": "320",
     "2": "192",
@@ -50,8 +51,10 @@ def _table(title: str, data: Dict[str, str], footer: Optional[str] = None) -> No
         table.caption = f"[dim]{footer}[/dim]"
     console.print(table)
 
-def _choose(title: str, data: Dict[str, str], default_key: Optional[str] = None, allow_back=True) -> Optional[str]:
-    clear_screen()
+def _choose(title: str, data: Dict[str, str], default_key: Optional[str] = None, allow_back=True,
+            clear: bool = True) -> Optional[str]:
+    if clear:
+        clear_screen()
     _table(f"📋 {title}", data, footer="0 = Kembali • q = Keluar" if allow_back else None)
     while True:
         raw = Prompt.ask("Pilih")
@@ -184,6 +187,47 @@ def _settings_audio(cfg: dict) -> None:
             b = (val.lower() in ("on","true","1","yes","y"))
             save_config(os.getcwd(), {"embed_thumbnail": b}); cfg["embed_thumbnail"] = b
 
+def _settings_subtitles(cfg: dict) -> None:
+    while True:
+        clear_screen()
+        console.rule("[b]Settings • Subtitle[/b]")
+        console.print(
+            f"Subtitle=[bold]{'on' if cfg.get('subtitles') else 'off'}[/bold], "
+            f"Bahasa=[bold]{','.join(cfg.get('subtitle_langs') or []) or '-'}[/bold], "
+            f"Auto-caption=[bold]{cfg.get('subtitle_auto', 'fallback')}[/bold], "
+            f"Format=[bold]{cfg.get('subtitle_format', 'srt')}[/bold], "
+            f"Embed=[bold]{'on' if cfg.get('subtitle_embed') else 'off'}[/bold]"
+        )
+        key = _choose("Pilih opsi", {
+            "1": "Unduh subtitle (on/off)",
+            "2": "Bahasa (mis. id,en atau en.* atau all)",
+            "3": "Auto-caption (never/fallback/prefer)",
+            "4": "Format (srt/ass/vtt)",
+            "5": "Embed ke video (on/off)",
+        }, allow_back=True)
+        if key is None:
+            return
+        if key == "1":
+            val = Prompt.ask("Unduh subtitle? (on/off)", default="on" if cfg.get("subtitles") else "off")
+            b = (val.lower() in ("on","true","1","yes","y"))
+            save_config(os.getcwd(), {"subtitles": b}); cfg["subtitles"] = b
+        elif key == "2":
+            val = Prompt.ask("Bahasa (pisahkan dengan koma)", default=",".join(cfg.get("subtitle_langs") or ["id", "en"]))
+            langs = [s.strip() for s in val.split(",") if s.strip()]
+            if not langs:
+                console.print("[yellow]Nilai tidak valid[/yellow]"); continue
+            save_config(os.getcwd(), {"subtitle_langs": langs}); cfg["subtitle_langs"] = langs
+        elif key == "3":
+            val = Prompt.ask("Auto-caption", choices=list(subtitles.AUTO_MODES), default=str(cfg.get("subtitle_auto", "fallback")))
+            save_config(os.getcwd(), {"subtitle_auto": val}); cfg["subtitle_auto"] = val
+        elif key == "4":
+            val = Prompt.ask("Format", choices=list(subtitles.FORMATS), default=str(cfg.get("subtitle_format", "srt")))
+            save_config(os.getcwd(), {"subtitle_format": val}); cfg["subtitle_format"] = val
+        elif key == "5":
+            val = Prompt.ask("Embed ke video? (on/off)", default="on" if cfg.get("subtitle_embed") else "off")
+            b = (val.lower() in ("on","true","1","yes","y"))
+            save_config(os.getcwd(), {"subtitle_embed": b}); cfg["subtitle_embed"] = b
+
 def _settings_output(cfg: dict) -> None:
     while True:
         clear_screen()
@@ -224,6 +268,16 @@ def _ensure_batch_file(base_dir: str) -> str:
         "#      Contoh format-string (video <=1080p): bestvideo[height<=1080]+bestaudio/best\n"
         "#    - Untuk mode audio: 'best' atau 'bestaudio/best' (default akan dinormalisasi ke 'bestaudio/best')\n"
         "# 3) Tambahkan URL di bawah 'urls:' satu baris per URL (gunakan tanda ' - ').\n"
+        "# 4) (Opsional) Profil bernama dari config, untuk semua URL ('profile:' di atas)\n"
+        "#    atau per URL. Item juga boleh punya mode/quality/output/priority/section sendiri:\n"
+        "#      - url: https://youtu.be/xxxxxxxxxxx\n"
+        "#        profile: podcast-opus-64k\n"
+        "#      - url: https://youtu.be/yyyyyyyyyyy\n"
+        "#        mode: auto\n"
+        "#        quality: 720p\n"
+        "#        output: /sdcard/Movies\n"
+        "#        priority: 10      # lebih besar = lebih dulu (default 0)\n"
+        "#        section: 1:30-2:00  # hanya unduh rentang waktu ini (END kosong = sampai akhir)\n"
         "#\n"
         "\n"
         "\n"
@@ -269,144 +323,396 @@ def _open_file_external(path: str) -> bool:
     console.print(Panel.fit(f"Tidak bisa membuka file secara eksternal.\nLokasi: [bold]{path}[/bold]", style="yellow"))
     return False
 
-def _read_batch_file(path: str) -> tuple[list[str], str, str]:
+def _batch_header(path: str) -> tuple[str, str, Optional[str]]:
+    """(mode, quality, profile) level atas file batch; default bila tidak ada."""
+    header = batch.read_header(path)
+    mode = str(header.get("mode") or "auto").lower()
+    quality = str(header.get("quality") or "auto")
+    if mode not in ("auto", "audio"):
+        mode = "auto"
+    profile = header.get("profile")
+    return mode, quality, (str(profile) if profile else None)
+
+def _read_batch_file(path: str) -> tuple[list[dict], str, str]:
     """
-    Kembalikan (urls, mode, quality) dari file YAML.
+    Kembalikan (entries, mode, quality) dari file batch (YAML/teks/CSV/JSONL).
+    Item boleh string atau mapping {url, mode, quality, profile, output, priority, section}
+    (lihat batch.parse_entry); 'profile' di level atas berlaku sebagai default.
+    Untuk file besar pakai batch.iter_entries langsung (streaming).
     """
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f) or {}
-    except FileNotFoundError:
+    if not os.path.exists(path):
         return [], "auto", "auto"
-    urls = data.get("urls") or []
-    if not isinstance(urls, list):
-        urls = []
-    urls = [u for u in urls if isinstance(u, str) and u.strip()]
-    mode = str(data.get("mode") or "auto").lower()
-    quality = str(data.get("quality") or "auto")
-    if mode not in ("auto", "audio"):
-        mode = "auto"
-    return urls, mode, quality
+    mode, quality, profile = _batch_header(path)
+    return list(batch.iter_entries(path, default_profile=profile)), mode, quality
 
-def _batch_download(urls: list[str], cfg: dict, mode: str, quality: str) -> None:
+def _batch_download(urls, cfg: dict, mode: str, quality: str, checkpoint: Optional[str] = None) -> None:
     """
-    Jalankan unduhan batch secara berurutan.
-    - mode: 'auto' atau 'audio'
+    Jalankan unduhan batch.
+    - urls: list/iterable string URL atau entry (mode/quality/profile/output/priority per item);
+      boleh berupa aliran dari batch.iter_entries untuk file besar
+    - mode: 'auto' atau 'audio' (default untuk item tanpa mode/profil)
     - quality:
         * untuk 'auto' → biasanya 'auto' atau format-string yt-dlp
         * untuk 'audio' → 'best' atau 'bestaudio/best' (akan dinormalisasi)
+    - checkpoint: path file batch; offset disimpan tiap potongan selesai agar bisa dilanjutkan
+    Entry diproses per potongan (batch_chunk_size). Dalam satu potongan item dikelompokkan
+    per profil terkompilasi + cookies; tiap grup memakai satu DownloadSession (YoutubeDL
+    hangat). Priority lebih tinggi dijalankan lebih dulu di dalam potongannya.
     """
-    if not urls:
+    total = len(urls) if isinstance(urls, list) else None
+    entries = (e for e in (u if isinstance(u, dict) else batch.parse_entry(u) for u in urls) if e)
+    q_use = batch.normalize_quality(mode, quality)
+    chunk_size = max(1, int(cfg.get("batch_chunk_size", 500) or 500))
+    max_age = float(cfg.get("orphan_max_age_hours", 24) or 0)
+
+    report = BatchReport()
+    out_index = OutputIndex()  # nama file per direktori, di-scan sekali per batch
+    swept_dirs: set[str] = set()
+    seen = 0
+    idx = 0
+    started = False
+    # konfirmasi pre-flight hanya di potongan pertama; jawabannya berlaku untuk seluruh batch
+    confirm_preflight = True
+    for chunk in batch.chunks(entries, chunk_size):
+        seen += len(chunk)
+        if not started:
+            _start_metrics(cfg)
+            started = True
+        last_offset = chunk[-1].get("offset")
+
+        groups, skipped = batch.plan(chunk, cfg, mode, q_use)
+        for entry, reason in skipped:
+            console.print(Panel.fit(f"[yellow]Lewati:[/yellow] {entry['url']}\n[dim]{reason}[/dim]", style="yellow"))
+
+        if cfg.get("batch_preflight") and groups:
+            # probe per item dengan profil grupnya (mode/quality/profile per entry)
+            passed = _batch_preflight(groups, cfg, confirm=confirm_preflight)
+            if passed is None:
+                # dibatalkan: checkpoint tetap di posisi terakhir agar potongan ini diulang
+                console.print(Panel.fit("Batch dibatalkan.", style="yellow"))
+                return
+            if passed:
+                confirm_preflight = False  # sudah ditanya sekali
+            for group in groups:
+                group.items = [it for it in group.items if id(it) in passed]
+            groups = [g for g in groups if g.items]
+
+        for outdir in batch.output_dirs(groups):
+            if outdir in swept_dirs:
+                continue
+            swept_dirs.add(outdir)
+            swept = sweep_orphans(outdir, max_age)
+            if swept:
+                console.print(f"[dim]{swept} file sementara yatim dibersihkan dari {shorten_path(outdir, 60)}[/dim]")
+
+        pending = sum(len(g.items) for g in groups)
+
+        def _label(_item: dict) -> str:
+            nonlocal idx, pending
+            idx += 1
+            pending -= 1
+            metrics.set_queue_depth((total - idx) if total is not None else pending)
+            return f"Batch {idx}/{total}" if total is not None else f"Batch {idx}"
+
+        for group in groups:
+            with DownloadSession(group.profile, group.cookies_path) as session:
+                _run_group(group, session, report, out_index, _label)
+
+        if checkpoint and last_offset is not None:
+            batch.save_checkpoint(cfg, checkpoint, last_offset)
+
+    if not seen:
         console.print(Panel.fit("Daftar URL kosong.", style="yellow"))
         return
+    if checkpoint:
+        batch.clear_checkpoint(cfg, checkpoint)
+    _print_batch_report(report, cfg)
+
+def _run_group(group, session: DownloadSession, report: Optional[BatchReport],
+               out_index: Optional[OutputIndex], label) -> None:
+    """Unduh semua item satu grup batch di session yang sama; label(item) → judul rule."""
+    for item in group.items:
+        console.rule(f"[b]{label(item)}[/b] • {provider_badge(item['provider'])}")
+        try:
+            run_download(
+                provider_name=item["provider"],
+                provider_obj=item["provider_obj"],
+                url=item["url"],
+                mode=group.profile.mode,
+                quality=group.profile.format,
+                outtmpl=item["outtmpl"],
+                cookies_path=group.cookies_path,
+                audio_codec=group.profile.audio_codec,
+                audio_quality=group.profile.audio_quality,
+                report=report,
+                out_index=out_index,
+                session=session,
+                section=item.get("section"),
+            )
+        except Exception as e:
+            console.print(Panel.fit(f"[red]Gagal:[/red] {item['url']}\n[dim]{e}[/dim]", style="red"))
+
+def _batch_preflight(groups: list, cfg: dict, confirm: bool = True) -> Optional[set[int]]:
+    """
+    Probe metadata semua item grup batch (paralel, dengan profil & cookies grupnya)
+    sebelum diunduh: tampilkan estimasi ukuran, durasi & URL mati, lalu kembalikan
+    id() item yang lolos. Metadata di-cache untuk unduhan.
+    confirm=True menanyakan user dulu; None bila user menolak melanjutkan.
+    """
+    from .probe import probe_groups, results_table, summarize
+    from .timing import format_bytes
 
+    total = sum(len(g.items) for g in groups)
+    with console.status(f"Pre-flight: probe {total} URL…") as status:
+        done = 0
+
+        def _tick(_res):
+            nonlocal done
+            done += 1
+            status.update(f"Pre-flight: probe {done}/{total} URL…")
+
+        pairs = probe_groups(groups, cfg, on_result=_tick)
+    results = [res for _item, res in pairs]
+    console.print(results_table(results, title="Pre-flight Batch"))
+
+    summ = summarize(results)
     outdir = cfg.get("output_dir", "downloads")
+    try:
+        free = shutil.disk_usage(existing_parent(os.path.join(outdir, "x"))).free
+        if summ["est_bytes"] > free:
+            console.print(Panel.fit(
+                f"[red]Estimasi {format_bytes(summ['est_bytes'])} melebihi ruang kosong {format_bytes(free)}.[/red]",
+                style="red"))
+    except OSError:
+        pass
+    passed = {id(item) for item, res in pairs if res["ok"]}
+    if not passed:
+        console.print(Panel.fit("Tidak ada URL yang lolos pre-flight.", style="yellow"))
+        return set()
+    if confirm and not Confirm.ask(f"Lanjutkan {len(passed)} URL yang valid?", default=True):
+        return None
+    return passed
+
+def _start_metrics(cfg: dict) -> None:
+    """Jalankan endpoint /metrics lokal bila metrics_enabled=true (idempoten)."""
+    try:
+        addr = metrics.enable_from_config(cfg)
+    except OSError as e:
+        console.print(f"[yellow]Endpoint metrics gagal dijalankan: {e}[/yellow]")
+        return
+    if addr:
+        console.print(f"[dim]Metrics: http://{addr[0]}:{addr[1]}/metrics[/dim]")
+
+def _print_batch_report(report: BatchReport, cfg: dict) -> None:
+    """Tampilkan tabel p50/p95 per provider & tahap, lalu simpan laporan JSON ke log_dir."""
+    if not report.records:
+        return
+    console.print(report.table())
+    try:
+        path = report.write_json(cfg.get("log_dir", "logs"))
+        console.print(f"[dim]Laporan timing: {shorten_path(path, 88)}[/dim]")
+    except OSError as e:
+        console.print(f"[yellow]Gagal menulis laporan timing: {e}[/yellow]")
 
-    # Normalisasi quality untuk audio
-    if mode == "audio":
-        if quality.strip().lower() in ("auto", "best", "bestaudio", "bestaudio/best"):
-            q_use = "bestaudio/best"
+_WIZARD_ROWS = 50  # baris terakhir yang ditampilkan; layout tabel Rich mahal untuk ribuan baris
+
+def _paste_urls(items: list[dict], seen: set[str]) -> tuple[int, int, list[str]]:
+    """
+    Baca teks tempelan multi-baris sampai baris kosong; tiap URL dirapikan
+    (batch.canonical_url) & dideduplikasi. Kembalikan (ditambah, duplikat, ditolak).
+    """
+    console.print("[cyan]Tempel URL — boleh banyak baris / banyak URL per baris. Baris kosong = selesai.[/cyan]")
+    added = dup = 0
+    rejected: list[str] = []
+    while True:
+        try:
+            line = console.input("")
+        except EOFError:
+            break
+        if not line.strip():
+            break
+        tokens = batch.split_urls(line)
+        if not tokens:
+            rejected.append(line.strip())
+        for tok in tokens:
+            url = batch.canonical_url(tok)
+            prov = detect_provider(url) if url else None
+            if url is None or prov not in PROVIDER_CLASS_MAP:
+                rejected.append(tok)
+            elif url in seen:
+                dup += 1
+            else:
+                seen.add(url)
+                # badge dihitung sekali di sini; render tabel tidak mendeteksi provider lagi
+                items.append({"url": url, "badge": provider_badge(prov)})
+                added += 1
+    return added, dup, rejected
+
+def _wizard_table(items: list[dict], pool: ProbePool, last: Optional[int] = None) -> Table:
+    tbl = Table(title="Daftar URL", show_header=True, header_style="bold cyan", expand=True, box=box.ROUNDED)
+    tbl.add_column("No", style="magenta", justify="center", width=4)
+    tbl.add_column("Provider", style="white", width=12)
+    tbl.add_column("Judul / URL", ratio=1, overflow="fold")
+    tbl.add_column("Durasi", justify="right")
+    tbl.add_column("Estimasi", justify="right")
+    ok = failed = probing = 0
+    size = 0
+    for item in items:
+        res = pool.result(item["url"])
+        if res is None:
+            probing += pool.is_pending(item["url"])
+        elif res["ok"]:
+            ok += 1
+            size += res.get("est_bytes") or 0
+        else:
+            failed += 1
+    start = max(0, len(items) - last) if last else 0
+    for i, item in enumerate(items[start:], start=start + 1):
+        url = item["url"]
+        res = pool.result(url)
+        if res is None:
+            tbl.add_row(str(i), item["badge"], escape(url), "-", "[dim]probe…[/dim]" if pool.is_pending(url) else "-")
+        elif res["ok"]:
+            tbl.add_row(str(i), item["badge"], f"{escape(res.get('title') or url)}\n[dim]{escape(url)}[/dim]",
+                        format_duration(res["duration"]),
+                        format_bytes(res["est_bytes"]) if res["est_bytes"] else "?")
         else:
-            q_use = quality
+            tbl.add_row(str(i), item["badge"], f"[red]✗ {escape(str(res.get('error')))}[/red]\n[dim]{escape(url)}[/dim]",
+                        "-", "-")
+    if items:
+        parts = [f"{len(items)} URL"]
+        if ok or failed or probing:
+            parts.append(f"{ok} OK • ~{format_bytes(size)}")
+        if probing:
+            parts.append(f"probe {ok + failed}/{ok + failed + probing}")
+        if failed:
+            parts.append(f"[red]{failed} gagal[/red]")
+        if start:
+            parts.append(f"{start} baris pertama disembunyikan")
+        tbl.caption = " • ".join(parts)
     else:
-        q_use = quality or "auto"
-
-    total = len(urls)
-    for idx, url in enumerate(urls, start=1):
-        prov = detect_provider(url) or "unknown"
-        if prov not in PROVIDER_CLASS_MAP:
-            console.print(Panel.fit(f"[yellow]Lewati:[/yellow] Provider tidak dikenali untuk URL:\n{url}", style="yellow"))
-            continue
-
-        style_key = "filename_style_audio" if mode == "audio" else "filename_style_video"
-        style_val = cfg.get(style_key, "simple")
-        template = choose_filename_template(mode, style_val, cfg)
-        outtmpl = build_outtmpl(outdir, prov, template)
-        cookies_path = _resolve_cookies(cfg, prov)
-        provider_obj = _get_provider(prov, cfg)
-
-        console.rule(f"[b]Batch {idx}/{total}[/b] • {provider_badge(prov)}")
-        run_download(
-            provider_name=prov,
-            provider_obj=provider_obj,
-            url=url,
-            mode=mode,
-            quality=q_use,
-            outtmpl=outtmpl,
-            cookies_path=cookies_path,
-            audio_codec=cfg.get("audio_format_default", "mp3"),
-            audio_quality=cfg.get("audio_bitrate_default", "best"),
-            embed_thumbnail=cfg.get("embed_thumbnail", True),
-        )
+        tbl.caption = "[dim]Belum ada URL. Pilih '1' untuk menempel.[/dim]"
+    return tbl
+
+def _watch_probe(items: list[dict], pool: ProbePool) -> None:
+    """Tampilkan hasil probe saat masuk (Ctrl+C = kembali; probe tetap jalan di latar)."""
+    import time
+    from rich.live import Live
+
+    try:
+        with Live(_wizard_table(items, pool, last=15), console=console, refresh_per_second=4, transient=True) as live:
+            while pool.pending():
+                time.sleep(0.25)
+                live.update(_wizard_table(items, pool, last=15))
+    except KeyboardInterrupt:
+        pass
+
+def _remove_rows(items: list[dict], seen: set[str], pool: ProbePool, raw: str) -> None:
+    """Hapus baris nomor "N" / rentang "N-M"; kosong = baris terakhir."""
+    if not items:
+        return
+    lo, _, hi = raw.strip().partition("-")
+    try:
+        first = int(lo) if lo.strip() else len(items)
+        last = int(hi) if hi.strip() else first
+    except ValueError:
+        return
+    first, last = max(1, first), min(len(items), last)
+    gone = items[first - 1:last]
+    del items[first - 1:last]
+    urls = [g["url"] for g in gone]
+    seen.difference_update(urls)
+    pool.forget(urls)
 
 def _batch_input_wizard(cfg: dict) -> None:
     """
-    Mode input manual: user memasukkan URL satu per satu, lalu bisa mengeksekusi semuanya.
+    Mode input manual: tempel banyak URL sekaligus (multi-baris), URL dirapikan &
+    dideduplikasi saat ditempel, metadata (judul, durasi, ukuran) opsional di-probe
+    paralel di latar; lalu eksekusi semuanya.
     """
-    urls: list[str] = []
-    while True:
-        clear_screen()
-        console.rule("[b]Batch • Input manual[/b]")
-
-        # Tabel daftar URL
-        tbl = Table(title="Daftar URL", show_header=True, header_style="bold cyan", expand=True, box=box.ROUNDED)
-        tbl.add_column("No", style="magenta", justify="center", width=4)
-        tbl.add_column("Provider", style="white", width=12)
-        tbl.add_column("URL", style="white")
-        if urls:
-            for i, u in enumerate(urls, start=1):
-                prov = detect_provider(u) or "-"
-                tbl.add_row(str(i), provider_badge(prov) if prov in PROVIDER_CLASS_MAP else prov, u)
-        else:
-            tbl.caption = "[dim]Belum ada URL. Pilih '1' untuk menambah.[/dim]"
-        console.print(tbl)
-
-        # Opsi
-        ops = {
-            "1": "Tambah URL",
-            "2": "Hapus terakhir",
-            "3": "Bersihkan daftar",
-            "4": "Lanjut download",
-        }
-        key = _choose("Aksi", ops, allow_back=True)
-        if key is None:
-            return
-        if key == "1":
-            u = Prompt.ask("Tempel URL (kosong=batalkan)")
-            if not u:
-                continue
-            if not validate_url(u):
-                console.print(Panel.fit("URL tidak valid.", style="yellow")); Prompt.ask("Enter untuk lanjut"); continue
-            urls.append(u.strip())
-        elif key == "2":
-            if urls: urls.pop()
-        elif key == "3":
-            urls.clear()
-        elif key == "4":
-            if not urls:
-                console.print(Panel.fit("Daftar kosong.", style="yellow")); Prompt.ask("Enter untuk lanjut"); continue
-            # Pilih mode (sekali untuk semua)
-            mode_key = _choose("Pilih Mode", {
-                "1": "auto (media asli: original)",
-                "2": "audio (ekstrak audio)"
-            }, allow_back=False)
-            mode = "audio" if mode_key == "2" else "auto"
-            # Quality default
-            quality = "auto" if mode == "auto" else "best"
-            # Konfirmasi ringkasan
-            console.print(Panel.fit(
-                f"Akan mengunduh [bold]{len(urls)}[/bold] URL.\n"
-                f"Mode: [bold]{mode}[/bold] • Quality: [bold]{quality}[/bold]\n"
-                f"Output: [dim]{shorten_path(cfg.get('output_dir','downloads'), 72)}[/dim]",
-                title="Ringkasan Batch",
-                border_style="cyan"
-            ))
-            ok = Confirm.ask("Mulai sekarang?", default=True)
-            if not ok:
-                continue
-            _batch_download(urls, cfg, mode, quality)
-            Prompt.ask("Selesai. Enter untuk kembali ke menu Batch.")
-            return
+    items: list[dict] = []
+    seen: set[str] = set()
+    pool = ProbePool(cfg)
+    auto_probe = bool(cfg.get("batch_wizard_probe", False))
+    note: Optional[str] = None
+    try:
+        while True:
+            clear_screen()
+            console.rule("[b]Batch • Input manual[/b]")
+            console.print(_wizard_table(items, pool, last=_WIZARD_ROWS))
+            if note:
+                console.print(note)
+                note = None
+
+            ops = {
+                "1": "Tempel URL (bulk)",
+                "2": "Probe metadata" + (" [dim](otomatis saat tempel)[/dim]" if auto_probe else ""),
+                "3": "Hapus nomor / rentang",
+                "4": "Bersihkan daftar",
+                "5": "Lanjut download",
+            }
+            key = _choose("Aksi", ops, allow_back=True, clear=False)
+            if key is None:
+                return
+            if key == "1":
+                added, dup, rejected = _paste_urls(items, seen)
+                parts = [f"[green]{added} URL ditambahkan[/green]"]
+                if dup:
+                    parts.append(f"{dup} duplikat dilewati")
+                if rejected:
+                    shown = ", ".join(escape(r) for r in rejected[:3]) + (" …" if len(rejected) > 3 else "")
+                    parts.append(f"[yellow]{len(rejected)} ditolak (bukan URL / provider tidak dikenal): {shown}[/yellow]")
+                note = " • ".join(parts)
+                if auto_probe and added:
+                    pool.submit(i["url"] for i in items)
+            elif key == "2":
+                if not items:
+                    continue
+                pool.submit(i["url"] for i in items)
+                _watch_probe(items, pool)
+            elif key == "3":
+                _remove_rows(items, seen, pool, Prompt.ask("Nomor / rentang (mis. 3 atau 5-9, kosong = terakhir)", default=""))
+            elif key == "4":
+                pool.forget(seen)
+                items.clear()
+                seen.clear()
+            elif key == "5":
+                if not items:
+                    console.print(Panel.fit("Daftar kosong.", style="yellow")); Prompt.ask("Enter untuk lanjut"); continue
+                urls = [i["url"] for i in items]
+                failed = {u for u in urls if (r := pool.result(u)) is not None and not r["ok"]}
+                if failed and Confirm.ask(f"Lewati {len(failed)} URL yang gagal probe?", default=True):
+                    urls = [u for u in urls if u not in failed]
+                if not urls:
+                    continue
+                # Pilih mode (sekali untuk semua)
+                mode_key = _choose("Pilih Mode", {
+                    "1": "auto (media asli: original)",
+                    "2": "audio (ekstrak audio)"
+                }, allow_back=False)
+                mode = "audio" if mode_key == "2" else "auto"
+                # Quality default
+                quality = "auto" if mode == "auto" else "best"
+                probed = [r for u in urls if (r := pool.result(u)) is not None and r["ok"]]
+                est = (f"\nEstimasi: [bold]~{format_bytes(sum(r['est_bytes'] for r in probed))}[/bold]"
+                       f" [dim]({len(probed)}/{len(urls)} ter-probe)[/dim]") if probed else ""
+                # Konfirmasi ringkasan
+                console.print(Panel.fit(
+                    f"Akan mengunduh [bold]{len(urls)}[/bold] URL.\n"
+                    f"Mode: [bold]{mode}[/bold] • Quality: [bold]{quality}[/bold]{est}\n"
+                    f"Output: [dim]{shorten_path(cfg.get('output_dir','downloads'), 72)}[/dim]",
+                    title="Ringkasan Batch",
+                    border_style="cyan"
+                ))
+                ok = Confirm.ask("Mulai sekarang?", default=True)
+                if not ok:
+                    continue
+                pool.close()  # probe yang belum jalan dibatalkan; hasil yang ada sudah di cache info
+                _batch_download(urls, cfg, mode, quality)
+                Prompt.ask("Selesai. Enter untuk kembali ke menu Batch.")
+                return
+    finally:
+        pool.close()
 
 def batch_menu():
     """
@@ -428,12 +734,14 @@ def batch_menu():
             _open_file_external(path)
             console.print(Panel.fit("Setelah selesai mengedit file, kembali ke sini.", style="cyan"))
             if Confirm.ask("Jalankan unduhan berdasarkan file sekarang?", default=False):
-                urls, mode, quality = _read_batch_file(path)
-                if not urls:
-                    console.print(Panel.fit("Daftar URL di file kosong.", style="yellow"))
-                    Prompt.ask("Enter untuk kembali")
-                    continue
-                _batch_download(urls, cfg, mode, quality)
+                mode, quality, profile = _batch_header(path)
+                start = batch.load_checkpoint(cfg, path)
+                if start and not Confirm.ask(f"Lanjutkan batch sebelumnya (mulai byte {start})?", default=True):
+                    batch.clear_checkpoint(cfg, path)
+                    start = 0
+                # dibaca streaming: unduhan dimulai tanpa menunggu seluruh file di-parse
+                entries = batch.iter_entries(path, start, default_profile=profile)
+                _batch_download(entries, cfg, mode, quality, checkpoint=path)
                 Prompt.ask("Selesai. Enter untuk kembali ke menu Batch.")
         elif key == "2":
             _batch_input_wizard(cfg)
@@ -450,6 +758,7 @@ def settings_menu():
             "2": "Video",
             "3": "Audio",
             "4": "Output path",
+            "5": "Subtitle",
         }, allow_back=True)
         if key is None:
             return
@@ -461,33 +770,54 @@ def settings_menu():
             _settings_audio(cfg)
         elif key == "4":
             _settings_output(cfg)
+        elif key == "5":
+            _settings_subtitles(cfg)
 
 def _build_format_from_settings(cfg: dict, mode: str) -> str:
-    """
-    Ketika user pilih 'Auto' di menu kualitas, kita gunakan pengaturan default dari Settings.
-    """
-    if mode == "audio":
-        return "bestaudio/best"
-    # video
-    q = cfg.get("video_quality_default","auto")
-    if q == "best":
-        return "bestvideo*+bestaudio/best"
-    if q == "preset":
-        res = int(cfg.get("video_resolution_default", 720))
-        fmt = f"bestvideo[height<={res}]+bestaudio/best[height<={res}]"
-        # Filter codec preferensi dilakukan oleh yt-dlp saat pemilihan format; kita cukup batasi kontainer via merge_output_format
-        return fmt
-    # auto → gunakan provider default (nanti di BaseProvider)
-    return "auto"
-
-def _summary_panel(url: str, provider: str, mode: str, fmt: str, audio_quality: str, style: str, outtmpl: str) -> Panel:
+    """Lihat profiles.quality_from_settings."""
+    return quality_from_settings(cfg, mode)
+
+def _size_hint(pf: Optional[Prefetch], spec: str) -> str:
+    """Keterangan ' • 1920x1080 mp4 ~120MiB' dari metadata prefetch ('' bila belum selesai)."""
+    est = pf.estimate(spec) if pf is not None else None
+    if est is None:
+        return "  [dim]• tidak tersedia[/dim]" if pf is not None and pf.single() is not None else ""
+    label, size = est
+    return f"  [dim]• {label}{' ~' + format_bytes(size) if size else ''}[/dim]"
+
+def _bitrate_hint(pf: Optional[Prefetch], kbps: str) -> str:
+    """Perkiraan ukuran file audio hasil transcode pada bitrate ini."""
+    info = pf.single() if pf is not None else None
+    if not info or not info.get("duration"):
+        return ""
+    return f"  [dim]• ~{format_bytes(int(kbps) * 1000 / 8 * float(info['duration']))}[/dim]"
+
+def _await_prefetch(pf: Optional[Prefetch], timeout: Optional[float], text: str) -> None:
+    if pf is None or pf.done():
+        return
+    with console.status(text):
+        pf.wait(timeout)
+
+def _summary_panel(url: str, provider: str, mode: str, fmt: str, audio_quality: str, style: str, outtmpl: str,
+                   pf: Optional[Prefetch] = None) -> Panel:
     tbl = Table.grid(padding=(0,1))
     tbl.add_column(justify="right", style="dim")
     tbl.add_column()
     tbl.add_row("URL", f"[link={url}]{url}[/link]")
     tbl.add_row("Provider", provider_badge(provider))
+    if pf is not None and pf.info is not None:
+        tbl.add_row("Judul", escape(str(pf.info.get("title") or "-")))
+        if pf.info.get("duration"):
+            tbl.add_row("Durasi", format_duration(float(pf.info["duration"])))
+        est = pf.estimate(fmt)
+        if est is not None:
+            tbl.add_row("Format", f"{est[0]}{' • ~' + format_bytes(est[1]) if est[1] else ''}")
+    elif pf is not None and pf.error:
+        tbl.add_row("Metadata", f"[yellow]{escape(pf.error)}[/yellow]")
+    elif pf is not None:
+        tbl.add_row("Metadata", "[dim]masih diambil di latar…[/dim]")
     tbl.add_row("Mode", f"{mode}")
-    tbl.add_row("Quality", f"{fmt}")
+    tbl.add_row("Quality", escape(fmt))
     tbl.add_row("Audio bitrate", f"{audio_quality}")
     tbl.add_row("Filename style", f"{style}")
     tbl.add_row("Output", f"[dim]{shorten_path(outtmpl, 88)}[/dim]")
@@ -524,6 +854,9 @@ def interactive_menu():
             provider = detect_provider(url)
             if not provider:
                 console.print("[red]Provider tidak terdeteksi dari URL[/red]"); Prompt.ask("Enter untuk kembali"); continue
+            # ekstraksi berjalan di latar selagi prompt berikut dijawab
+            pf = Prefetch(url, cfg, provider) if cfg.get("menu_prefetch", True) else None
+            wait_s = float(cfg.get("menu_prefetch_wait", 5) or 0)
 
             # ---- step: mode ----
             mode_key = _choose("Pilih Mode", {"1": "auto (media asli: original)", "2": "audio (ekstrak audio)"})
@@ -533,10 +866,12 @@ def interactive_menu():
 
             # ---- step: kualitas ----
             if mode == "audio":
-                kq = _choose("Pilih Kualitas Audio", {"1": "Auto (bestaudio/best)", "2": "Best", "3": "Preset bitrate"}, default_key="1")
+                src = _size_hint(pf, "bestaudio/best")
+                kq = _choose("Pilih Kualitas Audio", {"1": "Auto (bestaudio/best)" + src, "2": "Best" + src, "3": "Preset bitrate"}, default_key="1")
                 preset_choice = None
                 if kq == "3":
-                    preset_choice = _choose("Pilih Bitrate", {"1": "320 Kbps", "2": "192 Kbps", "3": "128 Kbps"}, default_key="1")
+                    _await_prefetch(pf, wait_s, "Mengambil durasi untuk perkiraan ukuran…")
+                    preset_choice = _choose("Pilih Bitrate", {k: f"{v} Kbps{_bitrate_hint(pf, v)}" for k, v in AUDIO_PRESETS.items()}, default_key="1")
                 if kq is None:
                     continue
                 if kq == "1":
@@ -549,7 +884,12 @@ def interactive_menu():
                     fmt = "bestaudio/best"
                     audio_quality = {"1":"320","2":"192","3":"128"}[preset_choice]
             else:
-                kq = _choose("Pilih Kualitas Video/Media", {"1": "Auto (pakai Settings)", "2": "Best", "3": "Preset resolusi", "4": "Format manual (yt-dlp)"}, default_key="1")
+                kq = _choose("Pilih Kualitas Video/Media", {
+                    "1": "Auto (pakai Settings)" + _size_hint(pf, _build_format_from_settings(cfg, "auto")),
+                    "2": "Best" + _size_hint(pf, "bestvideo*+bestaudio/best"),
+                    "3": "Preset resolusi",
+                    "4": "Format manual (yt-dlp)",
+                }, default_key="1")
                 if kq is None:
                     continue
                 if kq == "1":
@@ -557,7 +897,9 @@ def interactive_menu():
                 elif kq == "2":
                     fmt = "bestvideo*+bestaudio/best"
                 elif kq == "3":
-                    res_key = _choose("Pilih Preset Resolusi", {k:v for k,v in VIDEO_PRESETS.items()}, default_key="2")
+                    # daftar resolusi menunjukkan format & ukuran yang benar-benar tersedia
+                    _await_prefetch(pf, wait_s, "Mengambil daftar resolusi…")
+                    res_key = _choose("Pilih Preset Resolusi", {k: v + _size_hint(pf, VIDEO_PRESET_TO_FORMAT[v]) for k, v in VIDEO_PRESETS.items()}, default_key="2")
                     if res_key is None:
                         continue
                     res_label = VIDEO_PRESETS[res_key]
@@ -579,12 +921,14 @@ def interactive_menu():
             cookies_path = _resolve_cookies(cfg, provider)
 
             clear_screen()
-            console.print(_summary_panel(url, provider, mode, fmt, audio_quality, style, outtmpl))
+            console.print(_summary_panel(url, provider, mode, fmt, audio_quality, style, outtmpl, pf))
             ok = Confirm.ask("Lanjutkan unduh?", default=True)
             if not ok:
                 continue
 
             provider_obj = _get_provider(provider, cfg)
+            # ekstraksi latar biasanya sudah selesai; bila belum, menunggu lebih murah daripada mengulang
+            _await_prefetch(pf, None, "Menunggu metadata…")
 
             console.rule(provider_badge(provider))
             run_download(
@@ -598,6 +942,7 @@ def interactive_menu():
                 audio_codec=cfg.get("audio_format_default","mp3"),
                 audio_quality=audio_quality,
                 embed_thumbnail=cfg.get("embed_thumbnail", True),
+                prefetched=pf.info if pf is not None else None,
             )
             Prompt.ask("Selesai. Enter untuk kembali ke menu utama.")
         elif choice == "2":
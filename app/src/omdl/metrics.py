@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Endpoint metrics lokal (format teks eksposisi Prometheus) untuk worker omdl
+# yang berjalan lama. Nonaktif secara default: selama enable() belum dipanggil,
+# get() mengembalikan None dan run_download tidak memasang observer apa pun.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Detik; cukup lebar untuk unduhan kecil sampai rekaman panjang
+DEFAULT_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str) -> None:
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_fmt_labels(k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label -> (counts per bucket, sum, count)
+        self._values: Dict[LabelKey, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            counts, total, n = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, n + 1)
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            items = [(k, (list(c), s, n)) for k, (c, s, n) in self._values.items()]
+        lines = self.header()
+        for key, (counts, total, n) in items:
+            for bound, c in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, [('le', _fmt_value(bound))])} {c}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {n}")
+        return lines
+
+
+class Registry:
+    """Kumpulan metrik omdl. Satu instance per proses (lihat enable/get)."""
+
+    def __init__(self) -> None:
+        self.bytes_downloaded = Counter(
+            "omdl_downloaded_bytes_total", "Total byte media yang diunduh.")
+        self.downloads = Counter(
+            "omdl_downloads_total", "Jumlah unduhan selesai per provider dan status.")
+        self.errors = Counter(
+            "omdl_errors_total", "Jumlah unduhan gagal per provider.")
+        self.retries = Counter(
+            "omdl_retries_total", "Jumlah retry yang dilaporkan yt-dlp.")
+        self.active = Gauge(
+            "omdl_active_downloads", "Unduhan yang sedang berjalan.")
+        self.queue_depth = Gauge(
+            "omdl_queue_depth", "Item yang masih menunggu di antrean.")
+        self.download_seconds = Histogram(
+            "omdl_download_duration_seconds", "Durasi total satu unduhan.")
+        self.ffmpeg_seconds = Histogram(
+            "omdl_ffmpeg_seconds", "Durasi postprocessor (ffmpeg) per jenis.")
+        self._metrics: List[_Metric] = [
+            self.bytes_downloaded, self.downloads, self.errors, self.retries,
+            self.active, self.queue_depth, self.download_seconds, self.ffmpeg_seconds,
+        ]
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines.extend(m.expose())
+        return "\n".join(lines) + "\n"
+
+
+class RunObserver:
+    """
+    Observer satu unduhan; antarmukanya sama dengan timing.StageTimer
+    (on_log / on_progress / on_postprocess) sehingga dipanggil dari hook yang sama.
+    """
+
+    def __init__(self, registry: Registry, provider: str) -> None:
+        self.reg = registry
+        self.provider = provider
+        self._file_bytes: Dict[str, int] = {}
+        self._pp_started: Dict[str, float] = {}
+        self._t0 = time.monotonic()
+        registry.active.inc()
+
+    def on_log(self, msg: str) -> None:
+        if "Retrying" in msg:
+            self.reg.retries.inc(provider=self.provider)
+
+    def on_progress(self, d: Dict[str, Any]) -> None:
+        if d.get("status") not in ("downloading", "finished"):
+            return
+        name = str(d.get("filename") or "")
+        now = int(d.get("downloaded_bytes") or d.get("total_bytes") or 0)
+        prev = self._file_bytes.get(name, 0)
+        if now > prev:
+            self.reg.bytes_downloaded.inc(now - prev, provider=self.provider)
+            self._file_bytes[name] = now
+
+    def on_postprocess(self, d: Dict[str, Any]) -> None:
+        pp = str(d.get("postprocessor") or "unknown")
+        if d.get("status") == "started":
+            self._pp_started.setdefault(pp, time.monotonic())
+        elif d.get("status") == "finished":
+            t = self._pp_started.pop(pp, None)
+            if t is not None:
+                self.reg.ffmpeg_seconds.observe(time.monotonic() - t, postprocessor=pp)
+
+    def finish(self, ok: bool = True, error: Optional[str] = None) -> None:
+        self.reg.active.dec()
+        self.reg.download_seconds.observe(time.monotonic() - self._t0, provider=self.provider)
+        self.reg.downloads.inc(provider=self.provider, status="ok" if ok else "error")
+        if not ok:
+            self.reg.errors.inc(provider=self.provider)
+
+
+# ===== State global (nonaktif = None) =====
+_REGISTRY: Optional[Registry] = None
+_SERVER: Optional[ThreadingHTTPServer] = None
+_LOCK = threading.Lock()
+
+
+def get() -> Optional[Registry]:
+    return _REGISTRY
+
+
+def observer(provider: str) -> Optional[RunObserver]:
+    """RunObserver baru bila metrics aktif, selain itu None (tanpa biaya)."""
+    reg = _REGISTRY
+    return RunObserver(reg, provider) if reg is not None else None
+
+
+def set_queue_depth(n: int) -> None:
+    reg = _REGISTRY
+    if reg is not None:
+        reg.queue_depth.set(n)
+
+
+def _handler_for(registry: Registry):
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802 (nama dari http.server)
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            # jangan mengotori layar Rich
+            pass
+
+    return _Handler
+
+
+def enable(host: str = "127.0.0.1", port: int = 9464) -> Tuple[str, int]:
+    """
+    Aktifkan registry dan jalankan HTTP server /metrics di thread daemon.
+    Idempoten; port=0 memilih port bebas. Mengembalikan (host, port) aktual.
+    """
+    global _REGISTRY, _SERVER
+    with _LOCK:
+        if _SERVER is None:
+            reg = _REGISTRY or Registry()
+            server = ThreadingHTTPServer((host, int(port)), _handler_for(reg))
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="omdl-metrics", daemon=True).start()
+            _REGISTRY, _SERVER = reg, server
+        addr = _SERVER.server_address
+        return str(addr[0]), int(addr[1])
+
+
+def disable() -> None:
+    global _REGISTRY, _SERVER
+    with _LOCK:
+        if _SERVER is not None:
+            _SERVER.shutdown()
+            _SERVER.server_close()
+        _REGISTRY, _SERVER = None, None
+
+
+def enable_from_config(cfg: Dict[str, Any]) -> Optional[Tuple[str, int]]:
+    """Aktifkan endpoint bila cfg['metrics_enabled'] bernilai true."""
+    if not cfg.get("metrics_enabled"):
+        return None
+    return enable(str(cfg.get("metrics_host") or "127.0.0.1"), int(cfg.get("metrics_port") or 9464))
@@ -1,6 +1,10 @@
 from __future__ import annotations
 import os
+import threading
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 
+@lru_cache(maxsize=256)
 def build_outtmpl(output_dir: str, provider: str, filename_template: str) -> str:
     """
     Kembalikan path outtmpl seperti:
@@ -27,3 +31,88 @@ def choose_filename_template(mode: str, style: str, cfg: dict) -> str:
             return cfg.get("filename_template_video_nerd") or cfg.get("filename_template_video") or "%(title)s.%(ext)s"
         else:
             return cfg.get("filename_template_video") or "%(title)s.%(ext)s"
+
+def template_table(cfg: dict) -> Dict[Tuple[str, str], str]:
+    """
+    Pre-compute semua template nama file (mode × style) sekali per batch,
+    supaya loop per-URL cukup lookup dict.
+    """
+    return {
+        (mode, style): choose_filename_template(mode, style, cfg)
+        for mode in ("auto", "audio")
+        for style in ("simple", "nerd", "")
+    }
+
+def escape_outtmpl(path: str) -> str:
+    """Jadikan path literal aman dipakai sebagai outtmpl yt-dlp."""
+    return path.replace("%", "%%")
+
+class OutputIndex:
+    """
+    Indeks nama file yang sudah ada per direktori output.
+    Tiap direktori di-scan sekali (os.scandir) lalu disimpan di memori, sehingga
+    cek "sudah ada" dan tabrakan nama tidak perlu stat ke filesystem per URL.
+    Nilai dict = id pemilik (None bila file sudah ada sebelum batch dimulai).
+    """
+
+    def __init__(self) -> None:
+        self._dirs: Dict[str, Dict[str, Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    def _names(self, directory: str) -> Dict[str, Optional[str]]:
+        key = os.path.abspath(directory)
+        names = self._dirs.get(key)
+        if names is None:
+            names = {}
+            try:
+                with os.scandir(key) as it:
+                    for entry in it:
+                        names[entry.name] = None
+            except OSError:
+                pass
+            self._dirs[key] = names
+        return names
+
+    def exists(self, path: str) -> bool:
+        with self._lock:
+            return os.path.basename(path) in self._names(os.path.dirname(path))
+
+    def add(self, path: str, owner: Optional[str] = None) -> None:
+        with self._lock:
+            self._names(os.path.dirname(path))[os.path.basename(path)] = owner
+
+    def release(self, path: str, owner: str) -> None:
+        """Lepas klaim nama (mis. unduhan gagal) agar bisa diklaim ulang."""
+        with self._lock:
+            names = self._names(os.path.dirname(path))
+            if names.get(os.path.basename(path)) == owner:
+                del names[os.path.basename(path)]
+
+    def claim(self, path: str, owner: str) -> Tuple[str, str]:
+        """
+        Klaim nama file final untuk item `owner`.
+        Kembalikan (status, path):
+          - ("new", path)      : nama bebas, dicatat milik owner
+          - ("exists", path)   : file sudah ada (milik owner sama / sudah ada sebelum batch)
+          - ("renamed", path2) : nama dipakai item lain di batch ini → "judul [id].ext"
+                                 (lalu "judul [id] (2).ext", … bila itu pun milik item lain)
+        """
+        directory, name = os.path.split(path)
+        with self._lock:
+            names = self._names(directory)
+            if name not in names:
+                names[name] = owner
+                return "new", path
+            if names[name] in (None, owner):
+                return "exists", path
+            stem, ext = os.path.splitext(name)
+            alt = f"{stem} [{owner}]{ext}"
+            n = 1
+            while alt in names:
+                # None = file lama bernama "judul [id]" → hasil unduhan id yang sama
+                if names[alt] in (None, owner):
+                    return "exists", os.path.join(directory, alt)
+                n += 1
+                alt = f"{stem} [{owner}] ({n}){ext}"
+            names[alt] = owner
+            return "renamed", os.path.join(directory, alt)
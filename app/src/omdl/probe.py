@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from rich.markup import escape
+from rich.table import Table
+from rich import box
+from yt_dlp import YoutubeDL
+
+from . import infocache
+from .config_loader import resolve_cookies
+from .diskspace import estimate_bytes
+from .profiles import DownloadProfile, ProfileError, compile_profile
+from .providers import PROVIDER_CLASS_MAP, get_provider
+from .timing import format_bytes
+from .utils import detect_provider, provider_badge
+
+
+class _SilentLogger:
+    """yt-dlp tanpa output (probe berjalan paralel di thread latar)."""
+
+    def debug(self, msg):
+        pass
+
+    info = warning = debug
+
+    def error(self, msg):
+        pass
+
+
+def _probe_opts(provider_obj, mode: str, quality: str, cookies_path: Optional[str]) -> Dict[str, Any]:
+    return _profile_opts(compile_profile(provider_obj, mode, quality), cookies_path)
+
+
+def _profile_opts(profile: DownloadProfile, cookies_path: Optional[str]) -> Dict[str, Any]:
+    # Probe hanya memilih format; postprocessor profil tidak dipasang
+    opts: Dict[str, Any] = profile.new_opts()
+    if cookies_path:
+        opts["cookiefile"] = cookies_path
+    opts.update({"quiet": True, "no_warnings": True, "noprogress": True, "logger": _SilentLogger()})
+    return opts
+
+
+def _chosen_format(info: Dict[str, Any]) -> str:
+    if info.get("entries") is not None:
+        return f"playlist ({len([e for e in info['entries'] if e])} item)"
+    return str(info.get("format_id") or info.get("format") or "-")
+
+
+def _duration(info: Dict[str, Any]) -> float:
+    if info.get("entries") is not None:
+        return float(sum(_duration(e) for e in info["entries"] if e))
+    return float(info.get("duration") or 0)
+
+
+def probe_url(url: str, cfg: Dict[str, Any], mode: str, quality: str,
+              seed_cache: bool = True, _local: Optional[threading.local] = None,
+              profile: Optional[DownloadProfile] = None,
+              cookies_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Ekstrak metadata saja (tanpa unduh) untuk satu URL.
+    `profile` (+ `cookies_path`) = profil terkompilasi item batch; bila diberikan,
+    mode/quality diabaikan. Hasil: dict {url, provider, ok, id, title, duration,
+    format, est_bytes, error}.
+    """
+    res: Dict[str, Any] = {"url": url, "provider": None, "ok": False, "id": None, "title": None,
+                           "duration": 0.0, "format": None, "est_bytes": 0, "error": None}
+    prov = detect_provider(url)
+    res["provider"] = prov
+    if prov not in PROVIDER_CLASS_MAP:
+        res["error"] = "Provider tidak dikenali"
+        return res
+
+    # Satu YoutubeDL per (thread, provider): extractor & cookie jar tetap hangat
+    cache = getattr(_local, "ydls", None) if _local is not None else None
+    if cache is None:
+        cache = {}
+        if _local is not None:
+            _local.ydls = cache
+    key: Any = (prov, profile, cookies_path) if profile is not None else prov
+    ydl = cache.get(key)
+    if ydl is None:
+        if profile is not None:
+            opts = _profile_opts(profile, cookies_path)
+        else:
+            provider_obj = get_provider(prov, cfg)
+            try:
+                opts = _probe_opts(provider_obj, mode, quality, resolve_cookies(cfg, prov))
+            except ProfileError as e:  # encoder ffmpeg hilang → gagal di pre-flight, bukan saat unduh
+                res["error"] = str(e)
+                return res
+        ydl = cache[key] = YoutubeDL(opts)
+
+    try:
+        info = ydl.extract_info(url, download=False)
+    except Exception as e:  # DownloadError/ExtractorError: URL mati, privat, geo-block, dll.
+        res["error"] = str(e).replace("ERROR: ", "", 1)
+        return res
+    if not info:
+        res["error"] = "Metadata kosong"
+        return res
+
+    res.update({
+        "ok": True,
+        "id": info.get("id"),
+        "title": info.get("title"),
+        "duration": _duration(info),
+        "format": _chosen_format(info),
+        "est_bytes": estimate_bytes(info),
+    })
+    if seed_cache:
+        infocache.put(cfg, url, info)
+    return res
+
+
+def probe_urls(
+    urls: Iterable[str],
+    cfg: Dict[str, Any],
+    mode: str = "auto",
+    quality: str = "auto",
+    workers: Optional[int] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    seed_cache: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Probe banyak URL paralel dengan konkurensi terbatas (probe_concurrency).
+    Urutan hasil mengikuti urutan input; on_result dipanggil begitu tiap URL selesai.
+    """
+    local = threading.local()
+    calls = [(lambda u=u: probe_url(u, cfg, mode, quality, seed_cache, local)) for u in urls]
+    return _parallel(calls, cfg, workers, on_result)
+
+
+def probe_groups(
+    groups,
+    cfg: Dict[str, Any],
+    workers: Optional[int] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    seed_cache: bool = True,
+) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Probe item hasil batch.plan dengan profil & cookies grupnya masing-masing, jadi
+    mode/quality/profile per item ikut dipakai (estimasi ukuran, format, seed cache).
+    Hasil: list (item, hasil) urut grup lalu item.
+    """
+    local = threading.local()
+    items = [(g, item) for g in groups for item in g.items]
+    calls = [(lambda g=g, it=it: probe_url(it["url"], cfg, g.profile.mode, g.profile.format, seed_cache,
+                                           local, profile=g.profile, cookies_path=g.cookies_path))
+             for g, it in items]
+    results = _parallel(calls, cfg, workers, on_result)
+    return [(it, res) for (_g, it), res in zip(items, results)]
+
+
+def _parallel(calls: List[Callable[[], Dict[str, Any]]], cfg: Dict[str, Any], workers: Optional[int],
+              on_result: Optional[Callable[[Dict[str, Any]], None]]) -> List[Dict[str, Any]]:
+    """Jalankan probe paralel (probe_concurrency); hasil urut sesuai input."""
+    workers = max(1, int(workers or cfg.get("probe_concurrency", 4)))
+    results: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="omdl-probe") as pool:
+        futures = {pool.submit(call): i for i, call in enumerate(calls)}
+        for fut in as_completed(futures):
+            res = fut.result()
+            results[futures[fut]] = res
+            if on_result is not None:
+                on_result(res)
+    return [r for r in results if r is not None]
+
+
+class ProbePool:
+    """
+    Probe latar untuk daftar URL yang terus bertambah (wizard batch): submit() tidak
+    memblokir, hasil dibaca kapan saja lewat result(). Konkurensi = probe_concurrency;
+    hasil juga mengisi cache info sehingga unduhan berikutnya tidak mengekstrak ulang.
+    """
+
+    def __init__(self, cfg: Dict[str, Any], mode: str = "auto", quality: str = "auto",
+                 workers: Optional[int] = None) -> None:
+        self._cfg = cfg
+        self._mode = mode
+        self._quality = quality
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers or cfg.get("probe_concurrency", 4))),
+                                        thread_name_prefix="omdl-probe")
+        self._lock = threading.Lock()
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._futures: Dict[str, Future] = {}
+
+    def submit(self, urls: Iterable[str]) -> int:
+        """Antrekan URL yang belum pernah di-probe; kembalikan jumlah yang baru diantrekan."""
+        added = 0
+        with self._lock:
+            for url in urls:
+                if url in self._results or url in self._futures:
+                    continue
+                fut = self._pool.submit(probe_url, url, self._cfg, self._mode, self._quality, True, self._local)
+                self._futures[url] = fut
+                fut.add_done_callback(lambda f, u=url: self._finish(u, f))
+                added += 1
+        return added
+
+    def _finish(self, url: str, fut: Future) -> None:
+        if fut.cancelled():
+            res = None
+        else:
+            exc = fut.exception()
+            res = fut.result() if exc is None else {"url": url, "provider": None, "ok": False, "error": str(exc)}
+        with self._lock:
+            self._futures.pop(url, None)
+            if res is not None:
+                self._results[url] = res
+
+    def result(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._results.get(url)
+
+    def is_pending(self, url: str) -> bool:
+        with self._lock:
+            return url in self._futures
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._futures)
+
+    def forget(self, urls: Iterable[str]) -> None:
+        """Batalkan probe yang belum jalan & buang hasil untuk URL ini (dihapus dari daftar)."""
+        with self._lock:
+            for url in urls:
+                self._results.pop(url, None)
+                fut = self._futures.get(url)
+                if fut is not None:
+                    fut.cancel()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class Prefetch:
+    """
+    Ekstraksi metadata satu URL di thread latar (menu interaktif): dimulai begitu
+    URL valid, selagi pengguna menjawab prompt mode/kualitas/nama file. Hasilnya
+    dipakai prompt kualitas (resolusi & ukuran nyata) lalu diteruskan ke
+    run_download(prefetched=...) sehingga unduhan tidak mengekstrak ulang.
+    """
+
+    def __init__(self, url: str, cfg: Dict[str, Any], provider: str) -> None:
+        self.url = url
+        self.info: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self._ydl: Optional[YoutubeDL] = None
+        self._done = threading.Event()
+        threading.Thread(target=self._run, args=(cfg, provider), name="omdl-prefetch", daemon=True).start()
+
+    def _run(self, cfg: Dict[str, Any], provider: str) -> None:
+        try:
+            provider_obj = get_provider(provider, cfg)
+            self._ydl = YoutubeDL(_probe_opts(provider_obj, "auto", "auto", resolve_cookies(cfg, provider)))
+            info = self._ydl.extract_info(self.url, download=False)
+            if not info:
+                raise ValueError("Metadata kosong")
+            infocache.put(cfg, self.url, info)
+            self.info = info
+        except Exception as e:  # thread latar: error disimpan, unduhan nanti mengekstrak sendiri
+            self.error = str(e).replace("ERROR: ", "", 1)
+        finally:
+            self._done.set()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Tunggu ekstraksi (maks `timeout` detik); info_dict atau None bila gagal/belum selesai."""
+        self._done.wait(timeout)
+        return self.info
+
+    def single(self) -> Optional[Dict[str, Any]]:
+        """info_dict bila sudah selesai dan berupa satu video (bukan playlist)."""
+        info = self.info if self.done() else None
+        return info if info is not None and info.get("entries") is None else None
+
+    def estimate(self, spec: str) -> Optional[Tuple[str, int]]:
+        """
+        (label resolusi/format, perkiraan byte) bila format yt-dlp `spec` ("auto" =
+        default provider) diterapkan ke format yang tersedia; None bila metadata
+        belum ada / spec tidak cocok.
+        """
+        info = self.single()
+        if info is None or self._ydl is None:
+            return None
+        if spec == "auto":
+            fmt = info  # default provider = format yang sudah dipilih saat prefetch
+        else:
+            try:
+                chosen = self._ydl._select_formats(info.get("formats") or [], self._ydl.build_format_selector(spec))
+            except Exception:
+                return None
+            if not chosen:
+                return None
+            fmt = chosen[0]
+        label = fmt.get("resolution") or fmt.get("format_note") or str(fmt.get("format_id"))
+        if fmt.get("ext"):
+            label = f"{label} {fmt['ext']}"
+        return label, estimate_bytes(dict(fmt, duration=info.get("duration")))
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds or 0)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    ok = [r for r in results if r["ok"]]
+    return {
+        "count": len(results),
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "est_bytes": sum(r["est_bytes"] for r in ok),
+        "duration": sum(r["duration"] for r in ok),
+        "unknown_size": sum(1 for r in ok if not r["est_bytes"]),
+    }
+
+
+def results_table(results: List[Dict[str, Any]], title: str = "Probe Metadata") -> Table:
+    t = Table(title=title, show_header=True, header_style="bold cyan", expand=True, box=box.ROUNDED)
+    t.add_column("No", style="magenta", justify="center", width=4)
+    t.add_column("Provider", width=12)
+    t.add_column("Judul / Error", ratio=1, overflow="fold")
+    t.add_column("Durasi", justify="right")
+    t.add_column("Format", justify="right")
+    t.add_column("Estimasi", justify="right")
+    for i, r in enumerate(results, start=1):
+        prov = r.get("provider")
+        badge = provider_badge(prov) if prov in PROVIDER_CLASS_MAP else (prov or "-")
+        if r["ok"]:
+            t.add_row(str(i), badge, escape(r.get("title") or r["url"]), format_duration(r["duration"]),
+                      r.get("format") or "-", format_bytes(r["est_bytes"]) if r["est_bytes"] else "?")
+        else:
+            t.add_row(str(i), badge, f"[red]✗ {escape(str(r.get('error')))}[/red]\n[dim]{escape(r['url'])}[/dim]", "-", "-", "-")
+    summ = summarize(results)
+    t.caption = (
+        f"{summ['ok']}/{summ['count']} OK • total ~{format_bytes(summ['est_bytes'])}"
+        f"{' (+' + str(summ['unknown_size']) + ' tanpa ukuran)' if summ['unknown_size'] else ''}"
+        f" • durasi {format_duration(summ['duration'])}"
+        f"{' • [red]' + str(summ['failed']) + ' gagal[/red]' if summ['failed'] else ''}"
+    )
+    return t
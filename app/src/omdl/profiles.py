@@ -0,0 +1,443 @@
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from yt_dlp import YoutubeDL
+from yt_dlp.postprocessor import get_postprocessor
+
+from . import ffcaps
+from . import loudness
+from . import subtitles
+from . import tagging
+from . import thumbnails
+
+# Postprocessor milik omdl: dibuat langsung dari kelasnya dan dipasang ke instance
+# YoutubeDL (add_post_processor), tanpa mengubah registry global yt-dlp.
+_OMDL_PPS: Dict[str, Callable] = {
+    thumbnails.PP_KEY: thumbnails.OmdlThumbnailPP,
+    subtitles.PP_KEY: subtitles.OmdlSubtitlePP,
+    loudness.PP_KEY: loudness.LoudnessExtractAudioPP,
+}
+
+# ===== Tabel preset (sumber tunggal untuk CLI & menu) =====
+VIDEO_PRESET_FORMATS: Dict[str, str] = {
+    "1080p": "bestvideo[height<=1080]+bestaudio/best[height<=1080]",
+    "720p":  "bestvideo[height<=720]+bestaudio/best[height<=720]",
+    "480p":  "bestvideo[height<=480]+bestaudio/best[height<=480]",
+    "360p":  "bestvideo[height<=360]+bestaudio/best[height<=360]",
+    "240p":  "bestvideo[height<=240]+bestaudio/best[height<=240]",
+    "144p":  "bestvideo[height<=144]+bestaudio/best[height<=144]",
+}
+
+AUDIO_BITRATE_PRESETS: Dict[str, str] = {
+    "320": "320",
+    "192": "192",
+    "128": "128",
+}
+
+# Filter vcodec yt-dlp per preferensi codec (dipakai profil bernama)
+VCODEC_FILTERS: Dict[str, str] = {
+    "h264": "^(avc1|h264)",
+    "h265": "^(hev1|hvc1|h265)",
+    "vp9":  "^(vp0?9)",
+    "av1":  "^av01",
+}
+
+AUDIO_CODECS = ("best", "mp3", "ogg", "wav", "opus", "m4a", "aac", "flac", "vorbis")
+MERGE_FORMATS = ("auto", "mp4", "webm", "mkv")
+PROFILE_KEYS = (
+    "mode", "quality", "video_codec_pref", "merge_output_format",
+    "audio_codec", "audio_bitrate", "embed_thumbnail", "filename_style", "extra",
+)
+
+
+class ProfileError(ValueError):
+    """Profil bernama tidak valid / tidak ditemukan."""
+
+
+def quality_for_preset(mode: str, preset: Optional[str], quality: Optional[str]) -> Tuple[str, Optional[str]]:
+    """
+    Kembalikan (format_string, audio_quality_override).
+    - mode 'audio': preset 320/192/128 → audio_quality_override; format_string 'bestaudio/best' bila quality=auto.
+    - mode 'auto' : preset resolusi → format_string.
+    """
+    fmt = quality or "auto"
+    aq_override: Optional[str] = None
+
+    if mode == "audio":
+        if preset:
+            key = preset.strip().replace("kbps","").replace("Kbps","").replace("k","")
+            if key in AUDIO_BITRATE_PRESETS:
+                aq_override = AUDIO_BITRATE_PRESETS[key]
+                if fmt in ("auto", None):
+                    fmt = "bestaudio/best"
+        else:
+            if fmt in ("auto", None):
+                fmt = "bestaudio/best"
+    else:
+        if preset:
+            p = preset.strip().lower()
+            if p in VIDEO_PRESET_FORMATS:
+                fmt = VIDEO_PRESET_FORMATS[p]
+
+    return fmt, aq_override
+
+
+def quality_from_settings(cfg: Dict[str, Any], mode: str) -> str:
+    """
+    Ketika user pilih 'Auto' di menu kualitas, kita gunakan pengaturan default dari Settings.
+    """
+    if mode == "audio":
+        return "bestaudio/best"
+    # video
+    q = cfg.get("video_quality_default","auto")
+    if q == "best":
+        return "bestvideo*+bestaudio/best"
+    if q == "preset":
+        res = int(cfg.get("video_resolution_default", 720))
+        # Filter codec preferensi dilakukan oleh yt-dlp saat pemilihan format; kita cukup batasi kontainer via merge_output_format
+        return f"bestvideo[height<={res}]+bestaudio/best[height<={res}]"
+    # auto → gunakan provider default (nanti di BaseProvider)
+    return "auto"
+
+
+def _postprocessors_for_audio(codec: str, bitrate_pref: str, embed_thumbnail: bool,
+                              caps: Optional[ffcaps.Caps] = None,
+                              threads: int = 0) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Bangun postprocessors untuk mode audio → (postprocessors, argumen output ffmpeg
+    untuk ExtractAudio).
+    - bitrate_pref: "best" atau angka string ("320","192","128",..., "64")
+      "best" map ke 320 kbps.
+    - caps (hasil ffcaps.probe): encoder dipilih dari yang benar-benar terpasang;
+      ProfileError bila encoder/muxer tidak ada — gagal sebelum unduhan dimulai.
+    """
+    kbps = "320" if str(bitrate_pref) == "best" else str(bitrate_pref)
+    ff_args: List[str] = []
+    if caps is not None:
+        try:
+            _encoder, ff_args = ffcaps.plan_audio(caps, codec, threads)
+        except ValueError as e:
+            raise ProfileError(str(e)) from None
+    pp: List[Dict[str, Any]] = [
+        {"key": "FFmpegExtractAudio", "preferredcodec": ffcaps.CODEC_ALIASES.get(codec, codec),
+         "preferredquality": kbps}
+    ]
+    if embed_thumbnail:
+        pp.append({"key": "EmbedThumbnail"})
+    return pp, ff_args
+
+
+def _merge_output_format(codec_pref: str, cfg: Dict[str, Any]) -> Optional[str]:
+    """
+    Tentukan kontainer final.
+    - Jika cfg['merge_output_format'] = 'auto':
+        h264 -> mp4 ; vp9/av1 -> webm ; h265 -> mp4
+    - Jika 'mp4'/'webm'/'mkv' → pakai itu.
+    - Jika None → biarkan yt-dlp menentukan.
+    """
+    mo = (cfg.get("merge_output_format") or "").lower()
+    if mo in ("mp4", "webm", "mkv"):
+        return mo
+    if mo == "auto" or not mo:
+        if codec_pref in ("vp9", "av1"):
+            return "webm"
+        return "mp4"
+    return None
+
+
+def validate_profiles(raw: Any) -> Dict[str, Dict[str, Any]]:
+    """
+    Validasi & normalisasi blok `profiles:` dari config (dipanggil sekali oleh load_config).
+    Semua kesalahan dikumpulkan lalu dilempar sebagai satu ProfileError.
+    """
+    if not raw:
+        return {}
+    if not isinstance(raw, dict):
+        raise ProfileError("'profiles' harus berupa mapping nama → pengaturan.")
+    out: Dict[str, Dict[str, Any]] = {}
+    errors: List[str] = []
+    for name, spec in raw.items():
+        where = f"profiles.{name}"
+        if not isinstance(spec, dict):
+            errors.append(f"{where}: harus berupa mapping")
+            continue
+        unknown = sorted(set(spec) - set(PROFILE_KEYS))
+        if unknown:
+            errors.append(f"{where}: kunci tidak dikenal {', '.join(map(str, unknown))}")
+
+        mode = str(spec.get("mode") or "auto").lower()
+        if mode not in ("auto", "audio"):
+            errors.append(f"{where}.mode: harus auto|audio")
+        quality = str(spec.get("quality") or ("bestaudio/best" if mode == "audio" else "auto")).strip()
+
+        codec = spec.get("video_codec_pref")
+        codec = str(codec).lower() if codec else None
+        if codec and codec not in VCODEC_FILTERS:
+            errors.append(f"{where}.video_codec_pref: harus {'|'.join(VCODEC_FILTERS)}")
+        merge = spec.get("merge_output_format")
+        merge = str(merge).lower() if merge else None
+        if merge and merge not in MERGE_FORMATS:
+            errors.append(f"{where}.merge_output_format: harus {'|'.join(MERGE_FORMATS)}")
+
+        acodec = spec.get("audio_codec")
+        acodec = str(acodec).lower() if acodec else None
+        if acodec and acodec not in AUDIO_CODECS:
+            errors.append(f"{where}.audio_codec: harus {'|'.join(AUDIO_CODECS)}")
+        abr = spec.get("audio_bitrate")
+        abr = str(abr).lower().rstrip("k") if abr is not None else None
+        if abr and abr != "best" and not (abr.isdigit() and 8 <= int(abr) <= 512):
+            errors.append(f"{where}.audio_bitrate: harus 'best' atau 8..512 (kbps)")
+
+        style = spec.get("filename_style")
+        style = str(style).lower() if style else None
+        if style == "nerdy":
+            style = "nerd"
+        if style and style not in ("simple", "nerd"):
+            errors.append(f"{where}.filename_style: harus simple|nerd")
+        extra = spec.get("extra") or {}
+        if not isinstance(extra, dict):
+            errors.append(f"{where}.extra: harus mapping opsi yt-dlp")
+            extra = {}
+
+        emb = spec.get("embed_thumbnail")
+        out[str(name)] = {
+            "mode": mode,
+            "quality": quality,
+            "video_codec_pref": codec,
+            "merge_output_format": merge,
+            "audio_codec": acodec,
+            "audio_bitrate": abr,
+            "embed_thumbnail": None if emb is None else bool(emb),
+            "filename_style": style,
+            "extra": extra,
+        }
+    if errors:
+        raise ProfileError("Profil di config tidak valid:\n- " + "\n- ".join(errors))
+    return out
+
+
+def _preset_with_codec(quality: str, codec: Optional[str]) -> str:
+    """Preset resolusi (mis. '1080p') → format string, dengan filter vcodec bila diminta."""
+    fmt = VIDEO_PRESET_FORMATS.get(quality.lower(), quality)
+    if not codec or fmt == quality:
+        return fmt
+    res = quality.lower().rstrip("p")
+    return (
+        f"bestvideo[height<={res}][vcodec~='{VCODEC_FILTERS[codec]}']+bestaudio"
+        f"/{fmt}"
+    )
+
+
+@dataclass(frozen=True, eq=False)
+class DownloadProfile:
+    """
+    Hasil kompilasi (provider, mode, quality, preferensi codec) → semua yang
+    dibutuhkan yt-dlp untuk memilih format & postprocess. Immutable dan dibagi
+    antar item batch; string format di-parse oleh YoutubeDL yang memakainya (sekali
+    per DownloadSession, dengan params yang sama dengan unduhannya).
+    `options` = template ydl_opts (opsi dasar provider + extra provider/profil)
+    yang disalin per job lewat new_opts().
+    `tag_metadata` → run_download menjalankan tahap tag in-place (tagging.py).
+    """
+    provider: str
+    mode: str
+    format: str
+    merge_output_format: Optional[str]
+    postprocessors: Tuple[Mapping[str, Any], ...] = ()
+    audio_codec: Optional[str] = None
+    audio_quality: Optional[str] = None
+    name: Optional[str] = None
+    filename_style: Optional[str] = None
+    options: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    tag_metadata: bool = False
+
+    def postprocessor_list(self) -> List[Dict[str, Any]]:
+        """Salinan list postprocessor (yt-dlp boleh memodifikasinya)."""
+        return [dict(p) for p in self.postprocessors]
+
+    def new_opts(self) -> Dict[str, Any]:
+        """
+        Salinan dangkal template ydl_opts untuk satu job (dibaca saja oleh yt-dlp).
+        Postprocessor tidak ikut: pasang lewat add_postprocessors() setelah YoutubeDL dibuat.
+        """
+        opts = dict(self.options)
+        opts["format"] = self.format
+        return opts
+
+    def add_postprocessors(self, ydl: YoutubeDL) -> None:
+        """Pasang postprocessor profil ke `ydl` sesuai urutan kompilasi (PP omdl + bawaan yt-dlp)."""
+        for pp_def in self.postprocessor_list():
+            key = pp_def.pop("key")
+            when = pp_def.pop("when", "post_process")
+            cls = _OMDL_PPS.get(key) or get_postprocessor(key)
+            ydl.add_post_processor(cls(ydl, **pp_def), when=when)
+            if key == subtitles.PP_KEY and pp_def.get("embed"):
+                subtitles.install_merger(ydl)
+
+
+_CACHE: "OrderedDict[tuple, DownloadProfile]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+_CACHE_MAX = 128
+
+
+def _freeze(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=repr)
+
+
+def _compile(
+    provider_obj,
+    mode: str,
+    quality: str,
+    codec_pref: str,
+    merge_pref: Optional[str],
+    ac: Optional[str],
+    aq: Optional[str],
+    emb: bool,
+    name: Optional[str] = None,
+    filename_style: Optional[str] = None,
+    extra: Optional[Dict[str, Any]] = None,
+) -> DownloadProfile:
+    cfg = provider_obj.cfg
+    pcfg = provider_obj.provider_cfg
+    base_opts = provider_obj.ydl_base_opts()
+    caps = ffcaps.probe(cfg) if mode == "audio" and ac else None
+    sub_langs = provider_obj.subtitle_langs()
+    key = (
+        name, provider_obj.name, mode, quality, codec_pref, merge_pref,
+        pcfg.get("format_video"), pcfg.get("format_audio"),
+        (cfg.get("provider_defaults") or {}).get(provider_obj.name), ac, aq, emb, filename_style,
+        _freeze(base_opts), _freeze(pcfg.get("extra")), _freeze(extra), thumbnails.cache_key(cfg),
+        bool(cfg.get("metadata_inplace", True)), caps.key if caps else None, cfg.get("ffmpeg_threads"),
+        loudness.cache_key(cfg), subtitles.cache_key(cfg, sub_langs),
+    )
+    with _CACHE_LOCK:
+        prof = _CACHE.get(key)
+        if prof is not None:
+            _CACHE.move_to_end(key)
+            return prof
+
+    # Template opsi: dasar provider → kontainer → extra provider → extra profil.
+    # Opsi per job (outtmpl, cookies, logger, hooks) dipasang run_download di atasnya.
+    opts = base_opts
+    merge_to = _merge_output_format(codec_pref, {"merge_output_format": merge_pref})
+    if merge_to:
+        opts["merge_output_format"] = merge_to
+    opts = provider_obj.apply_provider_extra(opts)
+    opts.update(extra or {})
+    # 'format' di extra tetap menang; postprocessor extra ditambahkan setelah milik mode audio
+    fmt = opts.pop("format", None) or provider_obj.select_format(mode, quality)
+    pp_defs: List[Dict[str, Any]] = []
+    if mode == "audio" and ac:
+        pp_defs, ff_args = _postprocessors_for_audio(ac, aq or "best", emb, caps,
+                                                     int(cfg.get("ffmpeg_threads", 0) or 0))
+        if ff_args:
+            pp_args = dict(opts.get("postprocessor_args") or {})
+            pp_args["extractaudio+ffmpeg_o"] = list(pp_args.get("extractaudio+ffmpeg_o") or []) + ff_args
+            opts["postprocessor_args"] = pp_args
+        if cfg.get("loudness_normalize", False):
+            pp_defs = loudness.take_over(pp_defs, cfg)
+    pp_defs += [dict(p) for p in opts.pop("postprocessors", None) or []]
+    if cfg.get("thumbnail_pipeline", True):
+        pp_defs = thumbnails.take_over(pp_defs, opts, cfg)
+    if cfg.get("subtitles", False) and sub_langs:
+        pp_defs = subtitles.take_over(pp_defs, opts, cfg, sub_langs)
+    tag_metadata = False
+    if cfg.get("metadata_inplace", True):
+        pp_defs, tag_metadata = tagging.take_over(pp_defs, opts)
+    elif opts.pop("addmetadata", False):
+        pp_defs.append({"key": "FFmpegMetadata"})  # jalur lama: remux penuh lewat ffmpeg
+    pps = tuple(MappingProxyType(p) for p in pp_defs)
+
+    prof = DownloadProfile(
+        provider=provider_obj.name,
+        mode=mode,
+        format=fmt,
+        merge_output_format=opts.get("merge_output_format"),
+        postprocessors=pps,
+        audio_codec=ac,
+        audio_quality=aq,
+        name=name,
+        filename_style=filename_style,
+        options=MappingProxyType(opts),
+        tag_metadata=tag_metadata,
+    )
+    with _CACHE_LOCK:
+        _CACHE[key] = prof
+        while len(_CACHE) > _CACHE_MAX:
+            _CACHE.popitem(last=False)
+    return prof
+
+
+def compile_profile(
+    provider_obj,
+    mode: str,
+    quality: str,
+    audio_codec: Optional[str] = None,
+    audio_quality: Optional[str] = None,
+    embed_thumbnail: Optional[bool] = None,
+) -> DownloadProfile:
+    """
+    Kompilasi (dengan cache) profil unduhan dari pilihan ad-hoc + Settings.
+    Kunci cache memuat semua nilai config yang memengaruhi hasil, jadi perubahan
+    Settings di tengah sesi otomatis menghasilkan profil baru.
+    """
+    cfg = provider_obj.cfg
+    ac: Optional[str] = None
+    aq: Optional[str] = None
+    emb = False
+    if mode == "audio":
+        ac = (audio_codec or cfg.get("audio_format_default") or "mp3").lower()
+        aq = str(audio_quality or cfg.get("audio_bitrate_default") or "best")
+        emb = bool(cfg.get("embed_thumbnail") if embed_thumbnail is None else embed_thumbnail)
+    return _compile(
+        provider_obj, mode, quality,
+        (cfg.get("video_codec_pref") or "h264").lower(), cfg.get("merge_output_format"),
+        ac, aq, emb,
+    )
+
+
+def profile_names(cfg: Dict[str, Any]) -> List[str]:
+    return sorted((cfg.get("profiles") or {}).keys())
+
+
+def compile_named(provider_obj, name: str) -> DownloadProfile:
+    """
+    Kompilasi profil bernama dari cfg['profiles'] (sudah divalidasi load_config).
+    Nilai yang tidak diisi profil jatuh ke Settings global.
+    """
+    cfg = provider_obj.cfg
+    spec = (cfg.get("profiles") or {}).get(name)
+    if spec is None:
+        avail = ", ".join(profile_names(cfg)) or "-"
+        raise ProfileError(f"Profil '{name}' tidak ada. Tersedia: {avail}")
+
+    mode = spec["mode"]
+    codec = spec.get("video_codec_pref")
+    quality = spec["quality"]
+    ac: Optional[str] = None
+    aq: Optional[str] = None
+    emb = False
+    if mode == "audio":
+        ac = spec.get("audio_codec") or (cfg.get("audio_format_default") or "mp3").lower()
+        aq = spec.get("audio_bitrate") or str(cfg.get("audio_bitrate_default") or "best")
+        emb = cfg.get("embed_thumbnail") if spec.get("embed_thumbnail") is None else spec["embed_thumbnail"]
+        if quality in ("auto", "best"):
+            quality = "bestaudio/best"
+    else:
+        quality = _preset_with_codec(quality, codec)
+
+    return _compile(
+        provider_obj, mode, quality,
+        codec or (cfg.get("video_codec_pref") or "h264").lower(),
+        spec.get("merge_output_format") or cfg.get("merge_output_format"),
+        ac, aq, bool(emb),
+        name=name,
+        filename_style=spec.get("filename_style"),
+        extra=spec.get("extra"),
+    )
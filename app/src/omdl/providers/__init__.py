@@ -1,3 +1,8 @@
+from __future__ import annotations
+import os
+from typing import Optional
+
+from ..config_loader import load_provider_cfg
 from .youtube import YouTubeProvider
 from .instagram import InstagramProvider
 from .tiktok import TikTokProvider
@@ -12,3 +17,7 @@ PROVIDER_CLASS_MAP = {
     "x": XProvider,
 }
 
+def get_provider(provider_name: str, cfg: dict, base_dir: Optional[str] = None):
+    """Instansiasi provider beserta config/providers/<name>.yaml."""
+    provider_cfg = load_provider_cfg(base_dir or os.getcwd(), provider_name)
+    return PROVIDER_CLASS_MAP[provider_name](cfg, provider_cfg)
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 class BaseProvider:
     name: str = "base"
@@ -45,6 +45,14 @@ class BaseProvider:
             "no_warnings": False,
         }
 
+    # ===== Subtitle =====
+    def subtitle_langs(self) -> List[str]:
+        """Bahasa subtitle: subtitle_langs di config provider menimpa config global."""
+        langs = self.provider_cfg.get("subtitle_langs") or self.cfg.get("subtitle_langs") or []
+        if isinstance(langs, str):
+            langs = [s.strip() for s in langs.split(",") if s.strip()]
+        return [str(s) for s in langs]
+
     def apply_provider_extra(self, ydl_opts: Dict[str, Any]) -> Dict[str, Any]:
         extra = self.provider_cfg.get("extra") or {}
         ydl_opts.update(extra)
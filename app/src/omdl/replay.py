@@ -0,0 +1,418 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import unquote, urlsplit
+
+from yt_dlp import YoutubeDL
+from yt_dlp.networking import Request
+from yt_dlp.networking.exceptions import RequestError
+from yt_dlp.utils import DownloadError
+
+from . import subtitles
+from .config_loader import resolve_cookies
+from .providers import PROVIDER_CLASS_MAP, get_provider
+from .utils import detect_provider
+
+# Harness replay offline: `omdl replay record` mengekstrak URL sekali (online) lalu
+# menyimpan info_dict tersanitasi + byte format http(s) & thumbnail ke replay_dir:
+#   <replay_dir>/manifest.json                     url → provider/key/judul
+#   <replay_dir>/<provider>/<key>/info.json         URL media diganti replay://...
+#   <replay_dir>/<provider>/<key>/<video>/<format>  byte format (dipotong replay_max_bytes)
+#   <replay_dir>/<provider>/<key>/<video>/<field>.<lang>.<ext>  subtitle (bahasa subtitle_langs)
+# Saat replay, server HTTP lokal (Range didukung) menyajikan byte tersebut dan
+# YoutubeDL.extract_info di-patch agar URL yang direkam dijawab dari fixture. Mode
+# strict menolak URL tanpa fixture & request ke host lain → run_download, provider
+# dan pemilihan format bisa diuji/di-benchmark tanpa jaringan sama sekali.
+
+PLACEHOLDER = "replay://"
+MANIFEST = "manifest.json"
+BLOCK = 256 * 1024
+_PROTOCOLS = ("http", "https")
+# sisa format terpilih dari process_ie_result; dipilih ulang saat replay
+_SELECTION_KEYS = ("requested_formats", "requested_downloads", "url", "manifest_url", "fragments")
+
+
+class ReplayError(Exception):
+    """Fixture tidak bisa direkam / dibaca."""
+
+
+def _key(url: str) -> str:
+    return hashlib.sha1(url.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def _safe(name: Any) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", str(name))[:80] or "_"
+
+
+def _videos(info: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Semua video di info (rekursif untuk playlist)."""
+    if info.get("entries") is None:
+        yield info
+        return
+    for entry in info["entries"]:
+        if entry:
+            yield from _videos(entry)
+
+
+def _rewrite(obj: Any, fn: Callable[[str], str]) -> Any:
+    if isinstance(obj, str):
+        return fn(obj)
+    if isinstance(obj, dict):
+        return {k: _rewrite(v, fn) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_rewrite(v, fn) for v in obj]
+    return obj
+
+
+def read_manifest(root: str) -> Dict[str, Dict[str, Any]]:
+    """url → metadata fixture; kosong bila belum ada rekaman."""
+    try:
+        with open(os.path.join(root, MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f).get("fixtures") or {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(root: str, fixtures: Dict[str, Dict[str, Any]]) -> None:
+    path = os.path.join(root, MANIFEST)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "fixtures": fixtures}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# ===== Rekam =====
+
+def _fetch(ydl, url: str, headers: Optional[Dict[str, str]], path: str, max_bytes: int) -> int:
+    """Simpan maksimal max_bytes pertama dari url (0 = utuh). Kembalikan jumlah byte."""
+    hdrs = dict(headers or {})
+    if max_bytes:
+        hdrs["Range"] = f"bytes=0-{max_bytes - 1}"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".part"
+    size = 0
+    try:
+        with ydl.urlopen(Request(url, headers=hdrs)) as resp, open(tmp, "wb") as f:
+            while not max_bytes or size < max_bytes:
+                block = resp.read(BLOCK if not max_bytes else min(BLOCK, max_bytes - size))
+                if not block:
+                    break
+                f.write(block)
+                size += len(block)
+    except (OSError, RequestError) as e:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise ReplayError(f"Gagal mengambil {url}: {e}") from e
+    os.replace(tmp, path)
+    return size
+
+
+def record_url(ydl, url: str, provider: str, root: str, max_bytes: int,
+               log: Callable[[str], None] = lambda _m: None, sub_langs: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Ekstrak satu URL dan tulis fixture-nya. Hanya format http(s) langsung yang
+    direkam (HLS/DASH berfragmen dibuang); tiap video menyimpan satu thumbnail
+    terbaik dan satu track VTT/SRT per bahasa `sub_langs` (subtitle manual & auto).
+    Kembalikan metadata untuk manifest.
+    """
+    info = ydl.extract_info(url, download=False)
+    if not info:
+        raise ReplayError("Metadata kosong")
+    clean = YoutubeDL.sanitize_info(info, remove_private_keys=True)
+    key = _key(url)
+    mapping: Dict[str, str] = {}
+    total = kept_formats = 0
+    for n, entry in enumerate(_videos(clean)):
+        rel_dir = f"{provider}/{key}/{_safe(entry.get('id') or n)}"
+        kept: List[Dict[str, Any]] = []
+        dropped = 0
+        for fmt in entry.get("formats") or []:
+            if fmt.get("protocol") not in _PROTOCOLS or not fmt.get("url") or fmt.get("fragments"):
+                dropped += 1
+                continue
+            rel = f"{rel_dir}/{_safe(fmt.get('format_id') or len(kept))}"
+            if fmt["url"] not in mapping:
+                size = _fetch(ydl, fmt["url"], fmt.get("http_headers"), os.path.join(root, rel), max_bytes)
+                mapping[fmt["url"]] = PLACEHOLDER + rel
+                total += size
+            else:
+                size = os.path.getsize(os.path.join(root, mapping[fmt["url"]][len(PLACEHOLDER):]))
+            fmt["filesize"] = size
+            fmt.pop("filesize_approx", None)
+            kept.append(fmt)
+        if not kept:
+            raise ReplayError(f"Tidak ada format http(s) yang bisa direkam untuk {entry.get('id') or url}")
+        if dropped:
+            log(f"{entry.get('id')}: {dropped} format non-http(s) tidak direkam")
+        entry["formats"] = kept
+        kept_formats += len(kept)
+        for k in _SELECTION_KEYS:
+            entry.pop(k, None)
+
+        thumbs = [t for t in entry.get("thumbnails") or [] if t.get("url")]
+        entry["thumbnails"] = []
+        entry.pop("thumbnail", None)
+        if thumbs:
+            best = dict(thumbs[-1])  # yt-dlp mengurutkan thumbnail naik menurut preferensi
+            rel = f"{rel_dir}/thumb"
+            try:
+                total += _fetch(ydl, best["url"], best.get("http_headers"), os.path.join(root, rel), 0)
+            except ReplayError as e:
+                log(f"Thumbnail dilewati: {e}")
+            else:
+                mapping[best["url"]] = PLACEHOLDER + rel
+                entry["thumbnails"] = [best]
+                entry["thumbnail"] = best["url"]
+        for field in ("subtitles", "automatic_captions"):
+            recorded: Dict[str, List[Dict[str, Any]]] = {}
+            tracks = entry.get(field) or {}
+            for lang in subtitles.matching(list(tracks), list(sub_langs)):
+                track = subtitles.pick(tracks[lang] or [], "vtt")
+                if track is None or not track.get("url"):
+                    continue
+                rel = f"{rel_dir}/{field}.{_safe(lang)}.{track['ext']}"
+                try:
+                    total += _fetch(ydl, track["url"], track.get("http_headers"), os.path.join(root, rel), 0)
+                except ReplayError as e:
+                    log(f"Subtitle {lang} dilewati: {e}")
+                    continue
+                mapping[track["url"]] = PLACEHOLDER + rel
+                recorded[lang] = [dict(track)]
+            entry[field] = recorded
+
+    clean = _rewrite(clean, lambda s: mapping.get(s, s))
+    base = os.path.join(root, provider, key)
+    os.makedirs(base, exist_ok=True)
+    with open(os.path.join(base, "info.json"), "w", encoding="utf-8") as f:
+        json.dump(clean, f, ensure_ascii=False)
+    return {"provider": provider, "key": key, "id": clean.get("id"), "title": clean.get("title"),
+            "formats": kept_formats, "bytes": total,
+            "recorded": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+def record(urls: Iterable[str], cfg: Dict[str, Any], root: str, max_bytes: Optional[int] = None,
+           on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+           log: Callable[[str], None] = lambda _m: None) -> List[Dict[str, Any]]:
+    """
+    Rekam fixture untuk banyak URL (butuh jaringan). Satu YoutubeDL per provider
+    (opsi dasar provider + cookies); subtitle direkam untuk bahasa subtitle_langs
+    provider. Manifest diperbarui setelah tiap URL sukses.
+    Hasil: list dict {url, provider, ok, error, ...metadata manifest}.
+    """
+    if max_bytes is None:
+        max_bytes = int(cfg.get("replay_max_bytes", 8 * 1024 * 1024) or 0)
+    os.makedirs(root, exist_ok=True)
+    fixtures = read_manifest(root)
+    ydls: Dict[str, YoutubeDL] = {}
+    langs: Dict[str, List[str]] = {}
+    results: List[Dict[str, Any]] = []
+    try:
+        for url in urls:
+            res: Dict[str, Any] = {"url": url, "provider": detect_provider(url), "ok": False, "error": None}
+            prov = res["provider"]
+            if prov not in PROVIDER_CLASS_MAP:
+                res["error"] = "Provider tidak dikenali"
+            else:
+                ydl = ydls.get(prov)
+                if ydl is None:
+                    provider_obj = get_provider(prov, cfg)
+                    langs[prov] = provider_obj.subtitle_langs()
+                    opts = provider_obj.ydl_base_opts()
+                    cookies = resolve_cookies(cfg, prov)
+                    if cookies:
+                        opts["cookiefile"] = cookies
+                    opts.update({"quiet": True, "no_warnings": True, "noprogress": True})
+                    ydl = ydls[prov] = YoutubeDL(opts)
+                try:
+                    meta = record_url(ydl, url, prov, root, max_bytes, log, langs[prov])
+                except (DownloadError, ReplayError) as e:
+                    res["error"] = str(e).replace("ERROR: ", "", 1)
+                else:
+                    fixtures[url] = meta
+                    _write_manifest(root, fixtures)
+                    res.update(meta, ok=True)
+            results.append(res)
+            if on_result is not None:
+                on_result(res)
+    finally:
+        for ydl in ydls.values():
+            ydl.close()
+    return results
+
+
+# ===== Server lokal =====
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_FixtureServer"
+
+    def log_message(self, format, *args):  # noqa: A002 - signature BaseHTTPRequestHandler
+        pass
+
+    def _resolve(self) -> Optional[str]:
+        rel = unquote(urlsplit(self.path).path).lstrip("/")
+        path = os.path.realpath(os.path.join(self.server.root, rel))
+        if not path.startswith(self.server.root + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def _serve(self, body: bool) -> None:
+        path = self._resolve()
+        if path is None:
+            self.send_error(404)
+            return
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        m = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", "").strip())
+        if m and (m.group(1) or m.group(2)):
+            if m.group(1):
+                start = int(m.group(1))
+                end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+            else:  # suffix: N byte terakhir
+                start = max(0, size - int(m.group(2)))
+            if start >= size or start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        length = end - start + 1
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+        if not body:
+            return
+        with open(path, "rb") as f:
+            f.seek(start)
+            while length > 0:
+                block = f.read(min(BLOCK, length))
+                if not block:
+                    break
+                try:
+                    self.wfile.write(block)
+                except (BrokenPipeError, ConnectionResetError):
+                    return  # klien (mis. ffmpeg -ss) menutup koneksi lebih dulu
+                length -= len(block)
+
+    def do_GET(self) -> None:
+        self._serve(True)
+
+    def do_HEAD(self) -> None:
+        self._serve(False)
+
+
+class _FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, root: str) -> None:
+        self.root = os.path.realpath(root)
+        super().__init__(addr, _Handler)
+
+
+# ===== Patch ekstraksi =====
+
+_ACTIVE: Optional["Replay"] = None
+_ACTIVE_LOCK = threading.Lock()
+_ORIG_EXTRACT = YoutubeDL.extract_info
+_ORIG_URLOPEN = YoutubeDL.urlopen
+
+
+def _extract_info(self, url, download=True, ie_key=None, extra_info=None, process=True,
+                  force_generic_extractor=False):
+    rp = _ACTIVE
+    info = rp.info(url) if rp is not None else None
+    if info is None:
+        if rp is not None and rp.strict:
+            raise DownloadError(f"[replay] Tidak ada fixture untuk {url}")
+        return _ORIG_EXTRACT(self, url, download, ie_key, extra_info, process, force_generic_extractor)
+    rp.hits += 1
+    if extra_info:
+        info.update(extra_info)
+    return self.process_ie_result(info, download=download) if process else info
+
+
+def _urlopen(self, req):
+    rp = _ACTIVE
+    if rp is not None and rp.strict:
+        url = req if isinstance(req, str) else req.url
+        if not url.startswith(rp.base_url):
+            raise RequestError(f"[replay] Request jaringan diblokir: {url}")
+    return _ORIG_URLOPEN(self, req)
+
+
+class Replay:
+    """
+    Sajikan fixture dari `root` lewat server lokal dan arahkan ekstraksi ke sana:
+
+        with Replay("fixtures") as rp:
+            for url in rp.urls():
+                run_download(...)   # tanpa jaringan
+
+    `strict=True` → URL tanpa fixture & request ke host selain server lokal gagal.
+    Hanya satu Replay yang boleh aktif per proses (patch berlaku global).
+    """
+
+    def __init__(self, root: str, strict: bool = True, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.root = root
+        self.strict = strict
+        self.fixtures = read_manifest(root)
+        if not self.fixtures:
+            raise ReplayError(f"Belum ada fixture di {root} (jalankan `omdl replay record`)")
+        self._addr = (host, port)
+        self._httpd: Optional[_FixtureServer] = None
+        self.base_url = ""
+        self.hits = 0
+
+    def urls(self, provider: Optional[str] = None) -> List[str]:
+        return [u for u, meta in self.fixtures.items() if provider in (None, meta.get("provider"))]
+
+    def info(self, url: str) -> Optional[Dict[str, Any]]:
+        """info_dict fixture (salinan baru tiap panggilan) dengan URL media ke server lokal."""
+        meta = self.fixtures.get(url) or self.fixtures.get(url.strip())
+        if meta is None:
+            return None
+        path = os.path.join(self.root, meta["provider"], meta["key"], "info.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ReplayError(f"Fixture rusak untuk {url}: {e}") from e
+        return _rewrite(info, lambda s: self.base_url + s[len(PLACEHOLDER):]
+                        if s.startswith(PLACEHOLDER) else s)
+
+    def __enter__(self) -> "Replay":
+        global _ACTIVE
+        with _ACTIVE_LOCK:
+            if _ACTIVE is not None:
+                raise ReplayError("Replay lain sedang aktif")
+            self._httpd = _FixtureServer(self._addr, self.root)
+            host, port = self._httpd.server_address[:2]
+            self.base_url = f"http://{host}:{port}/"
+            threading.Thread(target=self._httpd.serve_forever, name="omdl-replay", daemon=True).start()
+            YoutubeDL.extract_info = _extract_info
+            YoutubeDL.urlopen = _urlopen
+            _ACTIVE = self
+        return self
+
+    def __exit__(self, *exc) -> None:
+        global _ACTIVE
+        with _ACTIVE_LOCK:
+            YoutubeDL.extract_info = _ORIG_EXTRACT
+            YoutubeDL.urlopen = _ORIG_URLOPEN
+            _ACTIVE = None
+            if self._httpd is not None:
+                self._httpd.shutdown()
+                self._httpd.server_close()
+                self._httpd = None
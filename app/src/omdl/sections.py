@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Optional, Tuple
+
+from yt_dlp.utils import download_range_func, parse_duration
+
+# Mode potongan (--section START-END / field 'section' di batch): hanya rentang waktu
+# yang diminta yang diunduh. yt-dlp menyerahkan format ke downloader ffmpeg dengan
+# -ss/-t, sehingga untuk DASH/HLS hanya segmen di sekitar rentang yang diambil dan
+# untuk file HTTP biasa ffmpeg melompat lewat Range request — bukan unduh penuh lalu
+# potong. Tanpa section_precise_cuts potongan jatuh di keyframe (stream copy, cepat).
+
+Section = Tuple[float, Optional[float]]  # (mulai, selesai) detik; selesai None = sampai akhir
+
+
+def parse(text: str) -> Section:
+    """
+    "START-END" → (mulai, selesai). Waktu: detik ("90"), "1:30", "01:02:03.5" atau
+    "1m30s"; END kosong = sampai akhir ("10:00-"). ValueError bila tidak valid.
+    """
+    raw = str(text).strip()
+    start_s, sep, end_s = raw.partition("-")
+    if not sep:
+        raise ValueError(f"Format section harus START-END: {raw!r}")
+    start = parse_duration(start_s.strip()) if start_s.strip() else 0.0
+    end = parse_duration(end_s.strip()) if end_s.strip() else None
+    if start is None or (end_s.strip() and end is None):
+        raise ValueError(f"Waktu section tidak dikenali: {raw!r}")
+    if end is not None and end <= start:
+        raise ValueError(f"Akhir section harus setelah awal: {raw!r}")
+    return float(start), (float(end) if end is not None else None)
+
+
+def _clock(seconds: float) -> str:
+    """Waktu ringkas & aman untuk nama file: 90 → 1m30s, 3725.5 → 1h02m05.5s."""
+    whole = int(seconds)
+    frac = seconds - whole
+    h, rem = divmod(whole, 3600)
+    m, s = divmod(rem, 60)
+    frac_s = f"{frac:.2f}".rstrip("0").rstrip(".")[1:]  # ".25" / ""
+    if h:
+        return f"{h}h{m:02d}m{s:02d}{frac_s}s"
+    if m:
+        return f"{m}m{s:02d}{frac_s}s"
+    return f"{s}{frac_s}s"
+
+
+def label(section: Section) -> str:
+    start, end = section
+    return f"{_clock(start)}-{_clock(end) if end is not None else 'akhir'}"
+
+
+def length(section: Section, duration: Optional[float]) -> Optional[float]:
+    """Durasi potongan (detik); None bila tidak diketahui."""
+    start, end = section
+    if end is None:
+        end = duration
+    if end is None:
+        return None
+    if duration is not None:
+        end = min(end, duration)
+    return max(0.0, end - start)
+
+
+def outtmpl(template: str, section: Section) -> str:
+    """Sisipkan label potongan sebelum ekstensi agar tidak menimpa unduhan penuh."""
+    tag = f" [{label(section)}]"
+    if template.endswith(".%(ext)s"):
+        return template[: -len(".%(ext)s")] + tag + ".%(ext)s"
+    return template + tag
+
+
+def ydl_params(section: Section, cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Opsi yt-dlp per job untuk satu potongan."""
+    start, end = section
+    return {
+        "download_ranges": download_range_func(None, [(start, end if end is not None else math.inf)]),
+        "force_keyframes_at_cuts": bool(cfg.get("section_precise_cuts", False)),
+    }
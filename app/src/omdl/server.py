@@ -0,0 +1,428 @@
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from . import batch
+from . import metrics
+from .downloader import SessionPool, run_download
+
+# Server job lokal (`omdl serve`): layanan lain mengirim job lewat HTTP di localhost
+# atau Unix socket, tanpa membayar biaya import yt-dlp per URL. Job masuk antrean
+# prioritas dan dikerjakan worker pool; tiap worker punya SessionPool sendiri.
+#
+#   POST   /jobs                  {"url": ..., "mode", "quality", "profile", "output", "priority", "section"}
+#                                 atau {"jobs": [...]} / list → 202 {"jobs": [...]}
+#   GET    /jobs                  ringkasan semua job
+#   GET    /jobs/<id>             status satu job
+#   GET    /jobs/<id>/events      Server-Sent Events (?since=<seq>), selesai saat job final
+#   DELETE /jobs/<id>             batalkan (juga POST /jobs/<id>/cancel)
+#   GET    /health
+
+FINAL_STATES = ("done", "failed", "cancelled")
+MAX_BODY = 1024 * 1024
+
+
+class JobCancelled(Exception):
+    """Dilempar observer job untuk menghentikan unduhan yang sedang berjalan."""
+
+    def __init__(self) -> None:
+        super().__init__("Dibatalkan")
+
+
+class Job:
+    def __init__(self, job_id: str, entry: Dict[str, Any], group: batch.Group,
+                 item: Dict[str, Any], event_buffer: int) -> None:
+        self.id = job_id
+        self.entry = entry
+        self.group = group
+        self.item = item
+        self.state = "queued"
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.error: Optional[str] = None
+        self.record: Optional[Dict[str, Any]] = None
+        self.cancel_requested = False
+        self.progress: Dict[str, Any] = {}
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=event_buffer)
+        self.seq = 0
+
+    def summary(self) -> Dict[str, Any]:
+        out = {
+            "id": self.id,
+            "url": self.entry["url"],
+            "provider": self.item["provider"],
+            "profile": self.group.profile.name,
+            "mode": self.group.profile.mode,
+            "priority": self.entry.get("priority") or 0,
+            "section": self.entry.get("section"),
+            "state": self.state,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "progress": self.progress,
+            "error": self.error,
+        }
+        if self.record is not None:
+            out["path"] = self.record.get("path")
+            out["bytes"] = self.record.get("bytes")
+            out["total"] = self.record.get("total")
+        return out
+
+
+class _JobObserver:
+    """Jembatan event run_download → event job (+ titik cek pembatalan)."""
+
+    def __init__(self, server: "JobServer", job: Job, interval: float = 0.5) -> None:
+        self._server = server
+        self._job = job
+        self._interval = interval
+        self._last = 0.0
+
+    def _check(self) -> None:
+        if self._job.cancel_requested:
+            raise JobCancelled()
+
+    def on_log(self, msg: str) -> None:
+        self._check()
+
+    def on_progress(self, d: Dict[str, Any]) -> None:
+        self._check()
+        now = time.monotonic()
+        status = d.get("status")
+        if status == "downloading" and now - self._last < self._interval:
+            return
+        self._last = now
+        progress = {
+            "status": status,
+            "filename": d.get("filename"),
+            "downloaded_bytes": d.get("downloaded_bytes"),
+            "total_bytes": d.get("total_bytes") or d.get("total_bytes_estimate"),
+            "speed": d.get("speed"),
+            "eta": d.get("eta"),
+        }
+        self._job.progress = progress
+        self._server.emit(self._job, "progress", progress)
+
+    def on_postprocess(self, d: Dict[str, Any]) -> None:
+        self._check()
+        self._server.emit(self._job, "postprocess",
+                          {"postprocessor": d.get("postprocessor"), "status": d.get("status")})
+
+
+class JobServer:
+    """Antrean job + worker pool di sekitar run_download (headless)."""
+
+    def __init__(self, cfg: Dict[str, Any], workers: int = 2, keep: int = 1000,
+                 mode: str = "auto", quality: str = "auto") -> None:
+        self.cfg = cfg
+        self.mode = mode
+        self.quality = quality
+        self.keep = max(1, keep)
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._queue: "queue.PriorityQueue[Tuple[int, int, str]]" = queue.PriorityQueue()
+        self._seq = itertools.count(1)
+        self._providers: Dict[str, Any] = {}
+        self._plan_lock = threading.Lock()
+        self._stopping = False
+        self._event_buffer = int(cfg.get("serve_event_buffer", 500) or 500)
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"omdl-serve-{i + 1}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in self._threads:
+            t.start()
+
+    # ----- API -----
+    def submit(self, raw: Any) -> Job:
+        """Validasi & antrekan satu job; ValueError bila entry tidak valid."""
+        entry = batch.parse_entry(raw)
+        if entry is None:
+            raise ValueError("'url' wajib diisi")
+        with self._plan_lock:
+            groups, skipped = batch.plan([entry], self.cfg, self.mode,
+                                         batch.normalize_quality(self.mode, self.quality),
+                                         providers=self._providers)
+        if skipped:
+            raise ValueError(skipped[0][1])
+        group = groups[0]
+        num = next(self._seq)
+        job = Job(f"j{num}", entry, group, group.items[0], self._event_buffer)
+        with self._cond:
+            self.jobs[job.id] = job
+            self._prune()
+        self.emit(job, "state", {"state": "queued"})
+        self._queue.put((-(entry.get("priority") or 0), num, job.id))
+        metrics.set_queue_depth(self._queue.qsize())
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            return [j.summary() for j in self.jobs.values()]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with self._cond:
+            # transisi dicek & diubah di bawah lock yang sama dengan worker, agar job
+            # yang baru saja diambil worker tidak ikut ditandai "cancelled"
+            queued = job.state == "queued"
+            if queued:
+                job.state = "cancelled"
+                job.error = "Dibatalkan"
+                job.finished = time.time()
+            elif job.state == "running":
+                job.cancel_requested = True  # diperiksa observer di event berikutnya
+        if queued:
+            self.emit(job, "state", {"state": "cancelled", "error": "Dibatalkan"})
+        return job
+
+    def emit(self, job: Job, kind: str, data: Dict[str, Any]) -> None:
+        with self._cond:
+            job.seq += 1
+            job.events.append({"seq": job.seq, "ts": round(time.time(), 3), "type": kind, "data": data})
+            self._cond.notify_all()
+
+    def wait_events(self, job: Job, since: int, timeout: float) -> List[Dict[str, Any]]:
+        """Event dengan seq > since; menunggu hingga `timeout` bila belum ada."""
+        with self._cond:
+            if job.seq <= since and job.state not in FINAL_STATES:
+                self._cond.wait(timeout)
+            return [e for e in job.events if e["seq"] > since]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            states: Dict[str, int] = {}
+            for j in self.jobs.values():
+                states[j.state] = states.get(j.state, 0) + 1
+        return {"queued": self._queue.qsize(), "workers": len(self._threads), "jobs": states}
+
+    def shutdown(self, timeout: float = 10.0) -> bool:
+        """
+        Hentikan worker: job berjalan diminta batal, lalu tunggu thread selesai paling
+        lama `timeout` detik total. True bila semua worker sudah berhenti.
+        """
+        self._stopping = True
+        with self._cond:
+            for job in self.jobs.values():
+                if job.state == "running":
+                    job.cancel_requested = True
+        for _ in self._threads:
+            self._queue.put((-(1 << 30), 0, ""))  # pil racun, didahulukan
+        deadline = time.monotonic() + max(0.0, timeout)
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        return not any(t.is_alive() for t in self._threads)
+
+    # ----- internal -----
+    def _prune(self) -> None:
+        """Buang job final tertua bila melebihi batas simpan (dipanggil dengan lock)."""
+        excess = len(self.jobs) - self.keep
+        if excess <= 0:
+            return
+        for jid in [j.id for j in self.jobs.values() if j.state in FINAL_STATES][:excess]:
+            del self.jobs[jid]
+
+    def _finish(self, job: Job, state: str, error: Optional[str] = None) -> None:
+        with self._cond:
+            job.state = state
+            job.error = error
+            job.finished = time.time()
+        self.emit(job, "state", {"state": state, "error": error})
+
+    def _worker(self) -> None:
+        pool = SessionPool(int(self.cfg.get("serve_sessions", 2) or 2))
+        try:
+            while True:
+                _prio, _num, job_id = self._queue.get()
+                if not job_id or self._stopping:
+                    return
+                metrics.set_queue_depth(self._queue.qsize())
+                with self._cond:
+                    job = self.jobs.get(job_id)
+                    if job is None or job.state != "queued":
+                        continue
+                    job.state = "running"
+                    job.started = time.time()
+                self.emit(job, "state", {"state": "running"})
+                group, item = job.group, job.item
+                try:
+                    job.record = run_download(
+                        provider_name=item["provider"],
+                        provider_obj=item["provider_obj"],
+                        url=item["url"],
+                        mode=group.profile.mode,
+                        quality=group.profile.format,
+                        outtmpl=item["outtmpl"],
+                        cookies_path=group.cookies_path,
+                        audio_codec=group.profile.audio_codec,
+                        audio_quality=group.profile.audio_quality,
+                        session=pool.get(group.profile, group.cookies_path),
+                        extra_observers=[_JobObserver(self, job)],
+                        headless=True,
+                        section=item.get("section"),
+                    )
+                except Exception as e:
+                    if job.cancel_requested:
+                        self._finish(job, "cancelled", "Dibatalkan")
+                    else:
+                        self._finish(job, "failed", str(e).replace("ERROR: ", "", 1))
+                    continue
+                self._finish(job, "done")
+        finally:
+            pool.close()
+
+
+# ===== HTTP =====
+def _handler_for(server: JobServer):
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _json(self, status: int, payload: Any) -> None:
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _route(self) -> Tuple[List[str], Dict[str, List[str]]]:
+            parts = urlsplit(self.path)
+            return [p for p in parts.path.split("/") if p], parse_qs(parts.query)
+
+        def do_GET(self):  # noqa: N802 (nama dari http.server)
+            segs, query = self._route()
+            if segs == ["health"]:
+                self._json(200, {"ok": True, **server.stats()})
+            elif segs == ["jobs"]:
+                self._json(200, {"jobs": server.list()})
+            elif len(segs) == 2 and segs[0] == "jobs":
+                job = server.get(segs[1])
+                if job is None:
+                    self._json(404, {"error": "job tidak ditemukan"})
+                else:
+                    self._json(200, job.summary())
+            elif len(segs) == 3 and segs[0] == "jobs" and segs[2] == "events":
+                job = server.get(segs[1])
+                if job is None:
+                    self._json(404, {"error": "job tidak ditemukan"})
+                else:
+                    try:
+                        since = int((query.get("since") or ["0"])[0] or 0)
+                    except ValueError:
+                        since = -1
+                    if since < 0:
+                        self._json(400, {"error": "'since' harus bilangan bulat >= 0"})
+                    else:
+                        self._stream(job, since)
+            else:
+                self._json(404, {"error": "tidak ditemukan"})
+
+        def _stream(self, job: Job, since: int) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            try:
+                while True:
+                    events = server.wait_events(job, since, 15.0)
+                    if not events:
+                        if job.state in FINAL_STATES:
+                            return
+                        self.wfile.write(b": ping\n\n")
+                    for ev in events:
+                        since = ev["seq"]
+                        data = json.dumps(ev, ensure_ascii=False, default=str)
+                        self.wfile.write(f"id: {ev['seq']}\nevent: {ev['type']}\ndata: {data}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+        def do_POST(self):  # noqa: N802
+            segs, _query = self._route()
+            if len(segs) == 3 and segs[0] == "jobs" and segs[2] == "cancel":
+                self._cancel(segs[1])
+                return
+            if segs != ["jobs"]:
+                self._json(404, {"error": "tidak ditemukan"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length <= 0 or length > MAX_BODY:
+                self._json(413 if length > MAX_BODY else 400, {"error": "body JSON wajib (maks 1 MiB)"})
+                return
+            try:
+                payload = json.loads(self.rfile.read(length))
+            except ValueError:
+                self._json(400, {"error": "JSON tidak valid"})
+                return
+            items = payload.get("jobs") if isinstance(payload, dict) and "jobs" in payload else payload
+            if not isinstance(items, list):
+                items = [items]
+            results: List[Dict[str, Any]] = []
+            for raw in items:
+                try:
+                    results.append(server.submit(raw).summary())
+                except ValueError as e:
+                    results.append({"url": raw.get("url") if isinstance(raw, dict) else raw, "error": str(e)})
+            accepted = any("id" in r for r in results)
+            self._json(202 if accepted else 400, {"jobs": results})
+
+        def do_DELETE(self):  # noqa: N802
+            segs, _query = self._route()
+            if len(segs) == 2 and segs[0] == "jobs":
+                self._cancel(segs[1])
+            else:
+                self._json(404, {"error": "tidak ditemukan"})
+
+        def _cancel(self, job_id: str) -> None:
+            job = server.cancel(job_id)
+            if job is None:
+                self._json(404, {"error": "job tidak ditemukan"})
+            else:
+                self._json(200, job.summary())
+
+        def log_message(self, *args):
+            pass
+
+    return _Handler
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def start(job_server: JobServer, host: str = "127.0.0.1", port: int = 9465,
+          socket_path: Optional[str] = None):
+    """
+    Buat server HTTP (TCP localhost atau Unix socket) untuk job_server.
+    Kembalikan (httpd, alamat-teks); panggil httpd.serve_forever() untuk melayani.
+    """
+    handler = _handler_for(job_server)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # sisa proses sebelumnya
+        httpd = _UnixHTTPServer(socket_path, handler)
+        os.chmod(socket_path, 0o600)  # hanya user yang sama
+        return httpd, f"unix:{socket_path}"
+    httpd = ThreadingHTTPServer((host, int(port)), handler)
+    httpd.daemon_threads = True
+    addr = httpd.server_address
+    return httpd, f"http://{addr[0]}:{addr[1]}"
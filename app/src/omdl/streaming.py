@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from yt_dlp.networking import Request
+from yt_dlp.networking.exceptions import HTTPError, RequestError
+from yt_dlp.postprocessor.ffmpeg import ACODECS, FFmpegExtractAudioPP
+
+from .timing import format_bytes
+
+# Mode audio streaming: byte hasil unduh langsung dialirkan ke stdin ffmpeg yang
+# meng-encode ke file akhir (mp3/opus/m4a/...). Tidak ada file bestaudio perantara
+# yang ditulis lalu dibaca ulang oleh FFmpegExtractAudio → I/O disk separuhnya.
+# Hanya untuk format tunggal lewat http(s); selain itu (atau bila stream gagal
+# sebelum selesai) jatuh kembali ke jalur normal yt-dlp.
+
+BLOCK = 256 * 1024
+# ekstensi hasil ExtractAudio → muxer ffmpeg (output ditulis ke .part, jadi -f wajib)
+EXT_MUXERS = {"mp3": "mp3", "m4a": "ipod", "opus": "opus", "ogg": "ogg", "flac": "flac", "wav": "wav"}
+# codec sumber yang akan di-stream-copy yt-dlp (tanpa encode) → streaming tidak berguna
+_SAME_CODEC = {"mp3": ("mp3",), "opus": ("opus",), "vorbis": ("vorbis",), "flac": ("flac",),
+               "aac": ("mp4a", "aac"), "m4a": ("mp4a", "aac")}
+
+
+class StreamError(Exception):
+    """Stream gagal dengan cara yang aman untuk diulang lewat jalur normal."""
+
+
+_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+
+def _content_range(value: Optional[str]) -> Optional[Tuple[int, int, Optional[int]]]:
+    """(awal, akhir, total|None) dari header Content-Range; None bila tidak valid."""
+    m = _CONTENT_RANGE.match((value or "").strip())
+    if not m:
+        return None
+    return int(m.group(1)), int(m.group(2)), None if m.group(3) == "*" else int(m.group(3))
+
+
+def _extract_pp(ydl) -> Optional[FFmpegExtractAudioPP]:
+    return next((pp for pp in ydl._pps["post_process"] if isinstance(pp, FFmpegExtractAudioPP)), None)
+
+
+def wanted(cfg: Dict[str, Any], profile, info: Dict[str, Any]) -> bool:
+    """Cek murah sebelum pemilihan format."""
+    # normalisasi loudness butuh file sumber utuh untuk diukur sebelum encode
+    return (bool(cfg.get("audio_streaming", True)) and not cfg.get("loudness_normalize", False)
+            and profile.mode == "audio"
+            and profile.audio_codec not in (None, "best") and info.get("entries") is None)
+
+
+def _eligible(fmt: Dict[str, Any], target: str) -> Optional[str]:
+    """None bila format terpilih bisa di-stream; selain itu alasannya."""
+    if fmt.get("requested_formats"):
+        return "format gabungan"
+    if fmt.get("protocol") not in ("http", "https") or fmt.get("fragments"):
+        return f"protokol {fmt.get('protocol')}"
+    acodec = str(fmt.get("acodec") or "")
+    if any(acodec.startswith(c) for c in _SAME_CODEC.get(target, ())):
+        return "codec sumber sama (yt-dlp cukup stream-copy)"
+    return None
+
+
+def _progress(ydl, **d: Any) -> None:
+    for hook in ydl._progress_hooks:
+        hook(d)
+
+
+def _chunks(ydl, fmt: Dict[str, Any]):
+    """
+    Yield blok byte dari URL format; pakai Range per http_chunk_size bila diset extractor.
+    Potongan berikutnya hanya diminta bila server benar-benar menjawab 206 dengan
+    Content-Range yang cocok; server yang mengabaikan Range (200 + body utuh) dibaca
+    sekali lalu selesai.
+    """
+    headers = dict(fmt.get("http_headers") or {})
+    chunk = int((fmt.get("downloader_options") or {}).get("http_chunk_size") or 0)
+    start = 0
+    while True:
+        hdrs = dict(headers)
+        if chunk:
+            hdrs["Range"] = f"bytes={start}-{start + chunk - 1}"
+        try:
+            resp = ydl.urlopen(Request(fmt["url"], headers=hdrs))
+        except HTTPError as e:
+            if chunk and start and e.status == 416:
+                return  # ukuran file kelipatan chunk: potongan terakhir kosong = EOF
+            raise StreamError(str(e)) from e
+        except RequestError as e:
+            raise StreamError(str(e)) from e
+        ranged = False
+        total: Optional[int] = None
+        if chunk:
+            status = getattr(resp, "status", None)
+            crange = _content_range(resp.headers.get("Content-Range")) if status == 206 else None
+            if crange is not None and crange[0] == start:
+                ranged, total = True, crange[2]
+            elif status != 200 or start:
+                resp.close()
+                raise StreamError(f"Jawaban Range tidak valid (HTTP {status}, "
+                                  f"Content-Range {resp.headers.get('Content-Range')!r})")
+        got = 0
+        with resp:
+            while True:
+                try:
+                    block = resp.read(BLOCK)
+                except (OSError, RequestError) as e:
+                    raise StreamError(str(e)) from e
+                if not block:
+                    break
+                got += len(block)
+                yield block
+        if not ranged or got < chunk:
+            return
+        start += got
+        if total is not None and start >= total:
+            return
+
+
+def run(ydl, info: Dict[str, Any], final_path: str, log: Callable[[str], None]) -> Optional[Dict[str, Any]]:
+    """
+    Pilih format (tanpa unduh), lalu stream → ffmpeg → final_path dan jalankan
+    postprocessor sisa (thumbnail dsb., tanpa ExtractAudio). Kembalikan info hasil
+    bila berhasil, None bila tidak memenuhi syarat / gagal sehingga jalur normal dipakai.
+    Exception lain (mis. job dibatalkan dari progress hook) diteruskan.
+    """
+    pp = _extract_pp(ydl)
+    if pp is None or ydl.params.get("download_ranges"):
+        return None  # potongan waktu diunduh lewat downloader ffmpeg yt-dlp
+    target = pp.mapping
+    info = ydl.process_ie_result(info, download=False)
+    reason = _eligible(info, target)
+    ext, encoder, _more = ACODECS.get(target, (None, None, ()))
+    muxer = EXT_MUXERS.get(ext or "")
+    if reason is None and muxer is None:
+        reason = f"target {target}"
+    if reason:
+        log(f"Streaming dilewati: {reason}")
+        return None
+    if pp.executable is None:
+        return None
+    if encoder == "aac" and (getattr(pp, "_features", None) or {}).get("fdk"):
+        encoder = "libfdk_aac"  # sama dengan pilihan FFmpegExtractAudio
+    final_path = os.path.splitext(final_path)[0] + f".{ext}"
+    tmp = final_path + ".part"
+
+    cmd = [pp.executable, "-y", "-hide_banner", "-loglevel", "error", "-i", "pipe:0", "-vn"]
+    if encoder:
+        cmd += ["-acodec", encoder]
+    cmd += [*pp._quality_args(encoder), *pp._configuration_args(pp.basename, ["_o1", "_o", ""]),
+            "-f", muxer, tmp]
+    ydl.to_screen(f"[download] Destination: {final_path}")
+
+    total = info.get("filesize") or info.get("filesize_approx")
+    done = 0
+    t0 = time.monotonic()
+    ok = False
+    with tempfile.TemporaryFile() as errf:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=errf)
+        try:
+            try:
+                for block in _chunks(ydl, info):
+                    proc.stdin.write(block)
+                    done += len(block)
+                    elapsed = time.monotonic() - t0
+                    speed = done / elapsed if elapsed > 0 else None
+                    eta = int((total - done) / speed) if total and speed else None
+                    _progress(ydl, status="downloading", filename=final_path, tmpfilename=tmp,
+                              downloaded_bytes=done, total_bytes=total, elapsed=elapsed,
+                              speed=speed, eta=eta, info_dict=info,
+                              _speed_str=f"{format_bytes(speed)}/s" if speed else "-",
+                              _eta_str=f"{eta // 60:02d}:{eta % 60:02d}" if eta is not None else "--:--")
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass  # ffmpeg berhenti lebih dulu; pesan errornya dibaca di bawah
+            rc = proc.wait()
+            if rc != 0:
+                errf.seek(0)
+                msg = errf.read().decode("utf-8", "replace").strip().splitlines()
+                raise StreamError(f"ffmpeg keluar {rc}: {msg[-1] if msg else '-'}")
+            os.replace(tmp, final_path)
+            ok = True
+        except StreamError as e:
+            log(f"Streaming gagal ({e}), ulang lewat unduhan biasa…")
+            return None
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            if not ok and os.path.exists(tmp):
+                os.remove(tmp)
+
+    _progress(ydl, status="finished", filename=final_path, downloaded_bytes=done,
+              total_bytes=done, elapsed=time.monotonic() - t0, info_dict=info)
+    info.update({"filepath": final_path, "ext": ext, "__real_download": True,
+                 "requested_downloads": [{"filepath": final_path, "ext": ext,
+                                          "format_id": info.get("format_id")}]})
+    for other in ydl._pps["post_process"]:
+        if other is not pp:
+            info = ydl.run_pp(other, info)
+    info["requested_downloads"][0]["filepath"] = info.get("filepath", final_path)
+    return info
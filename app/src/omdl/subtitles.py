@@ -0,0 +1,475 @@
+from __future__ import annotations
+
+import hashlib
+import html
+import os
+import re
+import shutil
+import threading
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from yt_dlp.postprocessor import FFmpegEmbedSubtitlePP, FFmpegMergerPP, PostProcessor
+from yt_dlp.utils import ISO639Utils, prepend_extension
+from yt_dlp.utils.networking import std_headers
+
+# Pipeline subtitle: track dipilih per bahasa (manual / auto-caption sesuai
+# subtitle_auto) segera setelah ekstraksi, diunduh di pool terpisah SEMENTARA
+# media diunduh, lalu dikonversi oleh konverter pure-Python (VTT/SRT → SRT/ASS/VTT)
+# — tanpa satu proses ffmpeg per file seperti FFmpegSubtitlesConvertor.
+# Embed (opsional) ikut pass merge video+audio (SubtitleMergerPP), jadi tidak ada
+# remux tambahan; hanya unduhan format tunggal yang butuh satu pass embed.
+#
+# Layout cache:
+#   <cache_dir>/subs/src/<sha1(url)>.<ext>         file asli (dipakai ulang per URL)
+#   <cache_dir>/subs/<fmt>/<sha256>[-auto].<fmt>   hasil konversi, per hash isi
+
+PP_KEY = "OmdlSubtitle"
+_INFO_KEY = "__omdl_subtitles"   # key privat: tidak ikut ditulis ke info.json
+_EMBEDDED_KEY = "__omdl_subtitles_embedded"
+FORMATS = ("srt", "ass", "vtt")
+AUTO_MODES = ("never", "fallback", "prefer")
+_SOURCE_EXTS = ("vtt", "srt")
+_MOV_TEXT_EXTS = ("mp4", "mov", "m4v")
+
+_POOLS: Dict[int, ThreadPoolExecutor] = {}  # per jumlah worker
+_POOL_LOCK = threading.Lock()
+
+Cue = Tuple[float, float, str]  # (mulai, selesai, teks) detik
+
+
+class Track:
+    """Subtitle siap pakai: file hasil konversi + file asli dari situs."""
+
+    def __init__(self, lang: str, auto: bool, path: str, source: str) -> None:
+        self.lang = lang
+        self.auto = auto
+        self.path = path
+        self.source = source
+
+    @property
+    def ext(self) -> str:
+        return os.path.splitext(self.path)[1][1:]
+
+
+def _pool(workers: int) -> ThreadPoolExecutor:
+    workers = max(1, workers)
+    with _POOL_LOCK:
+        pool = _POOLS.get(workers)
+        if pool is None:
+            pool = _POOLS[workers] = ThreadPoolExecutor(max_workers=workers,
+                                                         thread_name_prefix=f"omdl-subs{workers}")
+        return pool
+
+
+# ===== Konverter =====
+
+_TIME = r"(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{1,3})"
+_TIMING = re.compile(rf"^\s*{_TIME}\s*-->\s*{_TIME}")
+_INLINE_TS = re.compile(r"<\d{1,2}:\d{2}(?::\d{2})?[.,]\d{3}>")
+_TAG = re.compile(r"<(/?)([a-zA-Z]+)(?:[.\s][^>]*)?>")
+_ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: 384
+PlayResY: 288
+WrapStyle: 0
+ScaledBorderAndShadow: yes
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,16,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,0,0,0,0,100,100,0,0,1,1,0,2,10,10,10,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+
+def _seconds(h: Optional[str], m: str, s: str, ms: str) -> float:
+    return int(h or 0) * 3600 + int(m) * 60 + int(s) + int(ms.ljust(3, "0")) / 1000
+
+
+def _clean(text: str) -> str:
+    """Buang timestamp inline, class/voice tag & entity; <b>/<i>/<u> dipertahankan."""
+    text = _INLINE_TS.sub("", text)
+    text = _TAG.sub(lambda m: f"<{m.group(1)}{m.group(2).lower()}>"
+                    if m.group(2).lower() in ("b", "i", "u") else "", text)
+    text = html.unescape(text).replace("\u00a0", " ")
+    return "\n".join(line.strip() for line in text.split("\n") if line.strip())
+
+
+def parse(text: str) -> List[Cue]:
+    """Cue dari WebVTT atau SRT (header, NOTE, STYLE & nomor urut SRT diabaikan)."""
+    lines = text.lstrip("\ufeff").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    cues: List[Cue] = []
+    i = 0
+    while i < len(lines):
+        m = _TIMING.match(lines[i])
+        i += 1
+        if not m:
+            continue
+        start, end = _seconds(*m.group(1, 2, 3, 4)), _seconds(*m.group(5, 6, 7, 8))
+        body: List[str] = []
+        # cue berakhir di baris kosong; baris berisi spasi saja (auto-caption YouTube)
+        # masih bagian cue. Baris tepat sebelum timing berikutnya = identifier cue itu.
+        while i < len(lines) and lines[i] != "" and not _TIMING.match(lines[i]):
+            if i + 1 < len(lines) and _TIMING.match(lines[i + 1]):
+                break
+            body.append(lines[i])
+            i += 1
+        cues.append((start, end, _clean("\n".join(body))))
+    return cues
+
+
+def _dedupe(cues: List[Cue]) -> List[Cue]:
+    """
+    Auto-caption (mis. YouTube) "bergulir": tiap cue mengulang baris cue sebelumnya
+    lalu menambah kata baru, diselingi cue transisi ~10 ms. Sisakan baris baru saja.
+    """
+    out: List[Cue] = []
+    prev: List[str] = []
+    for start, end, text in cues:
+        lines = text.split("\n") if text else []
+        k = min(len(lines), len(prev))
+        while k and lines[:k] != prev[-k:]:
+            k -= 1
+        prev = lines
+        new = "\n".join(lines[k:])
+        if not new:
+            continue
+        if out and out[-1][2] == new and start - out[-1][1] < 0.05:
+            out[-1] = (out[-1][0], max(end, out[-1][1]), new)
+            continue
+        out.append((start, end, new))
+    return out
+
+
+def _stamp(t: float, sep: str) -> str:
+    ms = int(round(t * 1000))
+    h, rem = divmod(ms, 3600000)
+    m, rem = divmod(rem, 60000)
+    s, ms = divmod(rem, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{sep}{ms:03d}"
+
+
+def _ass_stamp(t: float) -> str:
+    cs = int(round(t * 100))
+    h, rem = divmod(cs, 360000)
+    m, rem = divmod(rem, 6000)
+    s, cs = divmod(rem, 100)
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def _ass_text(text: str) -> str:
+    text = re.sub(r"<(/?)([biu])>", lambda m: f"{{\\{m.group(2)}{0 if m.group(1) else 1}}}", text)
+    return text.replace("\n", "\\N")
+
+
+def _vtt_text(text: str) -> str:
+    return re.sub(r"&lt;(/?[biu])&gt;", r"<\1>", html.escape(text, quote=False))
+
+
+def render(cues: List[Cue], fmt: str) -> str:
+    if fmt == "ass":
+        return _ASS_HEADER + "".join(
+            f"Dialogue: 0,{_ass_stamp(s)},{_ass_stamp(e)},Default,,0,0,0,,{_ass_text(t)}\n" for s, e, t in cues)
+    if fmt == "vtt":
+        return "WEBVTT\n\n" + "".join(f"{_stamp(s, '.')} --> {_stamp(e, '.')}\n{_vtt_text(t)}\n\n" for s, e, t in cues)
+    return "".join(f"{n}\n{_stamp(s, ',')} --> {_stamp(e, ',')}\n{t}\n\n"
+                   for n, (s, e, t) in enumerate(cues, start=1))
+
+
+def convert(text: str, fmt: str, rolling: bool = False) -> str:
+    """VTT/SRT → srt|ass|vtt. `rolling=True` merapikan auto-caption bergulir."""
+    cues = parse(text)
+    return render(_dedupe(cues) if rolling else [c for c in cues if c[2]], fmt)
+
+
+# ===== Pemilihan & unduh =====
+
+def matching(available: List[str], patterns: List[str]) -> List[str]:
+    """Bahasa yang cocok dengan pola (kode persis, regex seperti "en.*", atau "all")."""
+    out: List[str] = []
+    for pat in patterns:
+        if pat == "all":
+            found = available
+        else:
+            try:
+                found = [lang for lang in available if re.fullmatch(pat, lang)]
+            except re.error:
+                found = [lang for lang in available if lang == pat]
+        out.extend(lang for lang in found if lang not in out)
+    return out
+
+
+def pick(tracks: List[Dict[str, Any]], fmt: str) -> Optional[Dict[str, Any]]:
+    """Track yang bisa dikonversi: format target bila tersedia, lalu vtt, lalu srt."""
+    for ext in (fmt, *_SOURCE_EXTS):
+        for t in tracks:
+            if t.get("ext") == ext and (t.get("url") or t.get("data") is not None):
+                return t
+    return None
+
+
+def select(info: Dict[str, Any], langs: List[str], auto: str, fmt: str) -> List[Tuple[str, bool, Dict[str, Any]]]:
+    """(bahasa, auto?, track) per bahasa yang diminta, menurut preferensi subtitle_auto."""
+    manual = {k: v for k, v in (info.get("subtitles") or {}).items() if k != "live_chat" and v}
+    autos = {k: v for k, v in (info.get("automatic_captions") or {}).items() if v} if auto != "never" else {}
+    order = ((autos, True), (manual, False)) if auto == "prefer" else ((manual, False), (autos, True))
+    chosen: Dict[str, Tuple[bool, Dict[str, Any]]] = {}
+    for pat in langs:
+        for source, is_auto in order:
+            hits = [(lang, t) for lang in matching(list(source), [pat])
+                    if lang not in chosen and (t := pick(source[lang], fmt)) is not None]
+            if hits:
+                for lang, t in hits:
+                    chosen[lang] = (is_auto, t)
+                break
+    return [(lang, is_auto, t) for lang, (is_auto, t) in chosen.items()]
+
+
+def _fetch(cache_dir: str, track: Dict[str, Any], timeout: float) -> str:
+    src_dir = os.path.join(cache_dir, "subs", "src")
+    if track.get("data") is not None:
+        data = str(track["data"]).encode("utf-8")
+        key = hashlib.sha1(data).hexdigest()
+    else:
+        key = hashlib.sha1(track["url"].encode("utf-8")).hexdigest()
+        data = None
+    path = os.path.join(src_dir, f"{key}.{track['ext']}")
+    if os.path.exists(path):
+        return path
+    if data is None:
+        headers = dict(std_headers)
+        headers.update(track.get("http_headers") or {})
+        with urllib.request.urlopen(urllib.request.Request(track["url"], headers=headers), timeout=timeout) as resp:
+            data = resp.read()
+    os.makedirs(src_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+def _converted(cache_dir: str, src: str, fmt: str, rolling: bool) -> str:
+    """Hasil konversi dari cache (per hash isi); dikonversi sekali bila belum ada."""
+    src_ext = os.path.splitext(src)[1][1:]
+    if src_ext == fmt and (not rolling or src_ext not in _SOURCE_EXTS):
+        return src
+    with open(src, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    out_dir = os.path.join(cache_dir, "subs", fmt)
+    dst = os.path.join(out_dir, f"{digest}{'-auto' if rolling else ''}.{fmt}")
+    if not os.path.exists(dst):
+        os.makedirs(out_dir, exist_ok=True)
+        tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(convert(data.decode("utf-8-sig", "replace"), fmt, rolling))
+        os.replace(tmp, dst)
+    return dst
+
+
+def _prepare(cache_dir: str, lang: str, auto: bool, track: Dict[str, Any], fmt: str, timeout: float) -> Optional[Track]:
+    """Unduh (atau ambil dari cache) + konversi satu track; dijalankan di pool."""
+    try:
+        src = _fetch(cache_dir, track, timeout)
+        return Track(lang, auto, _converted(cache_dir, src, fmt, auto), src)
+    except (OSError, ValueError):
+        return None
+
+
+class _Pending:
+    """Future track milik satu video + opsi embed (dibaca SubtitleMergerPP & OmdlSubtitlePP)."""
+
+    def __init__(self, futures: List["Future[Optional[Track]]"], embed: bool, timeout: float) -> None:
+        self.futures = futures
+        self.embed = embed
+        self.timeout = timeout
+        self._tracks: Optional[List[Track]] = None
+
+    def tracks(self) -> List[Track]:
+        if self._tracks is None:
+            out: List[Track] = []
+            for fut in self.futures:
+                try:
+                    track = fut.result(self.timeout)
+                except Exception:
+                    track = None
+                if track is not None:
+                    out.append(track)
+            self._tracks = out
+        return self._tracks
+
+
+def cache_key(cfg: Dict[str, Any], langs: List[str]) -> Tuple[Any, ...]:
+    """Bagian cfg yang memengaruhi hasil take_over (untuk key cache profil)."""
+    if not cfg.get("subtitles", False):
+        return ()
+    return (tuple(langs), cfg.get("subtitle_auto"), cfg.get("subtitle_format"), bool(cfg.get("subtitle_embed")),
+            cfg.get("cache_dir", "cache"), cfg.get("subtitle_workers", 4), cfg.get("subtitle_timeout", 30))
+
+
+def wanted(postprocessors) -> Optional[Dict[str, Any]]:
+    """Definisi PP subtitle di profil (None bila profil tidak memakai subtitle)."""
+    for pp in postprocessors:
+        if pp.get("key") == PP_KEY:
+            return dict(pp)
+    return None
+
+
+def _prefetch(info: Dict[str, Any], spec: Dict[str, Any]) -> _Pending:
+    pool = _pool(int(spec.get("workers") or 4))
+    timeout = float(spec.get("timeout") or 30)
+    futures = [pool.submit(_prepare, spec.get("cache_dir") or "cache", lang, auto, track,
+                           spec.get("format") or "srt", timeout)
+               for lang, auto, track in select(info, list(spec.get("langs") or []),
+                                                spec.get("auto") or "fallback", spec.get("format") or "srt")]
+    return _Pending(futures, bool(spec.get("embed")), timeout)
+
+
+def attach(info: Dict[str, Any], postprocessors) -> None:
+    """
+    Mulai unduh subtitle tiap entry di latar belakang (dipanggil setelah ekstraksi,
+    sebelum process_ie_result). Hasilnya diambil merger / OmdlSubtitlePP.
+    """
+    spec = wanted(postprocessors)
+    if spec is None:
+        return
+    if info.get("entries") is not None:
+        for entry in info["entries"] or []:
+            if entry:
+                attach(entry, postprocessors)
+        return
+    info[_INFO_KEY] = _prefetch(info, spec)
+
+
+def take_over(pp_defs: List[Dict[str, Any]], opts: Dict[str, Any], cfg: Dict[str, Any],
+              langs: List[str]) -> List[Dict[str, Any]]:
+    """
+    Pasang OmdlSubtitlePP (dipanggil saat kompilasi profil bila subtitles aktif).
+    Unduh/konversi/embed subtitle bawaan yt-dlp dimatikan agar tidak berjalan
+    serial sebelum media & tidak meluncurkan ffmpeg per file.
+    """
+    for key in ("writesubtitles", "writeautomaticsub", "subtitleslangs", "subtitlesformat"):
+        opts.pop(key, None)
+    fmt = str(cfg.get("subtitle_format") or "srt").lower()
+    auto = str(cfg.get("subtitle_auto") or "fallback").lower()
+    out = [p for p in pp_defs if p.get("key") not in ("FFmpegSubtitlesConvertor", "FFmpegEmbedSubtitle")]
+    out.append({
+        "key": PP_KEY,
+        "langs": list(langs),
+        "auto": auto if auto in AUTO_MODES else "fallback",
+        "format": fmt if fmt in FORMATS else "srt",
+        "embed": bool(cfg.get("subtitle_embed", False)),
+        "cache_dir": cfg.get("cache_dir", "cache"),
+        "workers": int(cfg.get("subtitle_workers", 4) or 4),
+        "timeout": float(cfg.get("subtitle_timeout", 30) or 30),
+    })
+    return out
+
+
+def _embed_inputs(tracks: List[Track], ext: str) -> List[Tuple[Track, str]]:
+    """(track, file) yang bisa di-mux ke kontainer `ext`; webm hanya menerima WebVTT."""
+    if ext == "webm":
+        return [(t, t.path if t.ext == "vtt" else t.source) for t in tracks
+                if t.ext == "vtt" or t.source.endswith(".vtt")]
+    if ext in _MOV_TEXT_EXTS or ext == "mkv":
+        return [(t, t.path) for t in tracks]
+    return []
+
+
+def _lang_code(lang: str) -> str:
+    return ISO639Utils.short2long(lang.split("-")[0]) or lang
+
+
+class SubtitleMergerPP(FFmpegMergerPP):
+    """FFmpegMerger yang sekaligus me-mux subtitle dari pipeline (satu pass ffmpeg)."""
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+        pending = info.get(_INFO_KEY)
+        inputs = _embed_inputs(pending.tracks(), info["ext"]) if pending is not None and pending.embed else []
+        if not inputs:
+            return super().run(info)
+        filename = info["filepath"]
+        temp_filename = prepend_extension(filename, "temp")
+        args = ["-c", "copy"]
+        audio_streams = 0
+        for (i, fmt) in enumerate(info["requested_formats"]):
+            if fmt.get("acodec") != "none":
+                args.extend(["-map", f"{i}:a:0"])
+                if fmt["protocol"].startswith("m3u8") and self.get_audio_codec(fmt["filepath"]) == "aac":
+                    args.extend([f"-bsf:a:{audio_streams}", "aac_adtstoasc"])
+                audio_streams += 1
+            if fmt.get("vcodec") != "none":
+                args.extend(["-map", f"{i}:v:0"])
+        files = list(info["__files_to_merge"])
+        for j, (track, _path) in enumerate(inputs):
+            args.extend(["-map", f"{len(files) + j}:0", f"-metadata:s:s:{j}", f"language={_lang_code(track.lang)}"])
+        if info["ext"] in _MOV_TEXT_EXTS:
+            args.extend(["-c:s", "mov_text"])
+        self.to_screen(f'Merging formats + {len(inputs)} subtitle into "{filename}"')
+        # file subtitle milik cache → tidak masuk daftar hapus
+        self.run_ffmpeg_multiple_files(files + [path for _t, path in inputs], temp_filename, args)
+        os.rename(temp_filename, filename)
+        info[_EMBEDDED_KEY] = True
+        return info["__files_to_merge"], info
+
+
+class OmdlSubtitlePP(PostProcessor):
+    """Tulis subtitle dari cache di samping file; embed ke file format tunggal bila diminta."""
+
+    def __init__(self, downloader=None, langs=(), auto: str = "fallback", format: str = "srt",
+                 embed: bool = False, cache_dir: str = "cache", workers: int = 4, timeout: float = 30) -> None:
+        super().__init__(downloader)
+        self._spec = {"langs": list(langs), "auto": auto, "format": format, "embed": embed,
+                      "cache_dir": cache_dir, "workers": workers, "timeout": timeout}
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+        pending = info.pop(_INFO_KEY, None) or _prefetch(info, self._spec)
+        embedded = info.pop(_EMBEDDED_KEY, False)
+        tracks = pending.tracks()
+        if not tracks:
+            self.to_screen("Subtitle tidak tersedia, dilewati")
+            return [], info
+        if embedded:
+            return [], info
+        if pending.embed and info.get("vcodec") != "none":
+            inputs = _embed_inputs(tracks, info["ext"])
+            if inputs:
+                saved = info.get("requested_subtitles")
+                info["requested_subtitles"] = {t.lang: {"ext": os.path.splitext(p)[1][1:], "filepath": p}
+                                               for t, p in inputs}
+                try:
+                    _deleted, info = FFmpegEmbedSubtitlePP(self._downloader, already_have_subtitle=True).run(info)
+                finally:
+                    info["requested_subtitles"] = saved
+                return [], info
+        base = os.path.splitext(info["filepath"])[0]
+        for t in tracks:
+            dst = f"{base}.{t.lang}.{t.ext}"
+            if not os.path.exists(dst):
+                shutil.copyfile(t.path, dst)
+                self.to_screen(f"Writing {'auto-caption' if t.auto else 'subtitle'} to: {dst}")
+        return [], info
+
+
+def install_merger(ydl) -> None:
+    """
+    Pakai SubtitleMergerPP untuk `ydl` ini saja. YoutubeDL.process_info membuat
+    FFmpegMergerPP sendiri dan menitipkannya di info['__postprocessors']; merger itu
+    ditukar tepat sebelum post_process, tanpa menyentuh modul yt-dlp secara global.
+    """
+    orig = ydl.post_process
+
+    def post_process(filename, info, files_to_move=None):
+        pps = info.get("__postprocessors")
+        if pps:
+            info["__postprocessors"] = [SubtitleMergerPP(ydl) if type(pp) is FFmpegMergerPP else pp
+                                        for pp in pps]
+        return orig(filename, info, files_to_move)
+
+    ydl.post_process = post_process
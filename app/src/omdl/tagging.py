@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import os
+import shutil
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:  # opsional: dipakai untuk Ogg/Opus/FLAC & cadangan bila penulis native menyerah
+    import mutagen
+except ImportError:
+    mutagen = None
+
+# Tag metadata in-place setelah unduh: hanya atom/frame metadata yang ditulis,
+# payload media tidak disalin ulang (beda dengan FFmpegMetadata yang me-remux
+# seluruh file). Dijalankan sebagai tahap post-download ber-pool, sebelum dedup
+# meng-hash file final.
+#
+#   MP4/M4A  moov/udta/meta/ilst; moov yang membesar dipindah ke akhir file dan
+#            moov lama ditandai 'free' → offset chunk mdat tetap valid.
+#   MP3      ID3v2 ditimpa di tempat bila muat di ruang tag + padding lama;
+#            selain itu tulis ulang sekali dengan padding agar edit berikutnya in-place.
+#   Ogg/Opus lewat mutagen (bila terpasang).
+
+MP4_EXTS = ("mp4", "m4a", "m4v", "mov")
+MP3_EXTS = ("mp3",)
+MUTAGEN_EXTS = ("opus", "ogg", "oga", "flac")
+ID3_PADDING = 2048
+
+_POOLS: Dict[int, ThreadPoolExecutor] = {}  # per jumlah worker
+_POOL_LOCK = threading.Lock()
+
+
+class TagError(Exception):
+    """Struktur file tidak bisa ditangani penulis native."""
+
+
+def tags_from_info(info: Dict[str, Any]) -> Dict[str, str]:
+    """Field tag dari info_dict (pemetaan sama dengan FFmpegMetadata yt-dlp)."""
+
+    def first(*keys: str) -> Optional[str]:
+        for k in keys:
+            v = info.get(k)
+            if v not in (None, "", []):
+                if isinstance(v, (list, tuple)):
+                    v = ", ".join(map(str, v))
+                return str(v).replace("\0", "")
+        return None
+
+    date = first("release_date", "upload_date")
+    if date and len(date) == 8 and date.isdigit():
+        date = f"{date[:4]}-{date[4:6]}-{date[6:]}"
+    tags = {
+        "title": first("track", "title"),
+        "artist": first("artist", "artists", "creator", "creators", "uploader", "uploader_id"),
+        "album": first("album", "series"),
+        "album_artist": first("album_artist", "album_artists"),
+        "date": date,
+        "genre": first("genre", "genres"),
+        "comment": first("webpage_url"),
+        "description": first("description"),
+    }
+    return {k: v for k, v in tags.items() if v}
+
+
+# ===== MP4 =====
+_MP4_ITEMS = {
+    "title": b"\xa9nam",
+    "artist": b"\xa9ART",
+    "album": b"\xa9alb",
+    "album_artist": b"aART",
+    "date": b"\xa9day",
+    "genre": b"\xa9gen",
+    "comment": b"\xa9cmt",
+    "description": b"desc",
+}
+_MP4_HDLR = struct.pack(">I4sII4s", 33, b"hdlr", 0, 0, b"mdir") + b"appl" + b"\0" * 9
+
+
+def _atoms(data: bytes, start: int = 0, end: Optional[int] = None) -> List[Tuple[bytes, bytes]]:
+    """Pecah buffer menjadi [(type, atom-utuh)]; hanya ukuran 32-bit."""
+    out: List[Tuple[bytes, bytes]] = []
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        if size < 8 or pos + size > end:
+            raise TagError("atom rusak / ukuran 64-bit di dalam moov")
+        out.append((kind, data[pos:pos + size]))
+        pos += size
+    return out
+
+
+def _box(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def _ilst_item(kind: bytes, value: str) -> bytes:
+    # 'data': type 1 = UTF-8, locale 0
+    return _box(kind, _box(b"data", struct.pack(">II", 1, 0) + value.encode("utf-8")))
+
+
+def _new_moov(moov: bytes, tags: Dict[str, str]) -> bytes:
+    children = _atoms(moov, 8)
+    udta = next((a for k, a in children if k == b"udta"), None)
+    udta_children = _atoms(udta, 8) if udta else []
+    meta = next((a for k, a in udta_children if k == b"meta"), None)
+    meta_children = _atoms(meta, 12) if meta else []
+    ilst = next((a for k, a in meta_children if k == b"ilst"), None)
+
+    ours = {_MP4_ITEMS[k] for k in tags if k in _MP4_ITEMS}
+    items = [a for k, a in (_atoms(ilst, 8) if ilst else []) if k not in ours]
+    items += [_ilst_item(_MP4_ITEMS[k], v) for k, v in tags.items() if k in _MP4_ITEMS]
+    new_ilst = _box(b"ilst", b"".join(items))
+
+    if not any(k == b"hdlr" for k, _ in meta_children):
+        meta_children.insert(0, (b"hdlr", _MP4_HDLR))
+    meta_body = [new_ilst if k == b"ilst" else a for k, a in meta_children]
+    if ilst is None:
+        meta_body.append(new_ilst)
+    new_meta = _box(b"meta", b"\0\0\0\0" + b"".join(meta_body))
+
+    udta_body = [new_meta if k == b"meta" else a for k, a in udta_children]
+    if meta is None:
+        udta_body.append(new_meta)
+    new_udta = _box(b"udta", b"".join(udta_body))
+
+    moov_body = [new_udta if k == b"udta" else a for k, a in children]
+    if udta is None:
+        moov_body.append(new_udta)
+    return _box(b"moov", b"".join(moov_body))
+
+
+def _top_level(f) -> List[Tuple[bytes, int, int]]:
+    """[(type, offset, size)] atom level teratas."""
+    f.seek(0, os.SEEK_END)
+    total = f.tell()
+    out: List[Tuple[bytes, int, int]] = []
+    pos = 0
+    while pos + 8 <= total:
+        f.seek(pos)
+        size, kind = struct.unpack(">I4s", f.read(8))
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+        elif size == 0:
+            size = total - pos
+        if size < 8:
+            raise TagError("atom level atas rusak")
+        out.append((kind, pos, size))
+        pos += size
+    return out
+
+
+def _tag_mp4(path: str, tags: Dict[str, str]) -> str:
+    with open(path, "r+b") as f:
+        top = _top_level(f)
+        idx = next((i for i, (k, _, _) in enumerate(top) if k == b"moov"), None)
+        if idx is None:
+            raise TagError("moov tidak ditemukan")
+        _, off, size = top[idx]
+        f.seek(off)
+        moov = f.read(size)
+        if struct.unpack(">I", moov[:4])[0] == 1:
+            raise TagError("moov 64-bit")
+        new = _new_moov(moov, tags)
+
+        # ruang yang boleh dipakai: moov lama + atom free/skip tepat sesudahnya
+        room = size
+        for kind, _o, s in top[idx + 1:]:
+            if kind not in (b"free", b"skip"):
+                break
+            room += s
+        is_last = all(k in (b"free", b"skip") for k, _o, _s in top[idx + 1:])
+
+        if is_last:
+            f.seek(off)
+            f.write(new)
+            f.truncate()
+            return "in-place"
+        if len(new) == room or len(new) + 8 <= room:
+            f.seek(off)
+            f.write(new)
+            if room > len(new):
+                f.write(struct.pack(">I4s", room - len(new), b"free"))
+            return "in-place"
+        # moov tidak muat: tulis di akhir file, moov lama jadi 'free'
+        _k, last_off, _s = top[-1]
+        f.seek(last_off)
+        if struct.unpack(">I", f.read(4))[0] == 0:
+            raise TagError("atom terakhir berukuran 'sampai EOF'")
+        f.seek(0, os.SEEK_END)
+        f.write(new)
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(off + 4)
+        f.write(b"free")
+        return "moov dipindah ke akhir"
+
+
+# ===== MP3 (ID3v2) =====
+_ID3_FRAMES = {
+    "title": "TIT2",
+    "artist": "TPE1",
+    "album": "TALB",
+    "album_artist": "TPE2",
+    "genre": "TCON",
+}
+
+
+def _syncsafe(n: int) -> bytes:
+    return bytes(((n >> 21) & 0x7F, (n >> 14) & 0x7F, (n >> 7) & 0x7F, n & 0x7F))
+
+
+def _unsyncsafe(b: bytes) -> int:
+    return (b[0] << 21) | (b[1] << 14) | (b[2] << 7) | b[3]
+
+
+def _id3_text(version: int, value: str) -> bytes:
+    # v2.4: UTF-8 (3); v2.3: UTF-16 dengan BOM (1)
+    if version == 4:
+        return b"\x03" + value.encode("utf-8")
+    return b"\x01" + value.encode("utf-16")
+
+
+def _id3_frame(version: int, fid: str, payload: bytes) -> bytes:
+    size = _syncsafe(len(payload)) if version == 4 else struct.pack(">I", len(payload))
+    return fid.encode("ascii") + size + b"\0\0" + payload
+
+
+def _id3_frames(version: int, tags: Dict[str, str]) -> Dict[str, bytes]:
+    out: Dict[str, bytes] = {}
+    for key, fid in _ID3_FRAMES.items():
+        if key in tags:
+            out[fid] = _id3_frame(version, fid, _id3_text(version, tags[key]))
+    if "date" in tags:
+        if version == 4:
+            out["TDRC"] = _id3_frame(4, "TDRC", _id3_text(4, tags["date"]))
+        else:
+            out["TYER"] = _id3_frame(3, "TYER", _id3_text(3, tags["date"][:4]))
+    if "comment" in tags:
+        enc = _id3_text(version, "")[:1]
+        term = b"\0" if version == 4 else b"\xff\xfe\0\0"
+        text = tags["comment"].encode("utf-8" if version == 4 else "utf-16")
+        out["COMM"] = _id3_frame(version, "COMM", enc + b"eng" + term + text)
+    return out
+
+
+def _tag_mp3(path: str, tags: Dict[str, str]) -> str:
+    with open(path, "r+b") as f:
+        head = f.read(10)
+        version, old_size, footer, kept = 3, 0, 0, []
+        tag_end = 0  # awal payload audio
+        if len(head) == 10 and head[:3] == b"ID3":
+            version, flags = head[3], head[5]
+            if version not in (3, 4) or flags & 0xC0:  # unsync / extended header
+                raise TagError(f"ID3v2.{version} dengan flag {flags:#x}")
+            old_size = _unsyncsafe(head[6:10])
+            footer = 10 if version == 4 and flags & 0x10 else 0
+            tag_end = 10 + old_size + footer
+            body = f.read(old_size)
+            pos = 0
+            while pos + 10 <= len(body) and body[pos:pos + 1] != b"\0":
+                fid = body[pos:pos + 4].decode("latin-1")
+                raw = body[pos + 4:pos + 8]
+                size = _unsyncsafe(raw) if version == 4 else struct.unpack(">I", raw)[0]
+                kept.append((fid, body[pos:pos + 10 + size]))
+                pos += 10 + size
+        new_frames = _id3_frames(version, tags)
+        replaced = set(new_frames) | ({"TYER", "TDRC"} if "date" in tags else set())
+        if "comment" in tags:
+            replaced.add("COMM")
+        frames = (b"".join(raw for fid, raw in kept if fid not in replaced)
+                  + b"".join(new_frames.values()))
+
+        # v2.4 ber-footer tidak boleh punya padding → tulis ulang tanpa footer
+        if old_size and not footer and len(frames) <= old_size:
+            f.seek(10)
+            f.write(frames + b"\0" * (old_size - len(frames)))
+            return "in-place"
+
+    # tidak muat: tulis ulang sekali dengan padding (payload disalin di kernel bila bisa)
+    size = len(frames) + ID3_PADDING
+    tmp = f"{path}.tag.tmp"
+    with open(path, "rb") as src, open(tmp, "wb") as dst:
+        dst.write(b"ID3" + bytes((version, 0, 0)) + _syncsafe(size) + frames + b"\0" * ID3_PADDING)
+        src.seek(tag_end)
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    shutil.copystat(path, tmp)
+    os.replace(tmp, path)
+    return "ditulis ulang (+padding)"
+
+
+# ===== mutagen =====
+def _tag_mutagen(path: str, tags: Dict[str, str]) -> str:
+    if mutagen is None:
+        raise TagError("mutagen tidak terpasang")
+    audio = mutagen.File(path, easy=True)
+    if audio is None:
+        raise TagError("format tidak dikenali mutagen")
+    if audio.tags is None:
+        audio.add_tags()
+    for key, value in tags.items():
+        try:
+            audio["albumartist" if key == "album_artist" else key] = value
+        except (KeyError, ValueError):
+            pass  # key tidak didukung format ini (mis. 'comment' di EasyID3)
+    audio.save()
+    return "mutagen"
+
+
+def tag_file(path: str, tags: Dict[str, str]) -> str:
+    """Tulis tag ke satu file; kembalikan cara penulisan. TagError bila tidak didukung."""
+    ext = os.path.splitext(path)[1][1:].lower()
+    if not tags:
+        return "tanpa tag"
+    try:
+        if ext in MP4_EXTS:
+            return _tag_mp4(path, tags)
+        if ext in MP3_EXTS:
+            return _tag_mp3(path, tags)
+    except (TagError, struct.error) as e:
+        if mutagen is None:
+            raise TagError(str(e))
+    if ext in MP4_EXTS + MP3_EXTS + MUTAGEN_EXTS:
+        return _tag_mutagen(path, tags)
+    raise TagError(f".{ext} tidak didukung")
+
+
+def supported(path: str) -> bool:
+    ext = os.path.splitext(path)[1][1:].lower()
+    return ext in MP4_EXTS + MP3_EXTS or (mutagen is not None and ext in MUTAGEN_EXTS)
+
+
+def _pool(workers: int) -> ThreadPoolExecutor:
+    workers = max(1, workers)
+    with _POOL_LOCK:
+        pool = _POOLS.get(workers)
+        if pool is None:
+            pool = _POOLS[workers] = ThreadPoolExecutor(max_workers=workers,
+                                                         thread_name_prefix=f"omdl-tag{workers}")
+        return pool
+
+
+def tag_downloads(files: Iterable[Tuple[Dict[str, Any], str]],
+                  workers: int = 2) -> List[Tuple[str, str, bool]]:
+    """
+    Tag semua file final (pasangan (info, path)) lewat pool bersama; tunggu selesai.
+    Kontainer yang tidak didukung (webm/mkv, Ogg tanpa mutagen) dilewati diam-diam.
+    Hasil: [(path, keterangan, ok)].
+    """
+    jobs = [(path, _pool(workers).submit(tag_file, path, tags_from_info(info)))
+            for info, path in files if supported(path)]
+    out: List[Tuple[str, str, bool]] = []
+    for path, fut in jobs:
+        try:
+            out.append((path, fut.result(), True))
+        except Exception as e:  # TagError, OSError, atau kelas error milik mutagen
+            out.append((path, str(e), False))
+    return out
+
+
+def take_over(pp_defs: List[Dict[str, Any]],
+              opts: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Saat kompilasi profil: `addmetadata` (opsi CLI yang diabaikan API YoutubeDL) dan
+    FFmpegMetadata polos diganti tahap tag in-place. FFmpegMetadata yang juga
+    menulis chapter/infojson dibiarkan ke ffmpeg.
+    """
+    wanted = bool(opts.pop("addmetadata", False))
+    out: List[Dict[str, Any]] = []
+    for p in pp_defs:
+        if (p.get("key") == "FFmpegMetadata" and p.get("add_metadata", True)
+                and not p.get("add_chapters") and not p.get("add_infojson")):
+            wanted = True
+            continue
+        out.append(p)
+    return out, wanted
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from yt_dlp.postprocessor import EmbedThumbnailPP, PostProcessor
+from yt_dlp.utils.networking import std_headers
+
+try:  # konversi in-process bila Pillow terpasang; selain itu ffmpeg
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Pipeline thumbnail: unduh thumbnail di pool terpisah SEMENTARA media diunduh,
+# cache per URL (file asli) dan per hash isi (hasil konversi), konversi lewat satu
+# jalur (Pillow/ffmpeg) yang dibatasi ukuran pool, lalu embed lewat EmbedThumbnail
+# bawaan yt-dlp — dilewati bila cover identik sudah ada di file.
+#
+# Layout cache:
+#   <cache_dir>/thumbs/src/<sha1(url)>.<ext>   file asli (dipakai ulang per URL)
+#   <cache_dir>/thumbs/cover/<sha256>.<ext>    siap embed (jpg/png), per hash isi
+
+PP_KEY = "OmdlThumbnail"
+_INFO_KEY = "__omdl_thumbnail"  # key privat: tidak ikut ditulis ke info.json
+EMBED_EXTS = ("jpg", "png")
+
+_POOLS: Dict[int, ThreadPoolExecutor] = {}  # per jumlah worker (bisa beda per cfg)
+_POOL_LOCK = threading.Lock()
+
+
+class Thumb:
+    """Thumbnail yang sudah di-cache: file asli + versi siap embed."""
+
+    def __init__(self, url: str, source: str, cover: str, digest: str) -> None:
+        self.url = url
+        self.source = source
+        self.cover = cover
+        self.digest = digest  # sha256 isi file cover
+
+    @property
+    def source_ext(self) -> str:
+        return os.path.splitext(self.source)[1][1:]
+
+
+def _pool(workers: int) -> ThreadPoolExecutor:
+    workers = max(1, workers)
+    with _POOL_LOCK:
+        pool = _POOLS.get(workers)
+        if pool is None:
+            pool = _POOLS[workers] = ThreadPoolExecutor(max_workers=workers,
+                                                         thread_name_prefix=f"omdl-thumb{workers}")
+        return pool
+
+
+def _sniff_ext(head: bytes) -> Optional[str]:
+    """Ekstensi dari magic bytes (server sering mengirim webp dengan nama .jpg)."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[4:12] in (b"ftypavif", b"ftypavis"):
+        return "avif"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    return None
+
+
+def _candidates(info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Thumbnail terbaik lebih dulu (yt-dlp mengurutkan terbaik di akhir list)."""
+    thumbs = [t for t in info.get("thumbnails") or [] if t.get("url")]
+    if not thumbs and info.get("thumbnail"):
+        thumbs = [{"url": info["thumbnail"]}]
+    return list(reversed(thumbs))[:3]
+
+
+def _fetch(cache_dir: str, thumb: Dict[str, Any], timeout: float) -> str:
+    url = thumb["url"]
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    src_dir = os.path.join(cache_dir, "thumbs", "src")
+    for ext in ("jpg", "png", "webp", "avif", "gif", "img"):
+        path = os.path.join(src_dir, f"{key}.{ext}")
+        if os.path.exists(path):
+            return path
+    headers = dict(std_headers)
+    headers.update(thumb.get("http_headers") or {})
+    with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as resp:
+        data = resp.read()
+    os.makedirs(src_dir, exist_ok=True)
+    path = os.path.join(src_dir, f"{key}.{_sniff_ext(data[:16]) or 'img'}")
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+def _convert(src: str, dst: str) -> None:
+    """Satu jalur konversi → JPEG (Pillow bila ada, selain itu ffmpeg)."""
+    tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp.jpg"
+    if Image is not None:
+        with Image.open(src) as im:
+            im.convert("RGB").save(tmp, "JPEG", quality=92)
+    else:
+        subprocess.run(
+            ["ffmpeg", "-v", "error", "-y", "-i", src, "-frames:v", "1", "-q:v", "2", tmp],
+            check=True, stdin=subprocess.DEVNULL, capture_output=True,
+        )
+    os.replace(tmp, dst)
+
+
+def _prepare(cache_dir: str, info: Dict[str, Any], timeout: float) -> Optional[Thumb]:
+    """Unduh (atau ambil dari cache) + konversi; dijalankan di pool."""
+    for cand in _candidates(info):
+        try:
+            src = _fetch(cache_dir, cand, timeout)
+        except (OSError, ValueError):
+            continue  # coba kandidat berikutnya, seperti yt-dlp
+        with open(src, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        ext = os.path.splitext(src)[1][1:]
+        if ext in EMBED_EXTS:
+            return Thumb(cand["url"], src, src, digest)
+        cover_dir = os.path.join(cache_dir, "thumbs", "cover")
+        cover = os.path.join(cover_dir, f"{digest}.jpg")
+        if not os.path.exists(cover):
+            os.makedirs(cover_dir, exist_ok=True)
+            try:
+                _convert(src, cover)
+            except (OSError, subprocess.CalledProcessError):
+                continue
+        with open(cover, "rb") as f:
+            cover_digest = hashlib.sha256(f.read()).hexdigest()
+        return Thumb(cand["url"], src, cover, cover_digest)
+    return None
+
+
+def prefetch(info: Dict[str, Any], cache_dir: str, workers: int = 4, timeout: float = 30.0) -> "Future[Optional[Thumb]]":
+    return _pool(workers).submit(_prepare, cache_dir, info, timeout)
+
+
+def cache_key(cfg: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Bagian cfg yang memengaruhi hasil take_over (untuk key cache profil)."""
+    return (bool(cfg.get("thumbnail_pipeline", True)), cfg.get("cache_dir", "cache"),
+            cfg.get("thumbnail_workers", 4), cfg.get("thumbnail_timeout", 30))
+
+
+def wanted(postprocessors) -> Optional[Dict[str, Any]]:
+    """Definisi PP thumbnail di profil (None bila profil tidak memakai thumbnail)."""
+    for pp in postprocessors:
+        if pp.get("key") == PP_KEY:
+            return dict(pp)
+    return None
+
+
+def attach(info: Dict[str, Any], postprocessors) -> None:
+    """
+    Mulai unduh thumbnail tiap entry di latar belakang (dipanggil setelah ekstraksi,
+    sebelum process_ie_result). Hasilnya diambil OmdlThumbnailPP setelah media selesai.
+    """
+    spec = wanted(postprocessors)
+    if spec is None:
+        return
+    if info.get("entries") is not None:
+        for entry in info["entries"] or []:
+            if entry:
+                attach(entry, postprocessors)
+        return
+    info[_INFO_KEY] = prefetch(info, spec.get("cache_dir") or "cache",
+                               int(spec.get("workers") or 4), float(spec.get("timeout") or 30))
+
+
+def take_over(pp_defs: List[Dict[str, Any]], opts: Dict[str, Any], cfg: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Ganti EmbedThumbnail / writethumbnail bawaan dengan OmdlThumbnailPP (dipanggil
+    saat kompilasi profil). `opts` diubah di tempat: writethumbnail dimatikan agar
+    yt-dlp tidak mengunduh thumbnail secara serial sebelum media.
+    """
+    embed = any(p.get("key") == "EmbedThumbnail" for p in pp_defs)
+    write = bool(opts.get("writethumbnail")) and not opts.get("write_all_thumbnails")
+    if not (embed or write):
+        return pp_defs
+    opts["writethumbnail"] = False
+    out = [p for p in pp_defs if p.get("key") != "EmbedThumbnail"]
+    out.append({
+        "key": PP_KEY,
+        "embed": embed,
+        "write": write,
+        "cache_dir": cfg.get("cache_dir", "cache"),
+        "workers": int(cfg.get("thumbnail_workers", 4) or 4),
+        "timeout": float(cfg.get("thumbnail_timeout", 30) or 30),
+    })
+    return out
+
+
+class OmdlThumbnailPP(PostProcessor):
+    """Tulis/embed thumbnail dari cache; embed dilewati bila cover identik sudah ada."""
+
+    def __init__(self, downloader=None, embed: bool = False, write: bool = False,
+                 cache_dir: str = "cache", workers: int = 4, timeout: float = 30) -> None:
+        super().__init__(downloader)
+        self._embed = embed
+        self._write = write
+        self._cache_dir = cache_dir
+        self._workers = workers
+        self._timeout = timeout
+
+    def _existing_cover(self, embedder: EmbedThumbnailPP, path: str) -> Optional[str]:
+        """
+        sha256 cover yang sudah ter-embed, None bila tidak ada: stream video
+        attached_pic (mp4/m4a/mp3/…) atau attachment image/* (mkv/mka).
+        """
+        try:
+            probe = subprocess.run(
+                [embedder.probe_executable, "-v", "error",
+                 "-show_entries", "stream=index,codec_type:stream_disposition=attached_pic"
+                 ":stream_tags=mimetype", "-of", "json", path],
+                capture_output=True, text=True, stdin=subprocess.DEVNULL, check=True,
+            )
+            streams = json.loads(probe.stdout or "{}").get("streams") or []
+            for st in streams:
+                if st.get("codec_type") == "video" and (st.get("disposition") or {}).get("attached_pic"):
+                    out = subprocess.run(
+                        [embedder.executable, "-v", "error", "-i", path, "-map", f"0:{st['index']}",
+                         "-c", "copy", "-f", "image2pipe", "-"],
+                        capture_output=True, stdin=subprocess.DEVNULL, check=True,
+                    )
+                    return hashlib.sha256(out.stdout).hexdigest() if out.stdout else None
+                mime = str((st.get("tags") or {}).get("mimetype") or "")
+                if st.get("codec_type") == "attachment" and mime.startswith("image/"):
+                    return self._attachment_digest(embedder, path, st["index"])
+        except (OSError, subprocess.CalledProcessError, TypeError, ValueError, KeyError):
+            return None
+        return None
+
+    @staticmethod
+    def _attachment_digest(embedder: EmbedThumbnailPP, path: str, index: int) -> Optional[str]:
+        """sha256 isi attachment Matroska (diekstrak lewat -dump_attachment)."""
+        with tempfile.TemporaryDirectory(prefix="omdl-cover-") as tmp:
+            dst = os.path.join(tmp, "cover")
+            subprocess.run(
+                [embedder.executable, "-v", "error", "-y", f"-dump_attachment:{index}", dst,
+                 "-i", path, "-t", "0", "-f", "null", "-"],
+                capture_output=True, stdin=subprocess.DEVNULL, check=False,
+            )
+            if not os.path.exists(dst):
+                return None
+            with open(dst, "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest()
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+        fut = info.pop(_INFO_KEY, None)
+        try:
+            thumb = fut.result(self._timeout) if fut is not None else \
+                _prepare(self._cache_dir, info, self._timeout)
+        except Exception as e:
+            self.report_warning(f"Thumbnail gagal disiapkan: {e}")
+            thumb = None
+        if thumb is None:
+            self.to_screen("Thumbnail tidak tersedia, dilewati")
+            return [], info
+
+        files_to_delete: List[str] = []
+        base = os.path.splitext(info["filepath"])[0]
+        if self._write:
+            dst = f"{base}.{thumb.source_ext}"
+            if not os.path.exists(dst):
+                shutil.copyfile(thumb.source, dst)
+                self.to_screen(f"Writing thumbnail to: {dst}")
+        if self._embed:
+            embedder = EmbedThumbnailPP(self._downloader, already_have_thumbnail=False)
+            # file yang sudah ada sebelumnya (unduhan dilewati) mungkin sudah ber-cover
+            if not info.get("__real_download") and self._existing_cover(embedder, info["filepath"]) == thumb.digest:
+                self.to_screen("Cover identik sudah ada, embed dilewati")
+                return files_to_delete, info
+            tmp = f"{base}.cover{os.path.splitext(thumb.cover)[1]}"
+            shutil.copyfile(thumb.cover, tmp)  # EmbedThumbnail menghapus file sumbernya
+            info["thumbnails"] = list(info.get("thumbnails") or []) + [{"url": thumb.url, "filepath": tmp}]
+            try:
+                deleted, info = embedder.run(info)
+            except Exception:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            files_to_delete.extend(deleted)
+        return files_to_delete, info
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from rich.table import Table
+from rich import box
+
+# Urutan tahap yang dilaporkan (selain "total")
+STAGES = ("extract", "wait", "transfer", "merge", "transcode", "postprocess")
+
+# Nama postprocessor yt-dlp (pp_key) -> tahap
+_PP_STAGE = {
+    "Merger": "merge",
+    "ExtractAudio": "transcode",
+    "VideoConvertor": "transcode",
+    "VideoRemuxer": "transcode",
+}
+
+
+def _pp_stage(pp_name: str) -> str:
+    return _PP_STAGE.get(pp_name, "postprocess")
+
+
+class StageTimer:
+    """
+    Catat durasi tiap tahap satu unduhan memakai jam monotonic.
+
+    Diberi makan dari tiga sumber yang sudah dipasang run_download:
+    - pesan logger yt-dlp  (on_log)
+    - progress_hooks       (on_progress)
+    - postprocessor_hooks  (on_postprocess)
+    """
+
+    def __init__(self, provider: str, url: str) -> None:
+        self.provider = provider
+        self.url = url
+        self.started_at = time.time()
+        self._t0 = time.monotonic()
+        self._open: Dict[str, float] = {}
+        self.stages: Dict[str, float] = {s: 0.0 for s in STAGES}
+        self.bytes = 0
+        self.peak_speed = 0.0
+        self.cached = False
+        # bytes per file (video & audio diunduh terpisah lalu di-merge)
+        self._file_bytes: Dict[str, int] = {}
+        self._first_byte = False
+        self._transfer_start: Optional[float] = None
+        self._transfer_end: Optional[float] = None
+
+    # ----- primitif -----
+    def begin(self, stage: str) -> None:
+        self._open.setdefault(stage, time.monotonic())
+
+    def end(self, stage: str) -> None:
+        t = self._open.pop(stage, None)
+        if t is not None:
+            self.stages[stage] = self.stages.get(stage, 0.0) + (time.monotonic() - t)
+
+    # ----- sumber event -----
+    def on_log(self, msg: str) -> None:
+        if "[download] Destination:" in msg:
+            # file baru dimulai; jika belum ada byte masuk, kita sedang menunggu
+            if not self._first_byte:
+                self.begin("wait")
+        elif "has already been downloaded" in msg:
+            self.cached = True
+        elif msg.startswith("[Merger]"):
+            self.begin("merge")
+        elif msg.startswith("[ExtractAudio]"):
+            self.begin("transcode")
+
+    def on_progress(self, d: Dict[str, Any]) -> None:
+        status = d.get("status")
+        filename = str(d.get("filename") or "")
+        if status == "downloading":
+            now = time.monotonic()
+            downloaded = int(d.get("downloaded_bytes") or 0)
+            if downloaded and not self._first_byte:
+                self._first_byte = True
+                self.end("wait")
+                self._transfer_start = now
+            self._file_bytes[filename] = downloaded
+            speed = d.get("speed") or 0.0
+            if speed > self.peak_speed:
+                self.peak_speed = float(speed)
+        elif status == "finished":
+            total = d.get("total_bytes") or d.get("downloaded_bytes")
+            if total:
+                self._file_bytes[filename] = int(total)
+            self._transfer_end = time.monotonic()
+            self.end("wait")
+        self.bytes = sum(self._file_bytes.values())
+
+    def on_postprocess(self, d: Dict[str, Any]) -> None:
+        stage = _pp_stage(str(d.get("postprocessor") or ""))
+        if d.get("status") == "started":
+            self.begin(stage)
+        elif d.get("status") == "finished":
+            self.end(stage)
+
+    # ----- hasil -----
+    def finish(self, ok: bool = True, error: Optional[str] = None) -> Dict[str, Any]:
+        for stage in list(self._open):
+            self.end(stage)
+        if self._transfer_start is not None:
+            end = self._transfer_end or time.monotonic()
+            self.stages["transfer"] = max(0.0, end - self._transfer_start)
+        total = time.monotonic() - self._t0
+        transfer = self.stages["transfer"]
+        return {
+            "provider": self.provider,
+            "url": self.url,
+            "started_at": self.started_at,
+            "ok": ok,
+            "error": error,
+            "cached": self.cached,
+            "bytes": self.bytes,
+            "avg_speed": (self.bytes / transfer) if transfer > 0 else 0.0,
+            "peak_speed": self.peak_speed,
+            "stages": {k: round(v, 4) for k, v in self.stages.items()},
+            "total": round(total, 4),
+        }
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Persentil dengan interpolasi linear (pct 0..100)."""
+    if not values:
+        return 0.0
+    data = sorted(values)
+    if len(data) == 1:
+        return data[0]
+    k = (len(data) - 1) * (pct / 100.0)
+    lo = math.floor(k)
+    hi = math.ceil(k)
+    if lo == hi:
+        return data[lo]
+    return data[lo] + (data[hi] - data[lo]) * (k - lo)
+
+
+def format_bytes(n: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n) < 1024:
+            return f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}TiB"
+
+
+class BatchReport:
+    """Kumpulkan record StageTimer dari satu batch lalu ringkas p50/p95."""
+
+    def __init__(self) -> None:
+        self.records: List[Dict[str, Any]] = []
+
+    def add(self, record: Optional[Dict[str, Any]]) -> None:
+        if record:
+            self.records.append(record)
+
+    def _stage_stats(self, records: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+        out: Dict[str, Dict[str, float]] = {}
+        for stage in STAGES + ("total",):
+            vals = [
+                (r["total"] if stage == "total" else r["stages"].get(stage, 0.0))
+                for r in records
+            ]
+            out[stage] = {
+                "p50": round(percentile(vals, 50), 4),
+                "p95": round(percentile(vals, 95), 4),
+            }
+        return out
+
+    def summary(self) -> Dict[str, Any]:
+        providers = sorted({r["provider"] for r in self.records})
+        per_provider: Dict[str, Any] = {}
+        for prov in providers:
+            recs = [r for r in self.records if r["provider"] == prov]
+            per_provider[prov] = {
+                "count": len(recs),
+                "failed": sum(1 for r in recs if not r["ok"]),
+                "bytes": sum(r["bytes"] for r in recs),
+                "stages": self._stage_stats(recs),
+            }
+        return {
+            "count": len(self.records),
+            "failed": sum(1 for r in self.records if not r["ok"]),
+            "bytes": sum(r["bytes"] for r in self.records),
+            "stages": self._stage_stats(self.records),
+            "providers": per_provider,
+        }
+
+    def table(self) -> Table:
+        summ = self.summary()
+        t = Table(title="Ringkasan Waktu Batch (p50 / p95, detik)", header_style="bold cyan", box=box.ROUNDED)
+        t.add_column("Provider", style="white")
+        t.add_column("N", justify="right")
+        t.add_column("Data", justify="right")
+        for stage in STAGES + ("total",):
+            t.add_column(stage, justify="right")
+
+        def _row(label: str, block: Dict[str, Any]) -> None:
+            cells = [f"{block['stages'][s]['p50']:.1f} / {block['stages'][s]['p95']:.1f}" for s in STAGES + ("total",)]
+            t.add_row(label, str(block["count"]), format_bytes(block["bytes"]), *cells)
+
+        for prov, block in summ["providers"].items():
+            _row(prov, block)
+        if len(summ["providers"]) > 1:
+            _row("[bold]semua[/bold]", summ)
+        return t
+
+    def write_json(self, log_dir: str) -> str:
+        """Tulis laporan ke <log_dir>/batch-report-<waktu>.json, kembalikan path-nya."""
+        os.makedirs(log_dir, exist_ok=True)
+        name = datetime.now().strftime("batch-report-%Y%m%d-%H%M%S.json")
+        path = os.path.join(log_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"summary": self.summary(), "runs": self.records}, f, indent=2)
+        return path
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import shutil
+import struct
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import batch
+from .downloader import SessionPool
+
+# Mode daemon: ikuti file batch (URL yang baru ditambahkan di akhir) dan/atau
+# folder drop (file .txt/.yaml/.csv/.jsonl baru). Satu proses tetap hidup dengan
+# DownloadSession (YoutubeDL) hangat per profil, jadi tidak ada cold start per batch.
+
+# Konstanta inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+DROP_EXTS = (".txt", ".yaml", ".yml", ".csv", ".jsonl", ".ndjson")
+
+
+class Inotify:
+    """Pembungkus ctypes minimal untuk inotify; dipakai hanya sebagai pemicu "cek sekarang"."""
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._libc = libc
+        fd = libc.inotify_init1(IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.fd = fd
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def wait(self, timeout: float) -> List[Tuple[int, int, str]]:
+        """Tunggu event hingga `timeout` detik; kembalikan [(wd, mask, name)]."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        buf = os.read(self.fd, 64 * 1024)
+        events: List[Tuple[int, int, str]] = []
+        pos = 0
+        while pos + _EVENT.size <= len(buf):
+            wd, mask, _cookie, length = _EVENT.unpack_from(buf, pos)
+            pos += _EVENT.size
+            name = buf[pos:pos + length].rstrip(b"\0").decode("utf-8", "replace")
+            pos += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def _open_inotify() -> Optional[Inotify]:
+    try:
+        return Inotify()
+    except (OSError, AttributeError):
+        # bukan Linux / libc tanpa inotify / batas watch habis → polling
+        return None
+
+
+class SeenSet:
+    """Kunci entry yang sudah diantrekan, dibatasi `limit` (LRU) agar daemon tidak membengkak."""
+
+    def __init__(self, limit: int = 100_000) -> None:
+        self.limit = max(1, limit)
+        self._keys: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: str) -> None:
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.limit:
+            self._keys.popitem(last=False)
+
+
+class FileFollower:
+    """
+    Ikuti satu file batch. Hanya baris lengkap (diakhiri newline) yang dibaca;
+    file yang diganti editor (inode baru) atau dipotong dibaca ulang dari awal,
+    URL yang sudah pernah dilihat tidak diantrekan lagi.
+    Di file YAML item terakhir ditahan sampai diikuti item/kunci baru atau file
+    berhenti tumbuh, supaya baris lanjutan (`  profile: ...`) tidak terpotong.
+    """
+
+    def __init__(self, path: str, seen: SeenSet, from_start: bool = False) -> None:
+        self.path = path
+        self.seen = seen
+        self.offset = 0
+        self.inode: Optional[int] = None
+        self.profile: Optional[str] = None
+        self.is_yaml = batch.detect_format(path) == "yaml"
+        self._held_size: Optional[int] = None  # ukuran file saat item terakhir ditahan
+        if not from_start and os.path.exists(path):
+            # isi yang sudah ada dianggap lama: catat URL-nya lalu mulai dari akhir
+            self._reload_header()
+            for entry in batch.iter_entries(path, default_profile=self.profile):
+                seen.add(batch.entry_key(entry))
+            st = os.stat(path)
+            self.offset, self.inode = st.st_size, st.st_ino
+
+    def _reload_header(self) -> None:
+        self.profile = batch.read_header(self.path).get("profile")
+
+    def _complete_end(self, size: int) -> int:
+        """Offset setelah newline terakhir (baris yang masih ditulis tidak dibaca)."""
+        with open(self.path, "rb") as f:
+            pos = size
+            while pos > self.offset:
+                step = min(4096, pos - self.offset)
+                f.seek(pos - step)
+                chunk = f.read(step)
+                nl = chunk.rfind(b"\n")
+                if nl >= 0:
+                    return pos - step + nl + 1
+                pos -= step
+        return self.offset
+
+    def poll(self) -> List[Dict[str, Any]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return []
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self.inode, self.offset = st.st_ino, 0
+            self._reload_header()
+        if st.st_size == self.offset:
+            return []
+        stop = self._complete_end(st.st_size)
+        if stop <= self.offset:
+            return []
+        entries = list(batch.iter_entries(self.path, self.offset, default_profile=self.profile,
+                                          stop=stop))
+        new_offset = stop
+        if self.is_yaml and entries and entries[-1]["offset"] >= stop:
+            # item terakhir belum ditutup item/kunci berikutnya: mungkin masih ada
+            # baris lanjutan. Tahan (baca ulang dari awal item) kecuali file tidak
+            # berubah sejak poll sebelumnya (= EOF).
+            if self._held_size != st.st_size:
+                self._held_size = st.st_size
+                entries.pop()
+                new_offset = entries[-1]["offset"] if entries else self.offset
+            else:
+                self._held_size = None
+        else:
+            self._held_size = None
+        fresh: List[Dict[str, Any]] = []
+        for entry in entries:
+            key = batch.entry_key(entry)
+            if key not in self.seen:
+                self.seen.add(key)
+                fresh.append(entry)
+        self.offset = new_offset
+        return fresh
+
+    @property
+    def pending(self) -> bool:
+        return self._held_size is not None
+
+
+class DropFolder:
+    """
+    Folder drop: tiap file batch baru dibaca utuh lalu dipindah ke <dir>/done/.
+    File dianggap selesai ditulis bila ukurannya tidak berubah sejak poll sebelumnya.
+    """
+
+    def __init__(self, path: str, seen: SeenSet) -> None:
+        self.path = path
+        self.done_dir = os.path.join(path, "done")
+        self.seen = seen
+        self._sizes: Dict[str, int] = {}
+        os.makedirs(self.done_dir, exist_ok=True)
+
+    def poll(self) -> List[Dict[str, Any]]:
+        fresh: List[Dict[str, Any]] = []
+        try:
+            names = sorted(e.name for e in os.scandir(self.path)
+                           if e.is_file() and not e.name.startswith(".")
+                           and e.name.lower().endswith(DROP_EXTS))
+        except OSError:
+            return []
+        for name in names:
+            full = os.path.join(self.path, name)
+            try:
+                size = os.path.getsize(full)
+            except OSError:
+                continue
+            if self._sizes.get(name) != size:
+                self._sizes[name] = size  # tunggu satu poll lagi sampai stabil
+                continue
+            self._sizes.pop(name, None)
+            profile = batch.read_header(full).get("profile")
+            for entry in batch.iter_entries(full, default_profile=profile):
+                key = batch.entry_key(entry)
+                if key not in self.seen:
+                    self.seen.add(key)
+                    fresh.append(entry)
+            try:
+                shutil.move(full, os.path.join(self.done_dir, name))
+            except OSError:
+                pass
+        return fresh
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._sizes)
+
+
+def run(
+    cfg: Dict[str, Any],
+    file_path: Optional[str],
+    drop_dir: Optional[str],
+    mode: str,
+    quality: str,
+    on_batch: Callable[[List[batch.Group], SessionPool], None],
+    from_start: bool = False,
+    poll_interval: Optional[float] = None,
+    notice: Optional[Callable[[str], None]] = None,
+) -> None:
+    """
+    Loop daemon: tunggu event inotify (atau timeout polling), kumpulkan URL baru,
+    rencanakan grupnya (batch.plan) lalu serahkan ke `on_batch` untuk diunduh.
+    `notice` menerima pesan status (cara memantau, item yang dilewati).
+    Berhenti dengan KeyboardInterrupt; session ditutup saat keluar.
+    """
+    seen = SeenSet(int(cfg.get("watch_seen_max", 100_000) or 100_000))
+    sources: List[Any] = []
+    if file_path:
+        sources.append(FileFollower(file_path, seen, from_start=from_start))
+    if drop_dir:
+        sources.append(DropFolder(drop_dir, seen))
+    interval = float(poll_interval or cfg.get("watch_poll_interval", 2.0) or 2.0)
+    q_use = batch.normalize_quality(mode, quality)
+    pool = SessionPool(int(cfg.get("watch_sessions", 4) or 4))
+
+    notify = _open_inotify()
+    if notify is not None:
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        dirs = set()
+        if file_path:
+            # direktori induk ikut diawasi: editor biasanya menulis file baru lalu rename
+            dirs.add(os.path.dirname(os.path.abspath(file_path)))
+        if drop_dir:
+            dirs.add(os.path.abspath(drop_dir))
+        try:
+            for d in dirs:
+                notify.add_watch(d, mask)
+        except OSError:
+            notify.close()
+            notify = None
+    if notice is not None:
+        notice("inotify" if notify is not None else f"polling {interval:g}s")
+
+    try:
+        while True:
+            fresh: List[Dict[str, Any]] = []
+            for src in sources:
+                fresh.extend(src.poll())
+            if fresh:
+                groups, skipped = batch.plan(fresh, cfg, mode, q_use)
+                if notice is not None:
+                    for entry, reason in skipped:
+                        notice(f"Lewati {entry['url']}: {reason}")
+                on_batch(groups, pool)
+                continue  # cek lagi segera: mungkin ada tambahan saat mengunduh
+            # folder drop / item YAML yang ditahan menunggu ukuran stabil → jangan tidur terlalu lama
+            pending = any(s.pending for s in sources)
+            timeout = min(interval, 1.0) if pending else interval
+            if notify is not None:
+                notify.wait(timeout if pending else max(interval, 30.0))
+            else:
+                time.sleep(timeout)
+    finally:
+        pool.close()
+        if notify is not None:
+            notify.close()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from omdl import batch
+
+YAML = """\
+mode: audio
+quality: best
+urls:
+  - https://a.example/1   # komentar
+  - url: https://a.example/2
+    quality: "720"
+    section: "10-20"
+
+  # baris komentar di tengah daftar
+  -
+    url: https://a.example/3
+    priority: 5
+  - >-
+    https://a.example/4
+after: 1
+"""
+
+FLOW = ("profile: musik\n"
+        "urls: [https://b.example/1, {url: https://b.example/2, mode: video},"
+        " https://b.example/3]\n")
+
+CSV_HEADER = ("URL,mode,quality,catatan\nhttps://c.example/1,audio,,abaikan\n\n"
+              "# komentar\nhttps://c.example/2,,1080,\n")
+
+CSV_PLAIN = "https://c.example/1,apa saja\nhttps://c.example/2\nhttps://c.example/3\n"
+
+
+def _write(tmp_path, name: str, text: str) -> str:
+    path = tmp_path / name
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def _urls(entries) -> list:
+    return [e["url"] for e in entries]
+
+
+def test_yaml_block_list_with_continuation_lines(tmp_path):
+    path = _write(tmp_path, "b.yaml", YAML)
+    entries = list(batch.iter_entries(path))
+    assert _urls(entries) == [f"https://a.example/{i}" for i in (1, 2, 3, 4)]
+    assert entries[1]["quality"] == "720" and entries[1]["section"] == "10-20"
+    assert entries[2]["priority"] == 5
+    assert batch.read_header(path) == {"mode": "audio", "quality": "best"}
+
+
+def test_yaml_flow_list(tmp_path):
+    path = _write(tmp_path, "b.yml", FLOW)
+    entries = list(batch.iter_entries(path, default_profile="musik"))
+    assert _urls(entries) == [f"https://b.example/{i}" for i in (1, 2, 3)]
+    assert entries[1]["mode"] == "video"
+    assert {e["profile"] for e in entries} == {"musik"}
+
+
+def test_csv_with_header(tmp_path):
+    path = _write(tmp_path, "b.csv", CSV_HEADER)
+    entries = list(batch.iter_entries(path))
+    assert _urls(entries) == ["https://c.example/1", "https://c.example/2"]
+    assert entries[0]["mode"] == "audio" and entries[0]["quality"] is None
+    assert entries[1]["quality"] == "1080"
+
+
+def test_csv_without_header_uses_first_column(tmp_path):
+    path = _write(tmp_path, "b.csv", CSV_PLAIN)
+    assert _urls(batch.iter_entries(path)) == [f"https://c.example/{i}" for i in (1, 2, 3)]
+
+
+@pytest.mark.parametrize("name, text", [
+    ("b.yaml", YAML), ("b.yml", FLOW), ("b.csv", CSV_HEADER), ("b.csv", CSV_PLAIN),
+    ("b.txt", "x.example/1\n#\nx.example/2\n"),
+], ids=["yaml", "yaml-flow", "csv-header", "csv", "text"])
+def test_resume_from_each_offset_has_no_loss_or_duplication(tmp_path, name, text):
+    path = _write(tmp_path, name, text)
+    entries = list(batch.iter_entries(path))
+    assert entries
+    for i, entry in enumerate(entries):
+        rest = list(batch.iter_entries(path, start=entry["offset"]))
+        assert _urls(rest) == _urls(entries[i + 1:])
+
+
+def test_stop_excludes_partial_last_line(tmp_path):
+    path = _write(tmp_path, "b.txt", "https://x.example/1\nhttps://x.example/2")
+    stop = len("https://x.example/1\n")
+    assert _urls(batch.iter_entries(path, stop=stop)) == ["https://x.example/1"]
+
+
+def test_checkpoint_roundtrip_and_clear(tmp_path):
+    cfg = {"cache_dir": str(tmp_path / "cache")}
+    path = _write(tmp_path, "b.txt", "https://x.example/1\nhttps://x.example/2\n")
+    assert batch.load_checkpoint(cfg, path) == 0
+    batch.save_checkpoint(cfg, path, 20)
+    assert batch.load_checkpoint(cfg, path) == 20
+    batch.clear_checkpoint(cfg, path)
+    assert batch.load_checkpoint(cfg, path) == 0
+
+
+def test_checkpoint_invalid_after_truncation(tmp_path):
+    cfg = {"cache_dir": str(tmp_path / "cache")}
+    path = _write(tmp_path, "b.txt", "https://x.example/1\nhttps://x.example/2\n")
+    batch.save_checkpoint(cfg, path, 40)
+    with open(path, "r+b") as f:
+        f.truncate(20)
+    assert batch.load_checkpoint(cfg, path) == 0
+
+
+def test_checkpoint_invalid_after_file_replaced(tmp_path):
+    cfg = {"cache_dir": str(tmp_path / "cache")}
+    path = _write(tmp_path, "b.txt", "https://x.example/1\nhttps://x.example/2\n")
+    batch.save_checkpoint(cfg, path, 20)
+    new = _write(tmp_path, "baru.txt", "https://y.example/1\nhttps://y.example/2\n")
+    os.replace(new, path)  # file baru selagi yang lama masih ada → inode pasti beda
+    assert batch.load_checkpoint(cfg, path) == 0
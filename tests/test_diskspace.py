@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import os
+from collections import namedtuple
+
+import pytest
+
+from omdl import diskspace
+from omdl.diskspace import MB
+
+_Usage = namedtuple("_Usage", "total used free")
+
+
+@pytest.fixture
+def free(monkeypatch):
+    """Sisa ruang palsu (byte) untuk semua path; ubah lewat free[0]."""
+    box = [1000 * MB]
+    monkeypatch.setattr(diskspace.shutil, "disk_usage", lambda _p: _Usage(0, 0, box[0]))
+    monkeypatch.setattr(diskspace, "_LEDGER", diskspace.SpaceLedger())
+    return box
+
+
+def test_ledger_reserves_until_min_free_then_releases(tmp_path, free):
+    ledger = diskspace.SpaceLedger()
+    dev = ledger.try_reserve(str(tmp_path), 400 * MB, 100 * MB)
+    assert dev == os.stat(tmp_path).st_dev
+    assert ledger.try_reserve(str(tmp_path), 400 * MB, 100 * MB) == dev
+    assert ledger.reserved(dev) == 800 * MB
+    # sisa 200 MB - 150 MB < 100 MB minimum
+    assert ledger.try_reserve(str(tmp_path), 150 * MB, 100 * MB) is None
+    ledger.release(dev, 400 * MB)
+    assert ledger.try_reserve(str(tmp_path), 150 * MB, 100 * MB) == dev
+    ledger.release(dev, 550 * MB)
+    assert ledger.reserved(dev) == 0
+
+
+def test_admit_unknown_size_reserves_nominal_amount(tmp_path, free):
+    cfg = {"disk_min_free_mb": 100, "disk_unknown_size_mb": 350, "disk_wait_timeout": 0}
+    dev = os.stat(tmp_path).st_dev
+    with diskspace.admit(str(tmp_path / "a.mp4"), 0, cfg) as need:
+        assert need == 350 * MB
+        assert diskspace._LEDGER.reserved(dev) == 350 * MB
+        with diskspace.admit(str(tmp_path / "b.mp4"), 0, cfg):
+            assert diskspace._LEDGER.reserved(dev) == 700 * MB
+            # 1000 - 700 - 350 < 100: unduhan ketiga berukuran tak dikenal ditolak
+            with pytest.raises(diskspace.DiskSpaceError):
+                with diskspace.admit(str(tmp_path / "c.mp4"), 0, cfg):
+                    pass
+    assert diskspace._LEDGER.reserved(dev) == 0
+
+
+def test_admit_fails_after_timeout_when_disk_is_full(tmp_path, free):
+    free[0] = 50 * MB
+    cfg = {"disk_min_free_mb": 100, "disk_wait_timeout": 0}
+    with pytest.raises(diskspace.DiskSpaceError) as exc:
+        with diskspace.admit(str(tmp_path / "sub" / "a.mp4"), 10 * MB, cfg):
+            pass
+    assert exc.value.need == 110 * MB and exc.value.free == 50 * MB
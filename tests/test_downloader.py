@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import pytest
+
+from omdl.downloader import _final_name
+
+
+@pytest.mark.parametrize("codec, name", [
+    ("mp3", "a.mp3"), ("aac", "a.m4a"), ("m4a", "a.m4a"), ("vorbis", "a.ogg"),
+    ("ogg", "a.ogg"), ("opus", "a.opus"), ("best", "a.webm"), (None, "a.webm"),
+])
+def test_final_name_uses_extracted_audio_extension(codec, name):
+    assert _final_name("a.webm", "audio", codec) == name
+
+
+def test_final_name_keeps_video_extension():
+    assert _final_name("a.webm", "video", "aac") == "a.webm"
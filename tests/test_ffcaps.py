@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import os
+import stat
+
+import pytest
+
+from omdl import ffcaps
+
+_SCRIPT = """#!/bin/sh
+case "$2" in
+  -version) echo "ffmpeg version {version} Copyright";;
+  -encoders) echo " A..... libmp3lame           MP3"; echo " AF.... aac                  AAC";;
+  -muxers) echo "  E mp3             MP3"; echo "  E ipod            iPod";;
+esac
+"""
+
+
+def _ffmpeg(directory, version: str) -> str:
+    directory.mkdir()
+    path = directory / "ffmpeg"
+    path.write_text(_SCRIPT.format(version=version))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(directory)
+
+
+@pytest.fixture(autouse=True)
+def _fresh(monkeypatch):
+    monkeypatch.setattr(ffcaps, "_LAST", {})
+    monkeypatch.setattr(ffcaps, "_MEMO", {})
+
+
+def test_probe_parses_fake_binary(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", _ffmpeg(tmp_path / "a", "6.1"))
+    caps = ffcaps.probe({"cache_dir": str(tmp_path / "cache")})
+    assert caps.version == "6.1"
+    assert caps.has_encoder("libmp3lame") and caps.threaded("aac")
+    assert {"mp3", "ipod"} <= caps.muxers
+    assert os.path.isfile(tmp_path / "cache" / "ffmpeg-caps.json")
+
+
+def test_memo_follows_binary_on_path(tmp_path, monkeypatch):
+    first, second = _ffmpeg(tmp_path / "a", "6.1"), _ffmpeg(tmp_path / "b", "7.0")
+    cfg = {"cache_dir": str(tmp_path / "cache")}
+    monkeypatch.setenv("PATH", first)
+    assert ffcaps.probe(cfg).version == "6.1"
+    monkeypatch.setenv("PATH", second)
+    assert ffcaps.probe(cfg).version == "7.0"
+    monkeypatch.setenv("PATH", str(tmp_path / "kosong"))
+    assert ffcaps.probe(cfg) is None
+
+
+def test_memo_is_per_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", _ffmpeg(tmp_path / "a", "6.1"))
+    ffcaps.probe({"cache_dir": str(tmp_path / "c1")})
+    monkeypatch.setattr(ffcaps, "_MEMO", {})
+    ffcaps.probe({"cache_dir": str(tmp_path / "c2")})
+    assert os.path.isfile(tmp_path / "c2" / "ffmpeg-caps.json")
+
+
+@pytest.mark.parametrize("codec, ext", [("aac", "m4a"), ("ogg", "ogg"), ("vorbis", "ogg"),
+                                        ("mp3", "mp3"), ("best", None), (None, None)])
+def test_audio_ext(codec, ext):
+    assert ffcaps.audio_ext(codec) == ext
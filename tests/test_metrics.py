@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+
+from omdl import metrics
+
+
+@pytest.fixture
+def endpoint():
+    host, port = metrics.enable("127.0.0.1", 0)
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        metrics.disable()
+
+
+def _scrape(base: str, path: str = "/metrics") -> tuple[str, str]:
+    with urllib.request.urlopen(base + path, timeout=5) as resp:
+        return resp.headers["Content-Type"], resp.read().decode("utf-8")
+
+
+def _sample(body: str, name: str, labels: str = "") -> float:
+    m = re.search(rf"^{re.escape(name + labels)} (\S+)$", body, re.MULTILINE)
+    assert m, f"{name}{labels} tidak ada di eksposisi"
+    return float(m.group(1))
+
+
+def test_disabled_by_default():
+    assert metrics.get() is None
+    assert metrics.observer("youtube") is None
+
+
+def test_scrape_counter_gauge_histogram(endpoint):
+    run = metrics.observer("youtube")
+    assert run is not None
+    run.on_progress({"status": "downloading", "filename": "a.mp4", "downloaded_bytes": 1000})
+    run.on_progress({"status": "finished", "filename": "a.mp4", "downloaded_bytes": 2500})
+    run.on_log("[download] Got error. Retrying (1/10)...")
+    run.on_postprocess({"status": "started", "postprocessor": "Merger"})
+    run.on_postprocess({"status": "finished", "postprocessor": "Merger"})
+    metrics.set_queue_depth(7)
+
+    ctype, body = _scrape(endpoint)
+    assert ctype == metrics.CONTENT_TYPE
+    # unduhan masih berjalan
+    assert _sample(body, "omdl_active_downloads") == 1
+    assert _sample(body, "omdl_queue_depth") == 7
+    assert _sample(body, "omdl_downloaded_bytes_total", '{provider="youtube"}') == 2500
+    assert _sample(body, "omdl_retries_total", '{provider="youtube"}') == 1
+    assert "# TYPE omdl_downloaded_bytes_total counter" in body
+    assert "# TYPE omdl_active_downloads gauge" in body
+    assert "# TYPE omdl_ffmpeg_seconds histogram" in body
+    assert _sample(body, "omdl_ffmpeg_seconds_count", '{postprocessor="Merger"}') == 1
+
+    run.finish(ok=False, error="boom")
+    _ctype, body = _scrape(endpoint)
+    assert _sample(body, "omdl_active_downloads") == 0
+    assert _sample(body, "omdl_downloads_total", '{provider="youtube",status="error"}') == 1
+    assert _sample(body, "omdl_errors_total", '{provider="youtube"}') == 1
+    assert _sample(body, "omdl_download_duration_seconds_count", '{provider="youtube"}') == 1
+    # bucket kumulatif: +Inf = count, urutan le menaik dan tidak pernah turun
+    bucket_re = r'^omdl_download_duration_seconds_bucket\{provider="youtube",le="([^"]+)"\} (\d+)$'
+    buckets = re.findall(bucket_re, body, re.MULTILINE)
+    assert buckets[-1] == ("+Inf", "1")
+    counts = [int(c) for _le, c in buckets]
+    assert counts == sorted(counts)
+
+
+def test_unknown_path_is_404(endpoint):
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        _scrape(endpoint, "/nope")
+    assert exc.value.code == 404
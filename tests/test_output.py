@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import os
+
+from omdl.output import OutputIndex
+
+
+def test_claim_new_then_same_owner_exists(tmp_path):
+    index = OutputIndex()
+    path = str(tmp_path / "Judul.mp4")
+    assert index.claim(path, "v1") == ("new", path)
+    assert index.claim(path, "v1") == ("exists", path)
+    assert index.exists(path)
+
+
+def test_file_present_before_batch_counts_as_existing(tmp_path):
+    (tmp_path / "Judul.mp4").write_bytes(b"x")
+    index = OutputIndex()
+    path = str(tmp_path / "Judul.mp4")
+    assert index.claim(path, "v1") == ("exists", path)
+
+
+def test_collision_with_other_owners_gets_suffixes(tmp_path):
+    index = OutputIndex()
+    path = str(tmp_path / "Judul.mp4")
+    alt = str(tmp_path / "Judul [v2].mp4")
+    assert index.claim(path, "v1") == ("new", path)
+    assert index.claim(path, "v2") == ("renamed", alt)
+    assert index.claim(path, "v2") == ("exists", alt)
+    # nama alternatif pun sudah dipakai item lain → (2), (3), …
+    index.add(alt, "lain")
+    index.add(str(tmp_path / "Judul [v2] (2).mp4"), "lain2")
+    index.release(alt, "v2")  # bukan pemilik: tidak berpengaruh
+    assert index.claim(path, "v2") == ("renamed", str(tmp_path / "Judul [v2] (3).mp4"))
+
+
+def test_old_alternate_file_on_disk_is_reused(tmp_path):
+    (tmp_path / "Judul [v2].mp4").write_bytes(b"x")
+    index = OutputIndex()
+    path = str(tmp_path / "Judul.mp4")
+    index.claim(path, "v1")
+    assert index.claim(path, "v2") == ("exists", str(tmp_path / "Judul [v2].mp4"))
+
+
+def test_release_frees_name_only_for_its_owner(tmp_path):
+    index = OutputIndex()
+    path = str(tmp_path / "Judul.mp4")
+    index.claim(path, "v1")
+    index.release(path, "v2")
+    assert index.claim(path, "v2")[0] == "renamed"
+    index.release(path, "v1")
+    assert not index.exists(path)
+    assert index.claim(path, "v3") == ("new", path)
+    assert not os.listdir(tmp_path)  # indeks saja; filesystem tidak disentuh
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import urllib.request
+
+import pytest
+from yt_dlp import YoutubeDL
+from yt_dlp.networking.exceptions import RequestError
+from yt_dlp.utils import DownloadError
+
+from omdl import catalog, replay
+from omdl.config_loader import load_config
+from omdl.downloader import run_download
+from omdl.output import OutputIndex, build_outtmpl
+from omdl.providers import get_provider
+
+URL = "https://www.youtube.com/watch?v=v1"
+SPLIT_URL = "https://www.youtube.com/watch?v=v2"
+VTT = "WEBVTT\n\n00:00:01.000 --> 00:00:02.500\nHalo <b>dunia</b>\n"
+
+
+def _fixture(root, url: str, key: str, vid: str, formats: dict, subs: dict | None = None) -> dict:
+    """Tulis satu fixture seperti hasil `omdl replay record`; kembalikan byte per format."""
+    base = root / "youtube" / key / vid
+    base.mkdir(parents=True)
+    blobs, fmts = {}, []
+    for fid, meta in formats.items():
+        blobs[fid] = os.urandom(meta.pop("size"))
+        (base / fid).write_bytes(blobs[fid])
+        fmts.append({"format_id": fid, "url": f"replay://youtube/{key}/{vid}/{fid}",
+                     "protocol": "https", "filesize": len(blobs[fid]), **meta})
+    info = {"id": vid, "title": f"Video {vid}", "extractor": "youtube", "extractor_key": "Youtube",
+            "webpage_url": url, "duration": 10, "formats": fmts, "subtitles": {}}
+    for lang, text in (subs or {}).items():
+        (base / f"subtitles.{lang}.vtt").write_text(text, encoding="utf-8")
+        sub_url = f"replay://youtube/{key}/{vid}/subtitles.{lang}.vtt"
+        info["subtitles"][lang] = [{"ext": "vtt", "url": sub_url}]
+    (root / "youtube" / key / "info.json").write_text(json.dumps(info), encoding="utf-8")
+    manifest = replay.read_manifest(str(root))
+    manifest[url] = {"provider": "youtube", "key": key, "id": vid, "title": info["title"]}
+    replay._write_manifest(str(root), manifest)
+    return blobs
+
+
+@pytest.fixture
+def fixtures(tmp_path):
+    root = tmp_path / "fixtures"
+    root.mkdir()
+    blobs = _fixture(root, URL, "k1", "v1",
+                     {"18": {"ext": "mp4", "vcodec": "avc1.42001E", "acodec": "mp4a.40.2",
+                             "width": 640, "height": 360, "size": 60000}},
+                     subs={"id": VTT})
+    blobs.update(_fixture(root, SPLIT_URL, "k2", "v2", {
+        "137": {"ext": "mp4", "vcodec": "avc1.640028", "acodec": "none",
+                "width": 1920, "height": 1080, "size": 80000},
+        "140": {"ext": "m4a", "vcodec": "none", "acodec": "mp4a.40.2", "abr": 128, "size": 40000},
+    }))
+    return root, blobs
+
+
+@pytest.fixture
+def cfg(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return dict(load_config(str(tmp_path)), cache_dir=str(tmp_path / "cache"), info_cache_ttl=0,
+                subtitles=False, dedup_enabled=False)
+
+
+def _download(cfg, tmp_path, url, **kw):
+    provider_obj = get_provider("youtube", cfg)
+    outtmpl = build_outtmpl(str(tmp_path / "out"), "youtube", "%(title)s.%(ext)s")
+    return run_download(provider_name="youtube", provider_obj=provider_obj, url=url,
+                        mode="auto", quality=kw.pop("quality", "auto"), outtmpl=outtmpl,
+                        cookies_path=None, audio_codec=None, audio_quality=None,
+                        headless=True, **kw)
+
+
+def test_single_format_download_matches_fixture_bytes(fixtures, cfg, tmp_path):
+    root, blobs = fixtures
+    with replay.Replay(str(root)) as rp:
+        rec = _download(cfg, tmp_path, URL)
+        assert rp.hits == 1
+    assert rec["ok"] and not rec["cached"]
+    assert rec["path"].endswith("Video v1.mp4")
+    with open(rec["path"], "rb") as f:
+        assert f.read() == blobs["18"]
+    assert rec["bytes"] == len(blobs["18"])
+
+
+def test_download_is_recorded_in_catalog(fixtures, cfg, tmp_path):
+    root, _blobs = fixtures
+    with replay.Replay(str(root)):
+        rec = _download(cfg, tmp_path, URL)
+    how, rows = catalog.catalog_for(cfg).query(URL)
+    assert how == "url"
+    assert [r["path"] for r in rows] == [os.path.abspath(rec["path"])]
+    assert rows[0]["video_id"] == "v1" and rows[0]["height"] == 360
+
+
+def test_subtitle_sidecar_is_converted(fixtures, cfg, tmp_path):
+    root, _blobs = fixtures
+    cfg.update(subtitles=True, subtitle_langs=["id"], subtitle_format="srt", subtitle_embed=False)
+    with replay.Replay(str(root)):
+        rec = _download(cfg, tmp_path, URL)
+    srt = os.path.splitext(rec["path"])[0] + ".id.srt"
+    with open(srt, encoding="utf-8") as f:
+        srt_text = f.read()
+    assert "00:00:01,000 --> 00:00:02,500" in srt_text
+    assert "Halo" in srt_text and "WEBVTT" not in srt_text
+
+
+def test_existing_output_is_skipped(fixtures, cfg, tmp_path):
+    root, _blobs = fixtures
+    out_index = OutputIndex()
+    with replay.Replay(str(root)) as rp:
+        first = _download(cfg, tmp_path, URL, out_index=out_index)
+        second = _download(cfg, tmp_path, URL, out_index=out_index)
+        assert rp.hits == 2
+    assert second["cached"] and second["path"] == first["path"]
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="merge butuh ffmpeg")
+def test_split_formats_are_merged(fixtures, cfg, tmp_path):
+    root, _blobs = fixtures
+    with replay.Replay(str(root)):
+        rec = _download(cfg, tmp_path, SPLIT_URL, quality="bestvideo+bestaudio")
+    assert rec["ok"] and os.path.isfile(rec["path"])
+    leftovers = [n for n in os.listdir(os.path.dirname(rec["path"]))
+                 if ".f137." in n or ".f140." in n]
+    assert not leftovers
+
+
+def test_strict_mode_blocks_unknown_urls_and_hosts(fixtures, cfg, tmp_path):
+    root, _blobs = fixtures
+    with replay.Replay(str(root)):
+        with pytest.raises(DownloadError, match="Tidak ada fixture"):
+            _download(cfg, tmp_path, "https://www.youtube.com/watch?v=missing")
+        with YoutubeDL({"quiet": True}) as ydl, pytest.raises(RequestError, match="diblokir"):
+            ydl.urlopen("https://example.com/")
+    assert YoutubeDL.extract_info is replay._ORIG_EXTRACT
+
+
+def test_server_supports_range_requests(fixtures):
+    root, blobs = fixtures
+    with replay.Replay(str(root)) as rp:
+        req = urllib.request.Request(rp.base_url + "youtube/k1/v1/18",
+                                     headers={"Range": "bytes=100-199"})
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            assert resp.status == 206
+            assert resp.headers["Content-Range"] == f"bytes 100-199/{len(blobs['18'])}"
+            assert resp.read() == blobs["18"][100:200]
+
+
+def test_replay_without_fixtures_fails(tmp_path):
+    with pytest.raises(replay.ReplayError):
+        replay.Replay(str(tmp_path / "empty"))
+
+
+def test_unreadable_catalog_does_not_fail_download(fixtures, cfg, tmp_path):
+    root, blobs = fixtures
+    db = tmp_path / "broken.sqlite"
+    db.write_bytes(b"bukan database sqlite" * 100)
+    cfg.update(catalog_db=str(db), dedup_enabled=True)
+    with replay.Replay(str(root)):
+        rec = _download(cfg, tmp_path, URL)
+    assert rec["ok"]
+    with open(rec["path"], "rb") as f:
+        assert f.read() == blobs["18"]
+
+
+def test_preflight_probes_each_item_with_its_own_profile(fixtures, cfg, tmp_path):
+    from omdl import batch, probe
+    root, blobs = fixtures
+    entries = [batch.parse_entry({"url": SPLIT_URL, "quality": "137"}),
+               batch.parse_entry({"url": SPLIT_URL, "quality": "140"})]
+    groups, skipped = batch.plan(entries, cfg, "auto", "bestvideo+bestaudio")
+    assert not skipped and len(groups) == 2
+    with replay.Replay(str(root)):
+        pairs = probe.probe_groups(groups, cfg, seed_cache=False)
+    assert [g.profile.format for g in groups] == ["137", "140"]
+    assert [res["format"] for _item, res in pairs] == ["137", "140"]
+    assert [res["est_bytes"] for _item, res in pairs] == [len(blobs["137"]), len(blobs["140"])]
+
+
+def test_interrupted_download_lowers_active_gauge(fixtures, cfg, tmp_path, monkeypatch):
+    from omdl import diskspace, metrics
+
+    def interrupt(*_a, **_kw):
+        raise KeyboardInterrupt
+
+    estimate = diskspace.estimate_required
+    monkeypatch.setattr(diskspace, "estimate_required", interrupt)
+    root, _blobs = fixtures
+    metrics.enable("127.0.0.1", 0)
+    try:
+        out_index = OutputIndex()
+        with replay.Replay(str(root)), pytest.raises(KeyboardInterrupt):
+            _download(cfg, tmp_path, URL, out_index=out_index)
+        assert "omdl_active_downloads 0\n" in metrics.get().render()
+        monkeypatch.setattr(diskspace, "estimate_required", estimate)
+        # klaim nama dilepas: unduhan ulang tidak dianggap "sudah ada"
+        with replay.Replay(str(root)):
+            rec = _download(cfg, tmp_path, URL, out_index=out_index)
+        assert rec["ok"] and not rec["cached"]
+    finally:
+        metrics.disable()
+
+
+def test_events_rejects_non_numeric_since(fixtures, cfg):
+    import threading
+    import urllib.error
+
+    from omdl import server
+
+    root, _blobs = fixtures
+    with replay.Replay(str(root)):
+        jobs = server.JobServer(cfg, workers=1)
+        httpd, base = server.start(jobs, port=0)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        try:
+            job = jobs.submit(URL)
+            for since in ("abc", "-1"):
+                with pytest.raises(urllib.error.HTTPError) as exc:
+                    urllib.request.urlopen(f"{base}/jobs/{job.id}/events?since={since}", timeout=5)
+                assert exc.value.code == 400
+                assert "since" in json.loads(exc.value.read())["error"]
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            jobs.shutdown()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import pytest
+
+from omdl import sections
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("90-120", (90.0, 120.0)),
+    ("1:30-2:00", (90.0, 120.0)),
+    ("1m30s-2m", (90.0, 120.0)),
+    ("01:02:03.5-01:02:04", (3723.5, 3724.0)),
+    ("10:00-", (600.0, None)),
+    ("-30", (0.0, 30.0)),
+    (" 5 - 6 ", (5.0, 6.0)),
+])
+def test_parse(text, expected):
+    assert sections.parse(text) == expected
+
+
+@pytest.mark.parametrize("text, message", [
+    ("90", "START-END"),
+    ("abc-20", "tidak dikenali"),
+    ("10-xyz", "tidak dikenali"),
+    ("20-10", "setelah awal"),
+    ("10-10", "setelah awal"),
+])
+def test_parse_errors(text, message):
+    with pytest.raises(ValueError, match=message):
+        sections.parse(text)
+
+
+def test_label():
+    assert sections.label((90.0, 3725.5)) == "1m30s-1h02m05.5s"
+    assert sections.label((0.0, 5.25)) == "0s-5.25s"
+    assert sections.label((600.0, None)) == "10m00s-akhir"
+
+
+def test_length():
+    assert sections.length((90.0, 120.0), None) == 30.0
+    assert sections.length((90.0, 120.0), 100.0) == 10.0   # dipotong di durasi video
+    assert sections.length((600.0, None), 900.0) == 300.0
+    assert sections.length((600.0, None), None) is None
+    assert sections.length((600.0, 700.0), 500.0) == 0.0
+
+
+def test_outtmpl():
+    assert sections.outtmpl("out/%(title)s.%(ext)s", (90.0, 120.0)) == \
+        "out/%(title)s [1m30s-2m00s].%(ext)s"
+    assert sections.outtmpl("out/%(title)s", (0.0, None)) == "out/%(title)s [0s-akhir]"
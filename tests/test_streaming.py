@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import io
+import os
+import re
+
+import pytest
+from yt_dlp.networking import Response
+from yt_dlp.networking.exceptions import HTTPError
+
+from omdl import streaming
+
+URL = "https://media.example/a.webm"
+
+
+class _FakeYDL:
+    """Cukup urlopen(): tiap request dijawab `server(range_header)` → Response."""
+
+    def __init__(self, server) -> None:
+        self.server = server
+        self.ranges = []
+
+    def urlopen(self, req):
+        rng = req.headers.get("Range")
+        self.ranges.append(rng)
+        return self.server(rng)
+
+
+def _ranged(data: bytes):
+    def server(rng):
+        start, end = map(int, re.match(r"bytes=(\d+)-(\d+)", rng).groups())
+        if start >= len(data):
+            raise HTTPError(Response(io.BytesIO(b""), URL, {}, status=416))
+        body = data[start:end + 1]
+        return Response(io.BytesIO(body), URL, {
+            "Content-Range": f"bytes {start}-{start + len(body) - 1}/{len(data)}"}, status=206)
+    return server
+
+
+def _fmt(chunk: int = 0) -> dict:
+    opts = {"http_chunk_size": chunk} if chunk else {}
+    return {"url": URL, "downloader_options": opts}
+
+
+def test_without_chunking_reads_body_once():
+    data = os.urandom(1000)
+    ydl = _FakeYDL(lambda rng: Response(io.BytesIO(data), URL, {}, status=200))
+    assert b"".join(streaming._chunks(ydl, _fmt())) == data
+    assert ydl.ranges == [None]
+
+
+def test_ranged_chunks_are_concatenated_and_stop_at_total():
+    data = os.urandom(2500)
+    ydl = _FakeYDL(_ranged(data))
+    assert b"".join(streaming._chunks(ydl, _fmt(1000))) == data
+    assert ydl.ranges == ["bytes=0-999", "bytes=1000-1999", "bytes=2000-2999"]
+
+
+def test_size_multiple_of_chunk_does_not_fail():
+    data = os.urandom(2000)
+    ydl = _FakeYDL(_ranged(data))
+    assert b"".join(streaming._chunks(ydl, _fmt(1000))) == data
+
+
+def test_final_416_is_eof_when_total_unknown():
+    data = os.urandom(2000)
+    inner = _ranged(data)
+
+    def server(rng):
+        resp = inner(rng)
+        known = resp.headers["Content-Range"]
+        resp.headers.replace_header("Content-Range", known.split("/")[0] + "/*")
+        return resp
+
+    ydl = _FakeYDL(server)
+    assert b"".join(streaming._chunks(ydl, _fmt(1000))) == data
+    assert ydl.ranges[-1] == "bytes=2000-2999"
+
+
+def test_server_ignoring_range_is_read_once():
+    data = os.urandom(5000)
+    ydl = _FakeYDL(lambda rng: Response(io.BytesIO(data), URL, {}, status=200))
+    assert b"".join(streaming._chunks(ydl, _fmt(1000))) == data
+    assert len(ydl.ranges) == 1
+
+
+def test_mismatched_content_range_raises_stream_error():
+    data = os.urandom(3000)
+    inner = _ranged(data)
+
+    def server(rng):
+        if rng.startswith("bytes=0-"):
+            return inner(rng)
+        return inner("bytes=0-999")  # server mengulang awal file
+
+    ydl = _FakeYDL(server)
+    with pytest.raises(streaming.StreamError):
+        b"".join(streaming._chunks(ydl, _fmt(1000)))
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import importlib
+
+from yt_dlp import YoutubeDL
+from yt_dlp.postprocessor import FFmpegMergerPP
+
+from omdl import subtitles
+
+VTT = """WEBVTT
+Kind: captions
+
+NOTE komentar
+
+1
+00:00:01.000 --> 00:00:02.500 align:start
+Halo <c.colorE5E5E5>dunia</c> &amp; <b>semua</b>
+
+00:01:02.5 --> 00:01:04.000
+baris satu
+baris dua
+"""
+
+
+def test_convert_vtt_to_srt():
+    assert subtitles.convert(VTT, "srt") == (
+        "1\n00:00:01,000 --> 00:00:02,500\nHalo dunia & <b>semua</b>\n\n"
+        "2\n00:01:02,500 --> 00:01:04,000\nbaris satu\nbaris dua\n\n")
+
+
+def test_convert_to_ass_and_vtt():
+    ass = subtitles.convert(VTT, "ass")
+    assert ass.startswith("[Script Info]")
+    line = "Dialogue: 0,0:00:01.00,0:00:02.50,Default,,0,0,0,,Halo dunia & {\\b1}semua{\\b0}\n"
+    assert line in ass
+    assert "baris satu\\Nbaris dua" in ass
+    vtt = subtitles.convert(VTT, "vtt")
+    assert vtt.startswith("WEBVTT\n\n00:00:01.000 --> 00:00:02.500\n"
+                          "Halo dunia &amp; <b>semua</b>\n")
+
+
+def test_convert_srt_drops_empty_cues():
+    srt = ("1\n00:00:01,000 --> 00:00:02,000\n<font color=red></font>\n\n"
+           "2\n00:00:03,000 --> 00:00:04,000\nisi\n")
+    assert subtitles.convert(srt, "srt") == "1\n00:00:03,000 --> 00:00:04,000\nisi\n\n"
+
+
+def test_dedupe_rolling_auto_captions():
+    cues = [(0.0, 2.0, "halo"),
+            (2.0, 2.01, "halo"),                 # cue transisi: tidak ada baris baru
+            (2.01, 4.0, "halo\napa kabar"),
+            (4.0, 4.01, "apa kabar"),
+            (4.01, 6.0, "apa kabar\nsemua")]
+    assert subtitles._dedupe(cues) == [(0.0, 2.0, "halo"), (2.01, 4.0, "apa kabar"),
+                                       (4.01, 6.0, "semua")]
+
+
+def test_dedupe_merges_repeated_text_across_short_gap():
+    cues = [(0.0, 1.0, "a"), (1.02, 2.0, "b"), (2.01, 3.0, "b")]
+    assert subtitles._dedupe(cues) == [(0.0, 1.0, "a"), (1.02, 2.0, "b")]
+
+
+def _track(ext: str) -> dict:
+    return {"ext": ext, "url": f"https://subs.example/{ext}"}
+
+
+INFO = {
+    "subtitles": {"en": [_track("json3"), _track("vtt")], "id": [_track("srt")],
+                  "live_chat": [_track("vtt")]},
+    "automatic_captions": {"en": [_track("vtt")], "en-GB": [_track("vtt")], "fr": [_track("vtt")]},
+}
+
+
+def test_select_prefers_manual_with_fallback_to_auto():
+    got = subtitles.select(INFO, ["en", "fr", "de"], "fallback", "srt")
+    assert [(lang, auto, t["ext"]) for lang, auto, t in got] == [("en", False, "vtt"),
+                                                                 ("fr", True, "vtt")]
+
+
+def test_select_prefer_never_and_patterns():
+    prefer = subtitles.select(INFO, ["en.*"], "prefer", "srt")
+    assert [(lang, auto) for lang, auto, _t in prefer] == [("en", True), ("en-GB", True)]
+    never = subtitles.select(INFO, ["all"], "never", "srt")
+    assert [(lang, auto, t["ext"]) for lang, auto, t in never] == [("en", False, "vtt"),
+                                                                   ("id", False, "srt")]
+
+
+def test_merger_is_swapped_only_for_the_installed_instance():
+    ydl_module = importlib.import_module("yt_dlp.YoutubeDL")
+    seen = []
+    with YoutubeDL({"quiet": True}) as ydl:
+        ydl.post_process = lambda filename, info, files_to_move=None: seen.append(info)
+        subtitles.install_merger(ydl)
+        ydl.post_process("a.mp4", {"__postprocessors": [FFmpegMergerPP(ydl)]})
+    assert [type(pp) for pp in seen[0]["__postprocessors"]] == [subtitles.SubtitleMergerPP]
+    assert ydl_module.FFmpegMergerPP is FFmpegMergerPP
+    with YoutubeDL({"quiet": True}) as other:
+        assert "post_process" not in vars(other)
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import os
+import struct
+
+import pytest
+
+from omdl import tagging
+from omdl.tagging import _atoms, _box
+
+TAGS = {"title": "Judul ✓", "artist": "Penyanyi", "date": "2024-05-01"}
+
+
+# ===== MP4 =====
+def _stco(offset: int) -> bytes:
+    return _box(b"stco", struct.pack(">III", 0, 1, offset))
+
+
+def _mp4(path, order: str, free: int = 0) -> bytes:
+    """Tulis MP4 minimal; `order` = urutan atom (f=ftyp, m=moov, M=mdat). Hasil: payload mdat."""
+    payload = os.urandom(4000)
+    ftyp = _box(b"ftyp", b"isom\0\0\0\0isom")
+    moov_size = len(_box(b"moov", _box(b"trak", _stco(0))))
+    sizes = {"f": len(ftyp), "m": moov_size + free, "M": 8 + len(payload)}
+    mdat_off = sum(sizes[c] for c in order[:order.index("M")]) + 8
+    parts = {"f": ftyp, "M": _box(b"mdat", payload),
+             "m": _box(b"moov", _box(b"trak", _stco(mdat_off)))
+             + (_box(b"free", b"\0" * (free - 8)) if free else b"")}
+    path.write_bytes(b"".join(parts[c] for c in order))
+    return payload
+
+
+def _read_moov(path) -> bytes:
+    with open(path, "rb") as f:
+        top = tagging._top_level(f)
+        _k, off, size = next(t for t in top if t[0] == b"moov")
+        f.seek(off)
+        return f.read(size)
+
+
+def _ilst(moov: bytes) -> dict:
+    udta = dict(_atoms(moov, 8))[b"udta"]
+    meta = dict(_atoms(udta, 8))[b"meta"]
+    ilst = dict(_atoms(meta, 12))[b"ilst"]
+    return {k: a[24:].decode("utf-8") for k, a in _atoms(ilst, 8)}
+
+
+def _mdat_intact(path, payload: bytes) -> None:
+    moov = _read_moov(path)
+    stco = dict(_atoms(dict(_atoms(moov, 8))[b"trak"], 8))[b"stco"]
+    offset = struct.unpack(">I", stco[16:20])[0]
+    with open(path, "rb") as f:
+        f.seek(offset)
+        assert f.read(len(payload)) == payload
+
+
+def test_mp4_moov_at_end_is_rewritten_in_place(tmp_path):
+    path = tmp_path / "a.m4a"
+    payload = _mp4(path, "fMm")
+    assert tagging.tag_file(str(path), TAGS) == "in-place"
+    assert _ilst(_read_moov(path))[b"\xa9nam"] == TAGS["title"]
+    _mdat_intact(path, payload)
+
+
+def test_mp4_moov_fits_in_following_free(tmp_path):
+    path = tmp_path / "a.mp4"
+    payload = _mp4(path, "fmM", free=512)
+    size = path.stat().st_size
+    assert tagging.tag_file(str(path), TAGS) == "in-place"
+    assert path.stat().st_size == size
+    with open(path, "rb") as f:
+        kinds = [k for k, _o, _s in tagging._top_level(f)]
+    assert kinds == [b"ftyp", b"moov", b"free", b"mdat"]
+    _mdat_intact(path, payload)
+
+
+def test_mp4_grown_moov_moves_to_end_without_shifting_mdat(tmp_path):
+    path = tmp_path / "a.mp4"
+    payload = _mp4(path, "fmM")
+    assert tagging.tag_file(str(path), TAGS) == "moov dipindah ke akhir"
+    with open(path, "rb") as f:
+        kinds = [k for k, _o, _s in tagging._top_level(f)]
+    assert kinds == [b"ftyp", b"free", b"mdat", b"moov"]
+    assert _ilst(_read_moov(path))[b"\xa9ART"] == TAGS["artist"]
+    _mdat_intact(path, payload)
+
+
+# ===== MP3 =====
+AUDIO = b"\xff\xfb\x90\x00" + os.urandom(3000)
+
+
+def _id3(version: int, frames: bytes, padding: int = 0, footer: bool = False) -> bytes:
+    size = tagging._syncsafe(len(frames) + padding)
+    flags = 0x10 if footer else 0
+    tag = b"ID3" + bytes((version, 0, flags)) + size + frames + b"\0" * padding
+    return tag + (b"3DI" + bytes((version, 0, flags)) + size if footer else b"")
+
+
+def _frames(path) -> tuple:
+    """(versi, ukuran tag, {fid: payload}, sisa audio) dari file MP3."""
+    data = path.read_bytes()
+    assert data[:3] == b"ID3" and not data[5] & 0x10
+    version, size = data[3], tagging._unsyncsafe(data[6:10])
+    body, out, pos = data[10:10 + size], {}, 0
+    while pos + 10 <= len(body) and body[pos] != 0:
+        raw = body[pos + 4:pos + 8]
+        n = tagging._unsyncsafe(raw) if version == 4 else struct.unpack(">I", raw)[0]
+        out[body[pos:pos + 4].decode("ascii")] = body[pos + 10:pos + 10 + n]
+        pos += 10 + n
+    return version, size, out, data[10 + size:]
+
+
+def test_mp3_without_tag_is_rewritten_once_with_padding(tmp_path):
+    path = tmp_path / "a.mp3"
+    path.write_bytes(AUDIO)
+    assert tagging.tag_file(str(path), TAGS) == "ditulis ulang (+padding)"
+    version, size, frames, audio = _frames(path)
+    assert version == 3 and audio == AUDIO
+    assert size > sum(len(p) + 10 for p in frames.values())  # ada padding
+    assert tagging.tag_file(str(path), {"title": "Lain"}) == "in-place"
+    _v, size2, frames2, audio2 = _frames(path)
+    assert size2 == size and audio2 == AUDIO
+    assert frames2["TIT2"] == b"\x01" + "Lain".encode("utf-16")
+    assert frames2["TPE1"] == frames["TPE1"]
+
+
+def test_mp3_tag_within_padding_is_written_in_place(tmp_path):
+    path = tmp_path / "a.mp3"
+    other = tagging._id3_frame(4, "TXXX", b"\x03a\0b")
+    path.write_bytes(_id3(4, other, padding=1024) + AUDIO)
+    size = path.stat().st_size
+    assert tagging.tag_file(str(path), TAGS) == "in-place"
+    assert path.stat().st_size == size
+    _v, _s, frames, audio = _frames(path)
+    assert audio == AUDIO and frames["TXXX"] == b"\x03a\0b"
+
+
+def test_mp3_v24_footer_is_dropped_on_rewrite(tmp_path):
+    path = tmp_path / "a.mp3"
+    old = tagging._id3_frame(4, "TIT2", b"\x03lama")
+    path.write_bytes(_id3(4, old, footer=True) + AUDIO)
+    assert tagging.tag_file(str(path), TAGS) == "ditulis ulang (+padding)"
+    version, _s, frames, audio = _frames(path)
+    assert version == 4 and audio == AUDIO
+    assert frames["TIT2"] == b"\x03" + TAGS["title"].encode("utf-8")
+
+
+@pytest.mark.parametrize("version", [3, 4])
+def test_mp3_frame_encoding_follows_tag_version(tmp_path, version):
+    path = tmp_path / "a.mp3"
+    path.write_bytes(_id3(version, b"", padding=4096) + AUDIO)
+    title = "x" * 200  # > 127 byte: ukuran syncsafe (v2.4) beda dengan big-endian (v2.3)
+    assert tagging.tag_file(str(path), dict(TAGS, title=title)) == "in-place"
+    _v, _s, frames, audio = _frames(path)
+    assert audio == AUDIO
+    if version == 4:
+        assert frames["TIT2"] == b"\x03" + title.encode("utf-8")
+        assert frames["TDRC"] == b"\x032024-05-01" and "TYER" not in frames
+    else:
+        assert frames["TIT2"] == b"\x01" + title.encode("utf-16")
+        assert frames["TYER"] == b"\x01" + "2024".encode("utf-16") and "TDRC" not in frames